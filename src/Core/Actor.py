@@ -47,7 +47,15 @@ class Actor(GameObject):
     
     @type _maxPixelsPerFrame:     C{int}
     @cvar _maxPixelsPerFrame:     The maximum number pixels the Actor is allowed to move per frame.
-                                  It should be a little less than the tile size.
+                                  It should be a little less than the tile size.  Not used with swept collisions.
+    
+    @type _sweptCollisions:       C{bool}
+    @ivar _sweptCollisions:       If C{True}, tile collisions are resolved by sweeping the bounding box through the tile grid
+                                  instead of intersecting line segments, so the Actor can't tunnel through tiles at high speeds.
+    
+    @type _sweep:                 C{tuple}
+    @ivar _sweep:                 The last sweep through the tile grid, what it was swept through and the result, so the tiles
+                                  found on the way and the resolution come from the same sweep.  C{None} if there wasn't one.
     
     @type _stateMappings:         C{dict}
     @ivar _stateMappings:         C{{str : L{State<States.State.State>}}} - Dictionary of State reference names to the States they refer to.
@@ -173,6 +181,9 @@ class Actor(GameObject):
         """
         GameObject.__init__(self, position, width, height, None, name, image, animationMappings, soundMappings)
         
+        # set when added to a map
+        self._map = None
+        
         # collision groups
         self.cgroupNames = collisionGroupNames
         self._collisionGroups = []
@@ -197,6 +208,9 @@ class Actor(GameObject):
         self._maxXVel = Constants.ActorConstants.MAX_X_VELOCITY
         self._maxYVel = Constants.ActorConstants.MAX_Y_VELOCITY
         
+        self._sweptCollisions = Constants.ActorConstants.SWEPT_TILE_COLLISIONS
+        self._sweep = None
+        
         # make sure the state is setup correctly
         self._currentState = self._stateMappings[startStateName]
         self._currentState.OnEnter()
@@ -229,18 +243,30 @@ class Actor(GameObject):
         """
         self._prevPosition = self.Position
         
+        # the tiles may have changed since the last sweep
+        self._sweep = None
+        
+        # animations keep playing even if the Actor isn't drawn
+        self.__advance_animation_queue__()
+        
         for effect in self._effects:
             effect.Update(dt)
         
         self.__check_collision_groups__()
         
         self._currentState.Update(dt)
+        
+        # the State moved us and resolved tile collisions, file where we ended up, not where we were headed
+        self.__update_spatial_hash__()
 
     def __check_collision_groups__(self):
         """
         Checks collisions between this Actor and every other object in its L{CollisionGroup<CollisionGroup.CollisionGroup>}s.
         To prevent redundant checks, when Actor A checks against B, the check between B and A is removed. 
         """
+        # make sure we're filed where we are now, in case we were moved outside of Update
+        self.__update_spatial_hash__()
+        
         # if we don't have any collisions, get some
         if len(self._collisions) == 0:
             self.__refresh_collision_set__()
@@ -271,12 +297,25 @@ class Actor(GameObject):
         Gets a fresh set of all Actors this Actor should check collisions against.  That is all members of the
         L{CollisionGroup<CollisionGroup.CollisionGroup>}s this Actor's collision groups collide with.  This should be
         once per collision check cycle (usually once per frame).
+        
+        If the Actor is in its map's L{SpatialHash<Core.SpatialHash.SpatialHash>}, only those members in nearby cells
+        are used.
         """
         self._collisions.clear()
-        for group in self.CollisionGroups:
-            self._collisions.update(group.CollidableSet())
         
-    
+        if self._map is None or self not in self._map.SpatialHash:
+            for group in self.CollisionGroups:
+                self._collisions.update(group.CollidableSet())
+            return
+        
+        # Actors are filed again after their tile collisions are resolved, so however far they moved, they're filed
+        # where they are, look a cell further out in case something else nudged them since
+        for other in self._map.SpatialHash.Query(self.boundingBox, 1):
+            for group in self.CollisionGroups:
+                if group.CollidesWith(other):
+                    self._collisions.add(other)
+                    break
+        
     def __remove_collisions__(self, collisionSet):
         """
         Remove the given collisions from this frame's collision set.
@@ -311,12 +350,22 @@ class Actor(GameObject):
         distance = self.Velocity * dt
         
         # moving at 1300 pixels/second or higher, this hack comes into play
-        if (abs(distance.x) >= self._maxPixelsPerFrame):
-            distance = Vector(((self._maxPixelsPerFrame - 1) * (distance.x / abs(distance.x)), distance.y))
-        if (abs(distance.y) >= self._maxPixelsPerFrame):
-            distance = Vector((distance.x, (self._maxPixelsPerFrame - 1) * (distance.y / abs(distance.y))))
+        # swept collisions can't tunnel, so they don't need it
+        if not self._sweptCollisions:
+            if (abs(distance.x) >= self._maxPixelsPerFrame):
+                distance = Vector(((self._maxPixelsPerFrame - 1) * (distance.x / abs(distance.x)), distance.y))
+            if (abs(distance.y) >= self._maxPixelsPerFrame):
+                distance = Vector((distance.x, (self._maxPixelsPerFrame - 1) * (distance.y / abs(distance.y))))
 
         self.Position += distance
+        
+    def __update_spatial_hash__(self):
+        """
+        Files this Actor under its current position in its map's L{SpatialHash<Core.SpatialHash.SpatialHash>}.
+        Only Actors in L{CollisionGroup<CollisionGroup.CollisionGroup>}s are kept in the SpatialHash.
+        """
+        if self._map and self._collisionGroups:
+            self._map.SpatialHash.Update(self)
     
     def __get_colliding_tiles__(self, collisionLayer):
         """
@@ -375,7 +424,11 @@ class Actor(GameObject):
         if (self.boundingBox.topleft == previousBB.topleft):
             return
 
-        sideTiles, aboveBelowTiles = self.__get_colliding_tiles__(collisionLayer)
+        # swept collisions walk the tile grid themselves
+        if self._sweptCollisions:
+            sideTiles, aboveBelowTiles = [], []
+        else:
+            sideTiles, aboveBelowTiles = self.__get_colliding_tiles__(collisionLayer)
                 
         # prioritize and resolve collisions if there are any
         #CAD - in or out?
@@ -399,15 +452,20 @@ class Actor(GameObject):
         @param previousBB:         Bounding box at the previous position.
         """
         
+        if self._sweptCollisions:
+            self.__resolve_swept_tile_collisions__(previousBB, collisionLayer)
+            return
+        
         # use whatever tiles we have for regular collision detection
         originalX, originalY  = self.Position
         
-        from decimal import Decimal
-               
-        newX, minX = map(Decimal, map(str, self.__calc_x_collision_adjustment__(sideTiles, previousBB)))
-        newY, minY = map(Decimal, map(str, self.__calc_y_collision_adjustment__(aboveBelowTiles, previousBB)))
+        newX, minX = self.__calc_x_collision_adjustment__(sideTiles, previousBB)
+        newY, minY = self.__calc_y_collision_adjustment__(aboveBelowTiles, previousBB)
+        
+        # distances within the tolerance are a tie, so float noise can't decide which axis goes first
+        tolerance = Constants.ActorConstants.COLLISION_DISTANCE_TOLERANCE
         
-        if ((minX < minY and minX != -1) or (minX >= 0.0 and minY == -1)):
+        if (minX != -1 and (minY == -1 or minX < minY - tolerance)):
             # X collision occurred sooner
             self.Position = (newX, self.Position[1])
             
@@ -417,7 +475,7 @@ class Actor(GameObject):
             
             self.Position = (self.Position[0], newY)
             
-        elif ((minY < minX and minY != -1) or (minY >= 0.0 and minX == -1)):
+        elif (minY != -1 and (minX == -1 or minY < minX - tolerance)):
             # Y collision occurred sooner
             self.Position = (self.Position[0], newY)
             
@@ -438,6 +496,185 @@ class Actor(GameObject):
                     # y movement didn't clear either, do both
                     self.Position = (newX, newY)
     
+    def __resolve_swept_tile_collisions__(self, previousBB, collisionLayer):
+        """
+        Swept tile collision resolution method.  Moves the bounding box from its previous position toward its current
+        position one axis at a time, walking the tile grid along the way, and stops it just outside of the first
+        tile it would hit.  Whichever axis hits a tile sooner is resolved first, then the other axis is swept from
+        there.  If only Y hits a tile, X goes first, so like L{__resolve_tile_collisions__} the ground is looked for
+        under where the Actor ends up.  Unlike L{__resolve_tile_collisions__}, this works at any speed.
+        
+        If the tiles were already found with L{__get_swept_tiles__} for this move, that sweep is used.
+        
+        @type  previousBB:         C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}
+        @param previousBB:         Bounding box at the previous position.
+        
+        @type  collisionLayer:     L{GameTileLayer<Map.GameTileLayer.GameTileLayer>}
+        @param collisionLayer:     Layer whose tiles to use for collision detection.
+        """
+        self.Position = self.__get_swept_tiles__(previousBB, collisionLayer)[0]
+    
+    def __get_swept_tiles__(self, previousBB, collisionLayer):
+        """
+        Sweeps the bounding box from its previous position toward its current position the same way
+        L{__resolve_swept_tile_collisions__} does, and gets the L{GameTile<Map.GameTile.GameTile>}s it runs into on
+        the way, without moving the Actor.  Since the tiles are found through the layer's
+        L{TileGrid<Map.TileGrid.TileGrid>}, tiles can't be skipped over at any speed.
+        
+        The last sweep is kept, so asking again for the same move and layer doesn't sweep again.
+        
+        @type  previousBB:         C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}
+        @param previousBB:         Bounding box at the previous position.
+        
+        @type  collisionLayer:     L{GameTileLayer<Map.GameTileLayer.GameTileLayer>}
+        @param collisionLayer:     Layer whose tiles to use for collision detection.
+        
+        @rtype:                    C{((int, int), list, list)}
+        @return:                   Where the sweep stops the bounding box's upper left corner, tiles run into on the
+                                   left or right, and tiles run into above or below.
+        """
+        key = (previousBB.topleft, self.Position, collisionLayer)
+        if self._sweep is not None and self._sweep[0] == key:
+            sweptTo, sideTiles, aboveBelowTiles = self._sweep[1]
+            return sweptTo, list(sideTiles), list(aboveBelowTiles)
+        
+        prevX, prevY = previousBB.topleft
+        dx = self.Position[0] - prevX
+        dy = self.Position[1] - prevY
+        
+        # time of impact for each axis from the previous position, -1 means no collision
+        newX, xTime, column = self.__sweep_tiles_x__(prevX, prevY, dx, collisionLayer)
+        newY, yTime, row = self.__sweep_tiles_y__(prevX, prevY, dy, collisionLayer)
+        
+        if (xTime == -1 or yTime == -1 or xTime < yTime):
+            # X collision occurred sooner, or X is clear, sweep Y from the new X
+            # so walking off a ledge doesn't land on its corner
+            xSweptFrom = (prevX, prevY)
+            ySweptFrom = (newX, prevY)
+            newY, yTime, row = self.__sweep_tiles_y__(newX, prevY, dy, collisionLayer)
+        else:
+            # Y collision occurred sooner (or at the same time, to keep from catching on corners), sweep X from the new Y
+            xSweptFrom = (prevX, newY)
+            ySweptFrom = (prevX, prevY)
+            newX, xTime, column = self.__sweep_tiles_x__(prevX, newY, dx, collisionLayer)
+        
+        tileWidth = collisionLayer.TileWidth
+        tileHeight = collisionLayer.TileHeight
+        
+        sideTiles = []
+        if column is not None:
+            y = xSweptFrom[1]
+            sideTiles = collisionLayer.TileGrid.TilesInRect(column, y // tileHeight, column, (y + self.Height) // tileHeight)
+        
+        aboveBelowTiles = []
+        if row is not None:
+            x = ySweptFrom[0]
+            aboveBelowTiles = collisionLayer.TileGrid.TilesInRect(x // tileWidth, row, (x + self.Width) // tileWidth, row)
+        
+        self._sweep = (key, ((newX, newY), sideTiles, aboveBelowTiles))
+        
+        return (newX, newY), list(sideTiles), list(aboveBelowTiles)
+    
+    def __sweep_tiles_x__(self, x, y, dx, collisionLayer):
+        """
+        Sweeps the bounding box horizontally from the given position, and finds the first column of tiles it would hit.
+        Only the rows of tiles the bounding box overlaps at the given position are checked.
+        
+        @type  x:                  C{int}
+        @param x:                  X coordinate of the bounding box's left side to sweep from.
+        
+        @type  y:                  C{int}
+        @param y:                  Y coordinate of the bounding box's top side.
+        
+        @type  dx:                 C{int}
+        @param dx:                 Number of pixels to move, negative is to the left.
+        
+        @type  collisionLayer:     L{GameTileLayer<Map.GameTileLayer.GameTileLayer>}
+        @param collisionLayer:     Layer whose tiles to use for collision detection.
+        
+        @rtype:                    C{(int, float, int)}
+        @return:                   New X position, the time of impact as a fraction of C{dx} (-1 means no collision occurred),
+                                   and the X tile coordinate of the column that was hit (C{None} if no collision occurred).
+        """
+        if dx == 0:
+            return x, -1, None
+        
+        tileWidth = collisionLayer.TileWidth
+        tileHeight = collisionLayer.TileHeight
+        
+        firstRow = y // tileHeight
+        lastRow = (y + self.Height) // tileHeight
+        
+        if dx > 0:
+            # going right, walk the columns the right side passes through
+            lead = x + self.Width
+        else:
+            # going left, walk the columns the left side passes through
+            lead = x
+        
+        column = collisionLayer.TileGrid.FirstSolidAlongX(lead // tileWidth, (lead + dx) // tileWidth, firstRow, lastRow)
+        if column is not None:
+            if dx > 0:
+                # stop just left of the tile
+                moveTo = column * tileWidth - self.Width - 1
+            else:
+                # stop just right of the tile
+                moveTo = (column + 1) * tileWidth + 1
+            
+            return moveTo, max(float(moveTo - x) / dx, 0.0), column
+        
+        return x + dx, -1, None
+    
+    def __sweep_tiles_y__(self, x, y, dy, collisionLayer):
+        """
+        Sweeps the bounding box vertically from the given position, and finds the first row of tiles it would hit.
+        Only the columns of tiles the bounding box overlaps at the given position are checked.
+        
+        @type  x:                  C{int}
+        @param x:                  X coordinate of the bounding box's left side.
+        
+        @type  y:                  C{int}
+        @param y:                  Y coordinate of the bounding box's top side to sweep from.
+        
+        @type  dy:                 C{int}
+        @param dy:                 Number of pixels to move, negative is up.
+        
+        @type  collisionLayer:     L{GameTileLayer<Map.GameTileLayer.GameTileLayer>}
+        @param collisionLayer:     Layer whose tiles to use for collision detection.
+        
+        @rtype:                    C{(int, float, int)}
+        @return:                   New Y position, the time of impact as a fraction of C{dy} (-1 means no collision occurred),
+                                   and the Y tile coordinate of the row that was hit (C{None} if no collision occurred).
+        """
+        if dy == 0:
+            return y, -1, None
+        
+        tileWidth = collisionLayer.TileWidth
+        tileHeight = collisionLayer.TileHeight
+        
+        firstColumn = x // tileWidth
+        lastColumn = (x + self.Width) // tileWidth
+        
+        if dy > 0:
+            # going down, walk the rows the bottom passes through
+            lead = y + self.Height
+        else:
+            # going up, walk the rows the top passes through
+            lead = y
+        
+        row = collisionLayer.TileGrid.FirstSolidAlongY(lead // tileHeight, (lead + dy) // tileHeight, firstColumn, lastColumn)
+        if row is not None:
+            if dy > 0:
+                # stop just above the tile
+                moveTo = row * tileHeight - self.Height - 1
+            else:
+                # stop just below the tile
+                moveTo = (row + 1) * tileHeight + 1
+            
+            return moveTo, max(float(moveTo - y) / dy, 0.0), row
+        
+        return y + dy, -1, None
+    
     def __calc_y_collision_adjustment__(self, tiles, previousBB):
         """
         Suggests a new Y coordinate for the Actor's bounding box outside of the given colliding tiles.
@@ -651,6 +888,18 @@ class Actor(GameObject):
         """
         self._stateMappings.pop(stateName)
     
+    def HasState(self, stateName):
+        """
+        Checks if this Actor has a L{State<States.State.State>} with the given name.
+        
+        @type  stateName:         C{str}
+        @param stateName:         Name of the State.
+        
+        @rtype:                   C{bool}
+        @return:                  C{True} if the Actor can change into the State, C{False} otherwise.
+        """
+        return self._stateMappings.has_key(stateName)
+    
     def ChangeState(self, stateName):
         """
         Changes the current L{State<States.State.State>} to the one with the given name.  When changing, the old state's 
@@ -726,6 +975,24 @@ class Actor(GameObject):
             value = Vector(value)
         self._velocity = value
     
+    def __get_draw_position__(self):
+        if self._map is None:
+            return self.Position
+        
+        alpha = self._map.InterpolationAlpha
+        if alpha >= 1.0:
+            return self.Position
+        
+        # blend between the last two positions
+        prevX, prevY = self._prevPosition
+        x, y = self.Position
+        return (int(round(prevX + (x - prevX) * alpha)), int(round(prevY + (y - prevY) * alpha)))
+    
+    def __get_swept_collisions__(self):
+        return self._sweptCollisions
+    def __set_swept_collisions__(self, value):
+        self._sweptCollisions = value
+    
     def __get_collisionGroups__(self):
         return self._collisionGroups
         
@@ -743,6 +1010,8 @@ class Actor(GameObject):
         return self._currentState
         
     Velocity = property(__get_velocity__, __set_velocity__, None, "The Actor's current velocity in pixels/second.")
+    DrawPosition = property(__get_draw_position__, None, None, "Where the bounding box's upper left corner should be drawn, interpolated between the previous and current position by the L{GameMap<Map.GameMap.GameMap>}'s L{InterpolationAlpha<Map.GameMap.GameMap.InterpolationAlpha>}.")
+    SweptCollisions = property(__get_swept_collisions__, __set_swept_collisions__, None, "C{True} if tile collisions are resolved by sweeping through the tile grid, so there's no limit on how far the Actor can move per frame.")
     CollisionGroups = property(__get_collisionGroups__, None, None, "The L{CollisionGroup<CollisionGroup.CollisionGroup>}s this Actor belongs to.")
     Map = property(__get_map__, __set_map__, None, "The L{GameMap<Map.GameMap.GameMap>} this Actor is in.")
     Layer = property(__get_layer__, __set_layer__, None, "The L{GameObjectlayer<Map.GameObjectLayer.GameObjectLayer>} this Actor is on.")
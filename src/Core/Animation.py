@@ -4,7 +4,8 @@ A series of frames in a sprite sheet, used to create animated sprites.
 @author: Chris Alvarado-Dyden
 '''
 
-import pygame.image
+from Core.AnimationClock import AnimationClock
+from Core.AssetCache import AssetCache
 
 class Animation(object):
     """
@@ -13,19 +14,33 @@ class Animation(object):
     
     Sheets can be images with alpha values (like .TGA or .PNG), or they can be color-keyed without alpha values.
     
-    @type loadedSpriteSheets:        C{dict}
-    @cvar loadedSpriteSheets:        C{{str : Animation}} - A dictionary of sprite sheet paths and their
-                                     C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}} objects.  This is used to prevent
-                                     reloading the same sprite sheet multiple times.  It is populated as animations are loaded.
+    Animations play by the L{AnimationClock<AnimationClock.AnimationClock>}, which ticks once per simulation step.  The
+    current frame is worked out from how many ticks have passed since the animation started playing, so it doesn't matter
+    how many cameras the animation is drawn into, or if it's drawn at all.
+    
+    Every frame is cut out of the sheet once, when the first Animation using that sheet and frame rectangle is created.
+    Later Animations with the same sheet, frame rectangle and transparency (like every instance of an NPC) share the same
+    frames, and the same L{transformed frames<GetFrame>}.
+    
+    @type _sharedFrames:             C{dict}
+    @cvar _sharedFrames:             C{{tuple : list}} - The frames, transformed frames and number of Animations using them,
+                                     as C{[tuple, dict, int]}, for each sheet, frame rectangle, total frames and transparency.
+    
+    @type _sheetPath:                C{str}
+    @ivar _sheetPath:                The path to the sprite sheet file, C{None} once it's been L{released<Release>}.
                                      
     @type _spriteSheet:              C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
-    @ivar _spriteSheet:              The sprite sheet image that holds all of the frames for this animation.
+    @ivar _spriteSheet:              The sprite sheet image that holds all of the frames for this animation.  Shared with every
+                                     other Animation using the same file through the L{AssetCache<AssetCache.AssetCache>}, so
+                                     it's never changed.  The transparent color is set on each frame instead.
     
-    @type _startPos:                 C{(int, int)}
-    @ivar _startPos:                 Coordinates for the top left of the first frame of this animation within the sprite sheet. 
+    @type _framesKey:                C{tuple}
+    @ivar _framesKey:                Key of this animation's frames in L{_sharedFrames}, C{None} once it's been
+                                     L{released<Release>}.
     
-    @type _frame:                    C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
-    @ivar _frame:                    Subsurface within the sprite sheet for the current frame of animation.
+    @type _frames:                   C{tuple}
+    @ivar _frames:                   C{(U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>})} - Subsurfaces within
+                                     the sprite sheet for every frame of animation, in order.
     
     @type _frameNum:                 C{int}
     @ivar _frameNum:                 Which numbered frame the animation is currently on.
@@ -34,10 +49,20 @@ class Animation(object):
     @ivar _totalFrames:              Total number of frames in this animation.
     
     @type _frameDelay:               C{int}
-    @ivar _frameDelay:               How many frames of the game should pass (render frames) before switching to the next animation frame.
+    @ivar _frameDelay:               How many extra ticks of the clock each animation frame is shown for.
+    
+    @type _clock:                    L{AnimationClock<AnimationClock.AnimationClock>}
+    @ivar _clock:                    The clock the animation plays by.
+    
+    @type _startTick:                C{int}
+    @ivar _startTick:                Tick of the clock the animation would have started on to be at its current frame.
     
-    @type _framesUntilChange:        C{int}
-    @ivar _framesUntilChange:        How many more render frames to wait until moving to the next animation frame.
+    @type _syncedTick:               C{int}
+    @ivar _syncedTick:               Tick of the clock the current frame was last worked out on, C{None} if it needs to be
+                                     worked out again.
+    
+    @type _pausedTicks:              C{int}
+    @ivar _pausedTicks:              How many ticks the animation had been playing for when it was paused.
     
     @type _holdFrameNum:             C{int}
     @ivar _holdFrameNum:             Which numbered frame to stay on when the animation completes.  If -1 the animation will
@@ -61,10 +86,13 @@ class Animation(object):
                                      
     @type _stopOnComplete:           C{bool}
     @ivar _stopOnComplete:           C{True} if the animation should be L{stopped<Animation.Animation.Stop>} after it finishes playing.
+    
+    @type _transformedFrames:        C{dict}
+    @ivar _transformedFrames:        C{{tuple : U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}} - Frames that
+                                     have already been transformed (like flipped), keyed by the frame number followed by each
+                                     C{(function, params)} transformation applied to it.  Shared along with L{_frames}.
     """
-
-    # hold all the loaded sprite sheets so we don't reload them
-    loadedSpriteSheets = {}
+    _sharedFrames = {}
 
     def __init__(self, sheetPath, frameRect, totalFrames, frameDelay=0, holdFrame=-1, colorKey=None, alpha=False):
         """
@@ -81,7 +109,7 @@ class Animation(object):
         @param totalFrames:     Total number of frames in the animation.
         
         @type  frameDelay:      C{int}
-        @param frameDelay:      How many frames of the game should pass before switching to the next animation frame.
+        @param frameDelay:      How many ticks of the game should pass before switching to the next animation frame.
         
         @type  holdFrame:       C{int}
         @param holdFrame:       Which numbered frame to stay on when the animation completes.  If -1 the animation will
@@ -99,26 +127,22 @@ class Animation(object):
         # error check
         if (colorKey and alpha):
             raise Exception('Animation from file "' + sheetPath + '" should not have both colorKey and alpha values set.')
+        if holdFrame < -1 or holdFrame >= totalFrames:
+            raise Exception('Animation from file "' + sheetPath + '" holds frame ' + str(holdFrame) + ', but only has ' + str(totalFrames) + ' frames.')
         
-        # don't load the image multiple times
-        if Animation.loadedSpriteSheets.has_key(sheetPath):
-            self._spriteSheet = Animation.loadedSpriteSheets[sheetPath]
-        else:
-            self._spriteSheet = pygame.image.load(sheetPath)
-            Animation.loadedSpriteSheets[sheetPath] = self._spriteSheet
-            
-            # check transparency
-            if alpha:
-                self._spriteSheet.convert_alpha()
-            else:
-                self._spriteSheet.set_colorkey(colorKey)
-                self._spriteSheet.convert()
-        
-        # set up the first frame
-        self._startPos = frameRect.topleft
-        self._frame = self._spriteSheet.subsurface(frameRect)
+        # the cache makes sure the image isn't loaded multiple times
+        self._sheetPath = sheetPath
+        self._spriteSheet = AssetCache().LoadImage(sheetPath)
+        
+        # cut out the frames, or share them if another animation already has
+        self.__share_frames__(frameRect, totalFrames, colorKey, alpha)
         self._frameNum = 0
-        self._framesUntilChange = frameDelay
+        
+        # time is kept by the shared clock
+        self._clock = AnimationClock()
+        self._startTick = self._clock.Ticks
+        self._syncedTick = None
+        self._pausedTicks = 0
         
         # limits on the animation
         self._totalFrames = totalFrames
@@ -132,70 +156,201 @@ class Animation(object):
         self._stopped = True
         self._stopOnComplete = False
 
-    def GetFrame(self):
+    def GetFrame(self, transformations=None):
         """
-        Returns the current frame of animation and moves to the next frame if the animation is being played.
+        Returns the current frame of animation.  Getting the frame doesn't move the animation along, the clock does.
         
-        @rtype:            C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
-        @return:           Surface for the current frame of animation.
+        If there are transformations, the transformed frame is returned instead.  Each frame is only transformed the
+        first time it's needed, so drawing a flipped frame costs the same as drawing the original.
+        
+        @type  transformations:    C{list}
+        @param transformations:    List of tuples that are C{(function, list)} pairs, like
+                                   L{GameObject.Draw<GameObject.GameObject.Draw>} takes.  The functions are from
+                                   C{U{pygame.transform<http://www.pygame.org/docs/ref/transform.html>}}, and should always
+                                   give the same result for the same frame and parameters.
+        
+        @rtype:                    C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @return:                   Surface for the current frame of animation.
         """
-        frame = self._frame
+        self.__sync__()
         
-        # keep counting frames if we'll need to move to the next frame (looping or hasn't completed yet)
-        if self._playing and self.Looping or not self._complete:
-            self._framesUntilChange -= 1
-            # waited long enough, move to the next frame
-            if self._framesUntilChange < 0:
-                self._framesUntilChange = self._frameDelay
-                self.__increment_frame__()
+        frame = self._frames[self._frameNum]
+        if transformations:
+            frame = self.__transform_frame__(frame, self._frameNum, transformations)
         
         return frame
+    
+    def __share_frames__(self, frameRect, totalFrames, colorKey, alpha):
+        """
+        Sets up L{_frames} and L{_transformedFrames}, using the ones in L{_sharedFrames} if another Animation already has
+        the same sheet, frame rectangle and transparency, or cutting the frames out of the sheet otherwise.
         
-    def __increment_frame__(self):
+        @type  frameRect:      U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}
+        @param frameRect:      Rectangle that describes the position and dimensions of the first frame in the animation.
+        
+        @type  totalFrames:    C{int}
+        @param totalFrames:    Total number of frames in the animation.
+        
+        @type  colorKey:       C{U{pygame.Color<http://www.pygame.org/docs/ref/color.html>}}
+        @param colorKey:       What color is transparent in the sprite sheet, or C{None}.
+        
+        @type  alpha:          C{bool}
+        @param alpha:          C{True} if the sprite sheet has alpha values.
         """
-        Moves to the next frame and sets the animation as complete if passing the last frame.
+        if colorKey is not None:
+            colorKey = tuple(colorKey)
+        
+        # the shared frames keep the sheet around, so its id can't be reused while they're in use
+        key = (id(self._spriteSheet), tuple(frameRect), totalFrames, colorKey, alpha)
+        
+        shared = Animation._sharedFrames.get(key)
+        if shared is None:
+            shared = [self.__slice_frames__(frameRect, totalFrames, colorKey, alpha), {}, 0]
+            Animation._sharedFrames[key] = shared
+        shared[2] += 1
+        
+        self._framesKey = key
+        self._frames = shared[0]
+        self._transformedFrames = shared[1]
+    
+    def __slice_frames__(self, frameRect, totalFrames, colorKey, alpha):
         """
-        self._frameNum += 1
+        Cuts every frame out of the sprite sheet, making sure they're all inside of it.  The transparent color is set
+        on each frame, not on the shared sheet, so other users of the sheet aren't affected.
+        
+        @type  frameRect:      U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}
+        @param frameRect:      Rectangle that describes the position and dimensions of the first frame in the animation.
+        
+        @type  totalFrames:    C{int}
+        @param totalFrames:    Total number of frames in the animation.
         
-        # check for completion
-        if self._frameNum >= self._totalFrames:
-            self._complete = True
+        @type  colorKey:       C{(int, int, int, int)}
+        @param colorKey:       What color is transparent in the sprite sheet, or C{None}.
+        
+        @type  alpha:          C{bool}
+        @param alpha:          C{True} if the sprite sheet has alpha values.
+        
+        @rtype:                C{tuple}
+        @return:               C{(U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>})} - Subsurfaces for every
+                               frame, in order.
+        """
+        if totalFrames < 1:
+            raise Exception('Animation from file "' + self._sheetPath + '" should have at least one frame.')
+        
+        sheetRect = self._spriteSheet.get_rect()
+        frames = []
+        for frameNum in range(totalFrames):
+            rect = frameRect.move(frameRect.width * frameNum, 0)
+            if not sheetRect.contains(rect):
+                raise Exception('Animation from file "' + self._sheetPath + '" has frame ' + str(frameNum) + ' at ' + str(rect) +
+                                ', outside of the ' + str(sheetRect.size) + ' sprite sheet.')
+            frame = self._spriteSheet.subsurface(rect)
             
-            # check for loops
-            if self._stopOnComplete:
-                self.Stop()
-            elif self.Looping:
-                self._frameNum = 0
-            else:
-                self._frameNum = self._holdFrameNum
+            # check transparency
+            if not alpha:
+                frame.set_colorkey(colorKey)
+            frames.append(frame)
+        
+        return tuple(frames)
+    
+    def __transform_frame__(self, frame, frameNum, transformations):
+        """
+        Gets a frame with transformations applied to it, transforming it only if it hasn't been already.
         
-        # setup the next frame
-        self.__goto_frame__(self._frameNum)
+        @type  frame:              C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @param frame:              The frame to transform.
+        
+        @type  frameNum:           C{int}
+        @param frameNum:           Which numbered frame it is.
+        
+        @type  transformations:    C{list}
+        @param transformations:    List of tuples that are C{(function, list)} pairs.
+        
+        @rtype:                    C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @return:                   The transformed frame.
+        """
+        key = (frameNum,) + tuple([(func, tuple(params)) for func, params in transformations])
+        
+        try:
+            image = self._transformedFrames.get(key)
+        except TypeError:
+            # parameters that can't be keyed are transformed every time
+            key = None
+            image = None
+        
+        if image is None:
+            image = frame
+            for func, params in transformations:
+                image = func(*[image] + list(params))
+            
+            if key is not None:
+                self._transformedFrames[key] = image
+        
+        return image
+        
+    def __sync__(self):
+        """
+        If playing, moves to the frame the animation should be on by now, and sets it as complete if it's passed the
+        last frame.  Only worked out once per tick of the clock.
+        """
+        if not self._playing:
+            return
+        
+        ticks = self._clock.Ticks
+        if ticks == self._syncedTick:
+            return
+        self._syncedTick = ticks
+        
+        frameNum = (ticks - self._startTick) // (self._frameDelay + 1)
+        if frameNum < self._totalFrames:
+            self._frameNum = frameNum
+            return
+        
+        # passed the last frame
+        self._complete = True
+        
+        # check for loops
+        if self._stopOnComplete:
+            self.Stop()
+        elif self.Looping:
+            self._frameNum = frameNum % self._totalFrames
+        else:
+            self._frameNum = self._holdFrameNum
         
     def __goto_frame__(self, frameNum):
         """
-        Goes to the given frame and prepares it for drawing.
+        Goes to the given frame, starting it on the current tick of the clock.
         
         @type  frameNum:    C{int}
         @param frameNum:    Frame in this animation go to. 
         """
-        self._frameNum = frameNum
-        self._framesUntilChange = self._frameDelay
+        if frameNum < 0 or frameNum >= self._totalFrames:
+            raise Exception('Animation has no frame ' + str(frameNum) + ', only ' + str(self._totalFrames) + ' frames.')
         
-        frameRect = self._frame.get_rect()
+        self._frameNum = frameNum
+        self._syncedTick = self._clock.Ticks
+        self._startTick = self._syncedTick - frameNum * (self._frameDelay + 1)
+    
+    def Release(self):
+        """
+        Lets the L{AssetCache<AssetCache.AssetCache>} know this Animation is done with its sprite sheet, and stops sharing
+        its frames.  The Animation can still be drawn afterward, but the sheet may be thrown out of the cache.
+        """
+        if self._sheetPath is None:
+            return
         
-        frameRect.x = self._startPos[0] + (frameRect.width * frameNum)
-        frameRect.y = self._startPos[1]
+        shared = Animation._sharedFrames[self._framesKey]
+        shared[2] -= 1
+        if shared[2] == 0:
+            del Animation._sharedFrames[self._framesKey]
+        self._framesKey = None
         
-        try:
-            self._frame = self._spriteSheet.subsurface(frameRect)
-        except ValueError:
-            print 'lolwut'
-            
+        AssetCache().Release(self._sheetPath)
+        self._sheetPath = None
     
     def Play(self, startFrame=None):
         """
-        Plays the animation.  Each time L{GetFrame} is called, the animation will track and increment frames.  If paused,
+        Plays the animation.  While playing, the animation moves through its frames as the clock ticks.  If paused,
         this resumes the animation.
         
         @type  startFrame:    C{int}
@@ -210,6 +365,12 @@ class Animation(object):
         # start from the frame and reset delay
         if startFrame != None:
             self.__goto_frame__(startFrame)
+        elif self.Paused:
+            # pick up from the same tick it was paused on
+            self._startTick = self._clock.Ticks - self._pausedTicks
+            self._syncedTick = None
+        else:
+            self.__goto_frame__(self._frameNum)
             
         self._playing = True
         self._paused = False
@@ -224,18 +385,23 @@ class Animation(object):
     
     def Pause(self):
         """
-        Pauses the animation, so that L{GetFrame} will not increment to the next frame, but does not reset the animation.
+        Pauses the animation, so that it stays on the current frame, but does not reset the animation.
         """
-        if self.Stopped:
+        # catch up to the current tick first
+        self.__sync__()
+        
+        if self.Stopped or self.Paused:
             return
         
+        self._pausedTicks = self._clock.Ticks - self._startTick
+        
         self._paused = True
         self._playing = False
         self._stopped = False
     
     def Stop(self):
         """
-        Stops the animation, so L{GetFrame} will not increment to the next frame, and also resets the animation. 
+        Stops the animation, so it stays on the first frame, and also resets the animation. 
         """
         if self.Stopped:
             return
@@ -263,6 +429,7 @@ class Animation(object):
         self._holdFrameNum = value
         
     def __is_complete__(self):
+        self.__sync__()
         return self._complete
     def __is_playing__(self):
         return self._playing
@@ -272,6 +439,7 @@ class Animation(object):
         return self._stopped
     
     def __get_frame_num__(self):
+        self.__sync__()
         return self._frameNum
     def __set_frame_num__(self, value):
         self.__goto_frame__(value)
@@ -289,4 +457,4 @@ class Animation(object):
     Stopped = property(__is_stopped__, None, None, "C{True} if the animation is stopped, C{False} otherwise.")
     FrameNum = property(__get_frame_num__, __set_frame_num__, None, "The number of the currently active frame of animation.")
     NumAnimationFrames = property(__get_num_animation_frames__, None, None, "The number of animation frames in the animation.")
-    LoopLength = property(__get_num_total_frames__, None, None, "The number of render frames it takes to complete one full animation loop.")
\ No newline at end of file
+    LoopLength = property(__get_num_total_frames__, None, None, "The number of clock ticks it takes to complete one full animation loop.")
\ No newline at end of file
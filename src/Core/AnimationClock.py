@@ -0,0 +1,63 @@
+'''
+The time source every L{Animation<Animation.Animation>} plays by.
+
+@author: Chris Alvarado-Dryden
+'''
+
+class AnimationClock(object):
+    """
+    The time source every L{Animation<Animation.Animation>} plays by.  The clock counts simulation ticks, and is
+    L{ticked<Tick>} once at the start of each L{GameMap.Update<Map.GameMap.GameMap.Update>}.  Animations work out which
+    frame they're on from how many ticks have passed since they started playing, so they don't depend on how many times
+    (or whether) they're drawn, and every Animation started on the same tick stays in step with the others.
+    
+    This class follows the singleton design pattern.  The first call to the constructor will create a new instance,
+    but all subsequent calls will return the original instance.
+    
+    @type _instance:       C{AnimationClock}
+    @cvar _instance:       The single instance of the AnimationClock class.
+    
+    @type _initialized:    C{bool}
+    @cvar _initialized:    C{True} if the single instance of the AnimationClock has been initialized, C{False} otherwise.
+    
+    @type _ticks:          C{int}
+    @ivar _ticks:          How many simulation ticks have passed.
+    """
+    _instance = None
+    _initialized = False
+    
+    def __new__(self):
+        """
+        If no AnimationClock has been created, instantiates a new one, otherwise returns the single instance.
+        
+        @rtype:        C{AnimationClock}
+        @return:       The single instance of AnimationClock.
+        """
+        if not AnimationClock._instance:
+            AnimationClock._instance = super(AnimationClock, self).__new__(self)
+        
+        return AnimationClock._instance
+    
+    def __init__(self):
+        """
+        Initializes instance variables for the AnimationClock if it hasn't already been initialized.
+        """
+        if AnimationClock._initialized:
+            return
+        
+        self._ticks = 0
+        
+        AnimationClock._initialized = True
+    
+    def Tick(self):
+        """
+        Moves the clock forward one simulation tick.  Should only be called once per tick.
+        """
+        self._ticks += 1
+    
+    ############### PROPERTIES ###############
+    
+    def __get_ticks__(self):
+        return self._ticks
+    
+    Ticks = property(__get_ticks__, None, None, "How many simulation ticks have passed.")
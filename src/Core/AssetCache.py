@@ -0,0 +1,248 @@
+'''
+A shared cache of images loaded from files, so each file is only decoded once.
+
+@author: Chris Alvarado-Dryden
+'''
+import os
+import threading
+import pygame.image
+from collections import OrderedDict
+
+from Core import Constants
+
+class AssetCache(object):
+    """
+    A shared cache of images loaded from files, so each file is only decoded once no matter how many
+    L{Animation<Animation.Animation>}s, maps, or UI widgets use it.  Images are returned exactly as
+    U{pygame.image.load<http://www.pygame.org/docs/ref/image.html#pygame.image.load>} creates them, so anything that
+    changes them (like converting) should be done on a copy.
+    
+    Every L{LoadImage} adds a reference to the image, and L{Release} takes one away.  Images with references are always
+    kept.  Images without any are kept too, in case they're needed again, until the cache goes over its memory budget
+    (L{AssetConstants.MAX_IMAGE_BYTES<Core.Constants.AssetConstants>}).  Then the least recently used of them are thrown out.
+    
+    Images can be loaded from background threads, like the L{MapPreloader<Map.MapPreloader.MapPreloader>}'s.
+    
+    This class follows the singleton design pattern.  The first call to the constructor will create a new instance,
+    but all subsequent calls will return the original instance.
+    
+    @type _instance:       C{AssetCache}
+    @cvar _instance:       The single instance of the AssetCache class.
+    
+    @type _initialized:    C{bool}
+    @cvar _initialized:    C{True} if the single instance of the AssetCache has been initialized, C{False} otherwise.
+    
+    @type _images:         C{U{collections.OrderedDict<http://docs.python.org/library/collections.html#ordereddict-objects>}}
+    @ivar _images:         C{{str : U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}} - Loaded images keyed by
+                           absolute file path, least recently used first.
+    
+    @type _refCounts:      C{dict}
+    @ivar _refCounts:      C{{str : int}} - How many references each image in L{_images} has.
+    
+    @type _bytesUsed:      C{int}
+    @ivar _bytesUsed:      Roughly how much memory all of the images in L{_images} are using.
+    
+    @type _maxBytes:       C{int}
+    @ivar _maxBytes:       How much memory images without references can take up before they're thrown out.
+    
+    @type _lock:           C{U{threading.Lock<http://docs.python.org/library/threading.html#lock-objects>}}
+    @ivar _lock:           Keeps threads from changing the cache at the same time.
+    
+    @type _hits:           C{int}
+    @ivar _hits:           How many times a requested image was already loaded.
+    
+    @type _misses:         C{int}
+    @ivar _misses:         How many times a requested image had to be loaded from its file.
+    
+    @type _evictions:      C{int}
+    @ivar _evictions:      How many images were thrown out to stay under the memory budget.
+    """
+    _instance = None
+    _initialized = False
+    
+    def __new__(self):
+        """
+        If no AssetCache has been created, instantiates a new one, otherwise returns the single instance.
+        
+        @rtype:        C{AssetCache}
+        @return:       The single instance of AssetCache.
+        """
+        if not AssetCache._instance:
+            AssetCache._instance = super(AssetCache, self).__new__(self)
+        
+        return AssetCache._instance
+    
+    def __init__(self):
+        """
+        Initializes instance variables for the AssetCache if it hasn't already been initialized.
+        """
+        if AssetCache._initialized:
+            return
+        
+        self._images = OrderedDict()
+        self._refCounts = {}
+        self._bytesUsed = 0
+        self._maxBytes = Constants.AssetConstants.MAX_IMAGE_BYTES
+        self._lock = threading.Lock()
+        
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        
+        AssetCache._initialized = True
+    
+    def LoadImage(self, path):
+        """
+        Gets the image from the file at the given path, loading it if it isn't cached, and adds a reference to it.
+        Each call should be matched by a call to L{Release} when the image isn't needed anymore.
+        
+        @type  path:    C{str}
+        @param path:    File path to the image.
+        
+        @rtype:         C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @return:        The image, unconverted.
+        """
+        key = AssetCache.__key__(path)
+        
+        self._lock.acquire()
+        try:
+            image = self._images.pop(key, None)
+            if image is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                # move it to the most recently used end
+                self._images[key] = image
+                self._refCounts[key] += 1
+                return image
+        finally:
+            self._lock.release()
+        
+        # decode outside of the lock, so other threads aren't held up
+        image = pygame.image.load(key)
+        
+        self._lock.acquire()
+        try:
+            # another thread may have loaded it in the meantime
+            if self._images.has_key(key):
+                image = self._images[key]
+            else:
+                self._images[key] = image
+                self._refCounts[key] = 0
+                self._bytesUsed += AssetCache.__image_bytes__(image)
+            self._refCounts[key] += 1
+            
+            self.__evict__()
+        finally:
+            self._lock.release()
+        
+        return image
+    
+    def Release(self, path):
+        """
+        Takes away a reference to the image from the file at the given path.  Once an image has no references, it
+        can be thrown out when the cache needs the space.
+        
+        @type  path:    C{str}
+        @param path:    File path to the image.
+        """
+        key = AssetCache.__key__(path)
+        
+        self._lock.acquire()
+        try:
+            if self._refCounts.get(key, 0) > 0:
+                self._refCounts[key] -= 1
+                self.__evict__()
+        finally:
+            self._lock.release()
+    
+    def Clear(self):
+        """
+        Throws out every image without any references.
+        """
+        self._lock.acquire()
+        try:
+            for key in [key for key, count in self._refCounts.items() if count == 0]:
+                self.__remove__(key)
+        finally:
+            self._lock.release()
+    
+    def __evict__(self):
+        """
+        Throws out the least recently used images without references until the cache is under its memory budget.
+        Should only be called while holding L{_lock}.
+        """
+        if self._bytesUsed <= self._maxBytes:
+            return
+        
+        for key in [key for key in self._images.keys() if self._refCounts[key] == 0]:
+            if self._bytesUsed <= self._maxBytes:
+                break
+            self.__remove__(key)
+            self._evictions += 1
+    
+    def __remove__(self, key):
+        """
+        Removes an image from the cache.  Should only be called while holding L{_lock}.
+        
+        @type  key:    C{str}
+        @param key:    Absolute file path to the image.
+        """
+        image = self._images.pop(key)
+        del self._refCounts[key]
+        self._bytesUsed -= AssetCache.__image_bytes__(image)
+    
+    @staticmethod
+    def __key__(path):
+        """
+        Gets the key an image file is cached under, so different paths to the same file share an image.
+        
+        @type  path:    C{str}
+        @param path:    File path to the image.
+        
+        @rtype:         C{str}
+        @return:        The absolute file path.
+        """
+        return os.path.normcase(os.path.normpath(os.path.realpath(path)))
+    
+    @staticmethod
+    def __image_bytes__(image):
+        """
+        Estimates how much memory an image uses.
+        
+        @type  image:    C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @param image:    The image.
+        
+        @rtype:          C{int}
+        @return:         Size of the image's pixels in bytes.
+        """
+        return image.get_width() * image.get_height() * image.get_bytesize()
+    
+    ############### PROPERTIES ###############
+    
+    def __get_hits__(self):
+        return self._hits
+    def __get_misses__(self):
+        return self._misses
+    def __get_evictions__(self):
+        return self._evictions
+    def __get_bytes_used__(self):
+        return self._bytesUsed
+    def __get_max_bytes__(self):
+        return self._maxBytes
+    def __set_max_bytes__(self, value):
+        self._lock.acquire()
+        try:
+            self._maxBytes = value
+            self.__evict__()
+        finally:
+            self._lock.release()
+    def __get_num_images__(self):
+        return len(self._images)
+    
+    Hits = property(__get_hits__, None, None, "How many times a requested image was already loaded.")
+    Misses = property(__get_misses__, None, None, "How many times a requested image had to be loaded from its file.")
+    Evictions = property(__get_evictions__, None, None, "How many images were thrown out to stay under the memory budget.")
+    BytesUsed = property(__get_bytes_used__, None, None, "Roughly how much memory the cached images are using.")
+    MaxBytes = property(__get_max_bytes__, __set_max_bytes__, None, "How much memory images without references can take up before they're thrown out.")
+    NumImages = property(__get_num_images__, None, None, "How many images are cached.")
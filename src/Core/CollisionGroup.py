@@ -141,6 +141,22 @@ class CollisionGroup(object):
             collidables = collidables.union(set(group.Members))
         
         return collidables
+    
+    def CollidesWith(self, other):
+        """
+        Checks if the given Actor is a member of any group this CollisionGroup collides with.
+        
+        @type  other:    L{Actor<Actor.Actor>}
+        @param other:    Actor to check.
+        
+        @rtype:          C{bool}
+        @return:         C{True} if members of this group should check collisions against the Actor, C{False} otherwise.
+        """
+        for group in other.CollisionGroups:
+            if group in self._collidableGroups:
+                return True
+        
+        return False
 
     ############### PROPERTIES ###############
     def __get_name__(self):
@@ -13,11 +13,27 @@ class ActorConstants(object):
     MAX_Y_VELOCITY = 5000.0
     MAX_FALL_VELOCITY = 500.0
     
+    # tile collision distances closer than this are treated as equal
+    COLLISION_DISTANCE_TOLERANCE = 1e-9
+    
+    # sweep through the tile grid for tile collisions instead of intersecting line segments
+    SWEPT_TILE_COLLISIONS = False
+    
+class AssetConstants(object):
+    # images nothing is using are thrown out once all cached images take up more than this
+    MAX_IMAGE_BYTES = 64 * 1024 * 1024
+    
 class CameraConstants(object):
     BORDER_WIDTH = 4.0
     BORDER_COLOR = pygame.Color(50, 50, 50)
     GRACE_TILES = 0
     
+    # how the world view gets to the window
+    SCALE_DIRECT = 'direct'     # same size, drawn straight into the window
+    SCALE_NEAREST = 'nearest'
+    SCALE_SMOOTH = 'smooth'
+    SMOOTH_SCALE = False        # use smoothscale instead of nearest neighbor when scaling, unless the Camera says otherwise
+    
 class ControllerConstants(object):
     CONTROLLERS_XML_PATH = '../config/controllers/controller.xml'
     DPAD_UP = 'DPad Up'
@@ -38,6 +54,7 @@ class EditorConstants(object):
     MAP_PROP_GRAVITY = 'gravity'
     MAP_PROP_BACKGROUND = 'background'
     MAP_PROP_BACKGROUND_COLOR = 'background color'
+    MAP_PROP_BACKGROUND_SCROLL = 'background scroll'
     MAP_PROP_MUSIC = 'music'
     MAP_PROP_UI_FILES = 'ui files' 
     
@@ -61,6 +78,7 @@ class EditorConstants(object):
     OBJ_CAM_PROP_DISP_VIEW = 'display view'
     OBJ_CAM_PROP_ORDER = 'order'
     OBJ_CAM_PROP_UI_FILE = 'ui files'
+    OBJ_CAM_PROP_SMOOTH_SCALE = 'smooth scale'
     
     # tile properties to look for
     TILE_PROP_TYPE = 'type'
@@ -74,6 +92,13 @@ class GameConstants(object):
     MUSIC_VOLUME = 0.5
     SOUND_VOLUME = 0.5
     
+    MAX_FRAME_TIME = 0.25   # seconds of simulation a single frame can catch up on
+    
+    PRELOAD_NEXT_MAP = True # load the next map in the background while one is played
+    
+    DIRTY_RECTS = True          # only update the parts of the display that changed
+    DIRTY_AREA_THRESHOLD = 0.5  # fraction of the window that can change before the whole display is flipped
+    
     BASE_PATH = '..'    # just above src
     
 class GameObjectConstants(object):
@@ -82,6 +107,16 @@ class GameObjectConstants(object):
 class MapConstants(object):
     DEFAULT_GRAVITY = (0, 1200)
     DEFAULT_CLEAR_COLOR = pygame.Color(64, 64, 64)
+    DEFAULT_BACKGROUND_SCROLL = (1.0, 1.0)  # the background scrolls along with the world
+    
+    # static tile layers are drawn in prerendered chunks of CHUNK_TILES x CHUNK_TILES tiles
+    CHUNK_TILES = 16
+    MIN_CACHED_CHUNKS = 24  # per layer, raised to fit every chunk the cameras can see
+    CHUNK_HEADROOM = 8      # chunks cached beyond what the cameras can see, for scrolling back and forth
+    
+    # parsed maps are compiled next to their .TMX files with this extension added
+    USE_MAP_CACHE = True
+    CACHE_EXTENSION = 'c'
     
 class MenuCosntants(object):
     BUTTON_ABOVE = 'above'
@@ -104,6 +139,12 @@ class PlayerConstants(object):
     
     DEFAULT_THROW_VECTOR = Vector((800, -400))
     THROW_COOLDOWN = 1.25
+    
+class ProfilerConstants(object):
+    ENABLED = False         # time the phases of every frame, see Utilities.Profiler
+    ACTOR_SCOPES = False    # also time every Actor's update, grouped by class and State
+    WINDOW_FRAMES = 300     # frames kept for the rolling statistics
+    MAX_TRACE_EVENTS = 500000
 
 class StateConstants(object):
     # move to examples? CAD
@@ -123,3 +164,7 @@ class TileConstants(object):
     SIDE_BOTTOM = 'bottom'
     SIDE_LEFT = 'left'
     SIDE_RIGHT = 'right'
+    
+class UIConstants(object):
+    # a Panel that changes again within this many frames draws its children straight until it stays the same this long
+    BUSY_FRAMES = 30
@@ -14,7 +14,10 @@ from pygame.locals import *
 from Core import Constants
 
 from Map.GameMap import GameMap
+from Map.MapPreloader import MapPreloader
 from Utilities.Camera import Camera
+from Utilities.DirtyRects import DirtyRects
+from Utilities.Profiler import Profiler
 
 from Utilities.Controller.Controller import Controller
 
@@ -31,6 +34,18 @@ class Game(object):
                               
     @type _maxFPS:             C{int}
     @ivar _maxFPS:             Upper bound on the FPS.
+    
+    @type _tickRate:           C{int}
+    @ivar _tickRate:           Number of fixed simulation steps per second.  If C{None}, the simulation steps once per
+                               frame at C{1 / L{_maxFPS}}.
+    
+    @type _accumulator:        C{float}
+    @ivar _accumulator:        Time in seconds that has passed but has not been simulated yet.  Only used when
+                               L{_tickRate} is set.
+                               
+    @type _headless:           C{bool}
+    @ivar _headless:           C{True} if running without a visible window.  Nothing is drawn unless L{Render} is called,
+                               and the game runs as fast as it can instead of being capped at L{_maxFPS}.
                               
     @type _controllers:        C{list}
     @ivar _controllers:        All L{Controller<Utilities.Controller.Controller.Controller>}s that can receive input.
@@ -45,6 +60,11 @@ class Game(object):
     @type _mapPathDict:        C{dict}
     @ivar _mapPathDict:        C{{str : str}} -  All L{GameMap<Map.GameMap.GameMap>} file paths in the game keyed by their
                                L{FileName<Map.GameMap.GameMap.FileName>}.
+    
+    @type _preloaders:         C{dict}
+    @ivar _preloaders:         C{{str : L{MapPreloader<Map.MapPreloader.MapPreloader>}}} - Maps being loaded in the background,
+                               keyed by file path.  Each is used up when its map is played, or released when a
+                               different map is played.
                                                              
     @type _displayMenu:        L{Menu<UI.Menu.Menu.Menu>}
     @ivar _displayMenu:        Menu that is currently being displayed.  It should not be a sub-menu.
@@ -61,9 +81,12 @@ class Game(object):
     
     @type _nextControlMenu:    L{Menu<UI.Menu.Menu.Menu>}
     @ivar _nextControlMenu:    Will become the control menu at the beginning of the next frame.
+    
+    @type _shown:              C{tuple}
+    @ivar _shown:              The menu and map that were shown on the display last frame.
     """
 
-    def __init__(self, title='cadGame', iconPath=None, windowWidth=640, windowHeight=480, maxFPS=60, soundFreq=44100, soundBits=16, soundChannels=8, stereo=True, openGLMode=False):
+    def __init__(self, title='cadGame', iconPath=None, windowWidth=640, windowHeight=480, maxFPS=60, soundFreq=44100, soundBits=16, soundChannels=8, stereo=True, openGLMode=False, tickRate=None, headless=False):
         """
         Creates a Game with the given title, icon, screen dimensions, maximum FPS, and sound attributes.
         The game will be empty of any objects, but the screen, sound system, and controllers will be initialized.
@@ -99,11 +122,27 @@ class Game(object):
         
         @type  openGLMode:       C{bool}
         @param openGLMode:       C{True} if using OpenGL, C{False} if software.
+        
+        @type  tickRate:         C{int}
+        @param tickRate:         Number of fixed simulation steps per second.  Rendering is decoupled from the simulation
+                                 and runs at up to C{maxFPS}, drawing between steps with an interpolation alpha.  If
+                                 C{None}, the simulation steps once per frame and slows down when the FPS drops.
+                                 
+        @type  headless:         C{bool}
+        @param headless:         C{True} to run without a window or sound device, C{False} otherwise.  The display is
+                                 replaced with an offscreen surface of the same size, which is only drawn to by L{Render}.
         """
         
         # initialize pygame
         print 'Initializing pygame'
         
+        self._headless = headless
+        if headless:
+            # SDL reads these when the display and mixer start up
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+            openGLMode = False
+        
         if iconPath:
             icon = pygame.image.load(os.path.normpath(os.path.realpath(iconPath)))
             pygame.display.set_icon(icon)
@@ -124,7 +163,11 @@ class Game(object):
             glEnable(GL_BLEND)
             glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
         else:
-            screen = pygame.display.set_mode((windowWidth, windowHeight), 0, 0)
+            # the dummy driver picks an 8 bit display, which can't make surfaces with alpha
+            depth = 0
+            if headless:
+                depth = 32
+            screen = pygame.display.set_mode((windowWidth, windowHeight), 0, depth)
             screen.convert_alpha()
             
         pygame.init()
@@ -138,15 +181,25 @@ class Game(object):
         # so Cameras can draw to the screen and UIs work
         Camera.Initialize(screen)
         
+        # parts of an OpenGL display can't be updated on their own
+        if openGLMode:
+            DirtyRects().Enabled = False
+        self._shown = None
+        
         # to get our fps
         self._clock = pygame.time.Clock()
         self._maxFPS = maxFPS
         
+        # fixed step simulation
+        self._tickRate = tickRate
+        self._accumulator = 0.0
+        
         # the current map
         self._map = None
         
         self._mapPathList = []
         self._mapPathDict = {}
+        self._preloaders = {}
         
         # menus
         self._menuDict = {}
@@ -214,29 +267,71 @@ class Game(object):
         if self.CurrentMap:
             self.CurrentMap.StopSounds()
             self.CurrentMap.RemoveUI()
+            self.CurrentMap.ReleaseImages()
 
-        if isinstance(m, int):
-            newMapPath = self.__map_path_by_index__(m)
-        elif isinstance(m, str):
-            newMapPath = self.__map_path_by_name__(m)
-        else:
-            raise Exception('Map "' + m + '" not found.  Check that it is being loaded first.')
+        newMapPath = self.__map_path__(m)
         
         if (transferFromLastMap):
             transferMap = self.CurrentMap
         else:
             transferMap = None
+        
+        # use the map's data if it was loaded in the background, waiting for it if it's almost done
+        loaderMap, imageLoader = None, None
+        if self._preloaders.has_key(newMapPath):
+            loaderMap, imageLoader = self._preloaders.pop(newMapPath).Result()
                     
-        newMap = GameMap(newMapPath, self.Controllers, transferMap)
+        newMap = GameMap(newMapPath, self.Controllers, transferMap, loaderMap, imageLoader)
         
         if newMap.MusicLoaded:
             MusicPlayer().Play()
             
         self._map = newMap
         
+        # other maps that were preloaded won't be played now, so give their images back
+        nextMapPath = None
+        if Constants.GameConstants.PRELOAD_NEXT_MAP and self._mapPathList:
+            nextMapPath = self.__map_path__(self.__next_map_index__())
+        
+        for path in self._preloaders.keys():
+            if path != nextMapPath:
+                self._preloaders.pop(path).Release()
+        
+        # make sure the new map gets stepped before it's drawn
+        if self._tickRate:
+            self._accumulator = 1.0 / self._tickRate
+        
         # did some dirty things to restart, so try to clean it up
         gc.collect()
         
+        # get the next map ready while this one is played
+        if Constants.GameConstants.PRELOAD_NEXT_MAP:
+            self.PreloadNextMap()
+    
+    def PreloadMap(self, m):
+        """
+        Starts loading the L{GameMap<Map.GameMap.GameMap>} with the given filename or index on a background thread.
+        When it's played with L{PlayMap}, only the parts that need the display are left to do, so switching to it
+        is much faster.  Does nothing if the map is already being preloaded.  If a different map is played first, the
+        preloaded data is thrown out.
+        
+        @type  m:    C{str | int}
+        @param m:    Either a L{GameMap<Map.GameMap.GameMap>} name (C{'example.tmx'}) or index.
+        """
+        path = self.__map_path__(m)
+        
+        if not self._preloaders.has_key(path):
+            preloader = MapPreloader(path)
+            preloader.start()
+            self._preloaders[path] = preloader
+    
+    def PreloadNextMap(self):
+        """
+        Starts loading the L{GameMap<Map.GameMap.GameMap>} L{PlayNextMap} would play on a background thread.
+        """
+        if self._mapPathList:
+            self.PreloadMap(self.__next_map_index__())
+        
     def PlayNextMap(self, transferFromLastMap=False):
         """
         Plays the next L{GameMap<Map.GameMap.GameMap>} in the order they were loaded.
@@ -244,12 +339,7 @@ class Game(object):
         @type  transferFromLastMap:    C{bool}
         @param transferFromLastMap:    C{True} if the previous map should be used to transfer object data from, C{False} otherwise.
         """
-        if self.CurrentMap:
-            currentIndex = self._mapPathList.index(self.CurrentMap.FilePath)
-            nextIndex = (currentIndex + 1) % len(self._mapPathList)
-        else:
-            nextIndex = 0
-        self.PlayMap(nextIndex, transferFromLastMap)
+        self.PlayMap(self.__next_map_index__(), transferFromLastMap)
         
     def LoadMenu(self, path, controllers):
         """
@@ -358,28 +448,72 @@ class Game(object):
             - gather input
             - update logic
             - draw
+            
+        If a tick rate was given to the L{constructor<Game.__init__>}, the logic is updated in fixed steps
+        and as many steps are taken as needed to catch up with real time, see L{__run_map_fixed_step__}.
+        
+        When headless, nothing is drawn and the loop doesn't wait on the clock, see L{__run_headless__}.
+        
+        Only the parts of the display that changed are updated each frame, see L{__update_display__}.
+        
+        Each phase of the frame is timed by the L{Profiler<Utilities.Profiler.Profiler>} when it is enabled.
         """
         quit = False
+        profiler = Profiler()
+        
+        if self._headless:
+            self.__run_headless__()
+            return
         
         while (not quit):
-            dt = self._clock.tick(self._maxFPS) / 1000.0
+            frameTime = self._clock.tick(self._maxFPS) / 1000.0
             #print 'FPS :', self._clock.get_fps()
             
+            # the wait for the clock isn't part of the frame
+            profiler.BeginFrame()
+            
+            # what's on the display this frame, before any menu or map changes
+            shown = (self.CurrentMenu, self.CurrentMap)
+            
             # when FPS drops, this creates slow down instead of dropped frames
             dt = 1.0 / self._maxFPS
             
             # alternate keyboard processing - cad
             keyboardInput = pygame.key.get_pressed()
+            
+            if (self.CurrentMap and not self.CurrentMenu and self._tickRate):
+                # have all our events to process, clear the rest out to prevent overflow
+                pygame.event.clear()
+                
+                self.__run_map_fixed_step__(frameTime, keyboardInput)
+                
+                profiler.Begin('display flip')
+                self.__update_display__(shown)
+                profiler.End()
+                
+                profiler.EndFrame()
+                
+                # check for a quit
+                quit = self.__check_quit__()
+                continue
+            
+            profiler.Begin('controllers')
             for controller in self.Controllers:
                 controller.UpdateKeys(keyboardInput)
+            profiler.End()
             
             # have all our events to process, clear the rest out to prevent overflow
             pygame.event.clear()
             
             if (self.CurrentMenu):
                 # do menu stuff
-                self.CurrentMenu.Update(dt)                
+                profiler.Begin('menu update')
+                self.CurrentMenu.Update(dt)
+                profiler.End()
+                
+                profiler.Begin('menu draw')
                 self.CurrentMenu.DrawTo(Camera.windowSurf)
+                profiler.End()
 
                 # check if we should switch menus
                 if self._nextControlMenu != self._controlMenu:
@@ -401,17 +535,197 @@ class Game(object):
                 self.CheckPause()
                 self.CheckMapEnd()
                 
-            pygame.display.flip()
+            profiler.Begin('display flip')
+            self.__update_display__(shown)
+            profiler.End()
+            
+            profiler.EndFrame()
 
             # check for a quit
-            if pygame.event.get(QUIT):
-                quit = True
-            else:
+            quit = self.__check_quit__()
+            
+    def __update_display__(self, shown):
+        """
+        Sends everything drawn this frame to the display.  Only the parts of the window that changed are updated
+        (see L{DirtyRects<Utilities.DirtyRects.DirtyRects>}), unless a different menu or map is shown than last frame,
+        then the entire display is flipped.
+        
+        @type  shown:    C{tuple}
+        @param shown:    The L{Menu<UI.Menu.Menu.Menu>} and L{GameMap<Map.GameMap.GameMap>} shown this frame.
+        """
+        dirtyRects = DirtyRects()
+        if shown != self._shown:
+            dirtyRects.MarkAll()
+            self._shown = shown
+        
+        dirtyRects.Flip()
+        
+    def __run_map_fixed_step__(self, frameTime, keyboardInput):
+        """
+        Advances the current L{GameMap<Map.GameMap.GameMap>} by as many fixed steps as fit in the time that has passed,
+        then draws it once, interpolated between the last two steps.  Frame time is capped at
+        L{GameConstants.MAX_FRAME_TIME<Core.Constants.GameConstants.MAX_FRAME_TIME>} so a long stall doesn't
+        keep the game stepping to catch up.
+        
+        Controllers are updated once per step so presses are seen by exactly one step.  Pauses and map
+        changes are checked after every step, and stop the remaining steps for this frame.
+        
+        @type  frameTime:        C{float}
+        @param frameTime:        Time in seconds since the last frame refresh.
+        
+        @type  keyboardInput:    C{list}
+        @param keyboardInput:    Key states from C{U{pygame.key.get_pressed<http://www.pygame.org/docs/ref/key.html#pygame.key.get_pressed>}}.
+        """
+        step = 1.0 / self._tickRate
+        self._accumulator += min(frameTime, Constants.GameConstants.MAX_FRAME_TIME)
+        
+        gameMap = self.CurrentMap
+        profiler = Profiler()
+        
+        while self._accumulator >= step:
+            profiler.Begin('controllers')
+            for controller in self.Controllers:
+                controller.UpdateKeys(keyboardInput)
+            profiler.End()
+                
+            gameMap.Update(step)
+            self._accumulator -= step
+            
+            self.CheckPause()
+            self.CheckMapEnd()
+            
+            if self.CurrentMenu or self.CurrentMap is not gameMap:
+                break
+        
+        # a new map hasn't been stepped yet, draw it next frame
+        if self.CurrentMap is gameMap:
+            gameMap.Draw(self._accumulator / step)
+            
+    def __run_headless__(self):
+        """
+        Runs the update loop without drawing until a C{Quit} C{U{event<http://www.pygame.org/docs/ref/event.html>}}
+        is encountered or there is nothing left to update.  Each pass is a single step of L{StepTime}, no matter
+        how long it took.
+        """
+        dt = self.StepTime
+        profiler = Profiler()
+        
+        while (self.CurrentMap or self.CurrentMenu):
+            keyboardInput = pygame.key.get_pressed()
+            pygame.event.clear()
+            
+            if (self.CurrentMenu):
+                profiler.BeginFrame()
+                
                 for controller in self.Controllers:
-                    if controller.HasButton(Constants.ControllerConstants.QUIT_BUTTON) and controller.Button(Constants.ControllerConstants.QUIT_BUTTON).Down:
-                        quit = True
-                        break
+                    controller.UpdateKeys(keyboardInput)
+                    
+                self.CurrentMenu.Update(dt)
                 
+                # check if we should switch menus
+                if self._nextControlMenu != self._controlMenu:
+                    self._controlMenu.SwitchControlTo(self._nextControlMenu.Name)
+                    self._controlMenu.OnExit()
+                    self._nextControlMenu.OnEnter()
+                
+                self.CurrentMenu = self._nextDisplayMenu
+                self._controlMenu = self._nextControlMenu
+                
+                profiler.EndFrame()
+            else:
+                # each step is its own frame
+                self.Simulate(1, keyboardInput)
+                self.CheckPause()
+            
+            if self.__check_quit__():
+                break
+            
+    def Simulate(self, ticks, keyboardInput=None):
+        """
+        Updates the current L{GameMap<Map.GameMap.GameMap>} the given number of times, each a step of L{StepTime},
+        without drawing or waiting on the clock.  This is meant for headless runs, like bots, balancing and soak tests.
+        
+        If C{keyboardInput} is given, every L{Controller<Utilities.Controller.Controller.Controller>} is updated with it
+        before each step.  Otherwise the Controllers are left alone, so they can be driven directly between calls.
+        
+        Stops early if the map ends in a menu, and carries on in the new map if it switches maps.
+        
+        Each step is a frame for the L{Profiler<Utilities.Profiler.Profiler>}.
+        
+        @type  ticks:            C{int}
+        @param ticks:            Number of steps to take.
+        
+        @type  keyboardInput:    C{list}
+        @param keyboardInput:    Boolean key states for each keyboard key, in the form
+                                 C{U{pygame.key.get_pressed<http://www.pygame.org/docs/ref/key.html#pygame.key.get_pressed>}}
+                                 returns.
+        
+        @rtype:                  C{int}
+        @return:                 Number of steps actually taken.
+        """
+        dt = self.StepTime
+        profiler = Profiler()
+        
+        for tick in range(ticks):
+            if (self.CurrentMenu or not self.CurrentMap):
+                return tick
+            
+            profiler.BeginFrame()
+            
+            if keyboardInput != None:
+                profiler.Begin('controllers')
+                for controller in self.Controllers:
+                    controller.UpdateKeys(keyboardInput)
+                profiler.End()
+            
+            self.CurrentMap.Update(dt)
+            self.CheckMapEnd()
+            
+            profiler.EndFrame()
+            
+        return ticks
+    
+    def Render(self):
+        """
+        Draws the current L{Menu<UI.Menu.Menu.Menu>} or L{GameMap<Map.GameMap.GameMap>} to the
+        L{window surface<Utilities.Camera.Camera.windowSurf>} and returns it.  When headless this is the only
+        time anything is drawn, and the surface is offscreen.
+        
+        Each render is a frame for the L{Profiler<Utilities.Profiler.Profiler>}.
+        
+        @rtype:     C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @return:    The surface everything was drawn to.
+        """
+        profiler = Profiler()
+        profiler.BeginFrame()
+        
+        if (self.CurrentMenu):
+            profiler.Begin('menu draw')
+            self.CurrentMenu.DrawTo(Camera.windowSurf)
+            profiler.End()
+        elif (self.CurrentMap):
+            self.CurrentMap.Draw()
+        
+        profiler.EndFrame()
+        
+        return Camera.windowSurf
+            
+    def __check_quit__(self):
+        """
+        Checks for a C{Quit} C{U{event<http://www.pygame.org/docs/ref/event.html>}} or a held
+        quit button on any L{Controller<Utilities.Controller.Controller.Controller>}.
+        
+        @rtype:          C{bool}
+        @return:         C{True} if the game should quit, C{False} otherwise.
+        """
+        if pygame.event.get(QUIT):
+            return True
+        
+        for controller in self.Controllers:
+            if controller.HasButton(Constants.ControllerConstants.QUIT_BUTTON) and controller.Button(Constants.ControllerConstants.QUIT_BUTTON).Down:
+                return True
+            
+        return False
 
     def CheckPause(self):
         """
@@ -425,6 +739,35 @@ class Game(object):
         """
         return
 
+    def __next_map_index__(self):
+        """
+        Gets the index of the map after the current one, in the order they were loaded.
+        
+        @rtype:          C{int}
+        @return:         Index of the next map, 0 if there isn't a current map.
+        """
+        if self.CurrentMap:
+            currentIndex = self._mapPathList.index(self.CurrentMap.FilePath)
+            return (currentIndex + 1) % len(self._mapPathList)
+        return 0
+    
+    def __map_path__(self, m):
+        """
+        Gets the map file path by its filename or its position in the map list.
+        
+        @type  m:        C{str | int}
+        @param m:        Either a L{GameMap<Map.GameMap.GameMap>} name (C{'example.tmx'}) or index.
+        
+        @rtype:          C{str}
+        @return:         The file path to the specified map.
+        """
+        if isinstance(m, int):
+            return self.__map_path_by_index__(m)
+        elif isinstance(m, str):
+            return self.__map_path_by_name__(m)
+        else:
+            raise Exception('Map "' + m + '" not found.  Check that it is being loaded first.')
+    
     def __map_path_by_index__(self, index):
         """
         Gets the map file path by its position in the map list.
@@ -475,6 +818,14 @@ class Game(object):
     def __get_controllers__(self):
         return self._controllers
     
+    def __get_step_time__(self):
+        if self._tickRate:
+            return 1.0 / self._tickRate
+        return 1.0 / self._maxFPS
+    
+    def __get_headless__(self):
+        return self._headless
+    
     def __get_map__(self):
         return self._map
     def __set_map__(self, value):
@@ -487,4 +838,6 @@ class Game(object):
         
     Controllers = property(__get_controllers__, None, None, "A C{list} of L{Controller<Utilities.Controller.Controller.Controller>}s that can input to the game.")
     CurrentMap = property(__get_map__, __set_map__, None, "Current L{GameMap<GameMap.GameMap>} being played.")
-    CurrentMenu = property(__get_current_menu__, __set_current_menu__, None, "Currently active L{Menu<UI.Menu.Menu.Menu>}.")
\ No newline at end of file
+    CurrentMenu = property(__get_current_menu__, __set_current_menu__, None, "Currently active L{Menu<UI.Menu.Menu.Menu>}.")
+    StepTime = property(__get_step_time__, None, None, "Time in seconds that a single update of the game logic covers.")
+    Headless = property(__get_headless__, None, None, "C{True} if running without a visible window, C{False} otherwise.")
\ No newline at end of file
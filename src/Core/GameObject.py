@@ -204,6 +204,16 @@ class GameObject(object):
         """  
         self._animationQueue.append(self._animations[animationName])
         
+    def __advance_animation_queue__(self):
+        """
+        If the L{Animation<Animation.Animation>} at the front of the queue has completed and there's another one queued
+        behind it, stops it and plays the next one.
+        """
+        if len(self._animationQueue) > 1 and self._animationQueue[0].Completed:
+            oldAnim = self._animationQueue.popleft()
+            oldAnim.Stop()
+            self._animationQueue[0].Play()
+    
     def PlaySound(self, soundName):
         """
         Plays the GameObject's L{Sound<Sound.Sound>} with the given name.  If the GameObject is already playing
@@ -269,6 +279,14 @@ class GameObject(object):
         for sound in self._playingSounds:
             sound.Play()
 
+    def ReleaseImages(self):
+        """
+        Releases the sprite sheets of all of this GameObject's L{Animation<Animation.Animation>}s back to the
+        L{AssetCache<AssetCache.AssetCache>}.  Should be called when the GameObject is no longer used.
+        """
+        for anim in self._animations.values():
+            anim.Release()
+    
     def Draw(self, cameras, transformations=[], debug=False):
         """
         Sends the GameObject's image to each L{Camera<Utilities.Camera.Camera>}to be drawn if it is within
@@ -300,13 +318,14 @@ class GameObject(object):
         image = self.image
         
         # default draw to the top left of bounding box
-        drawPoint = self.Position
+        position = self.DrawPosition
+        drawPoint = position
         if (self._drawPoint):
             drawPoint = self._drawPoint
         
         if debug:
             # debug mode is the bounding box
-            drawPoint = self.Position
+            drawPoint = position
             # load an image for bounding box once
             if self._debugImage == None:
                 self._debugImage = pygame.Surface((self.Width, self.Height))
@@ -318,14 +337,13 @@ class GameObject(object):
             # going to play some animations
             if(len(self._animationQueue) > 0):
                 # which one to play?
-                if self._animationQueue[0].Completed and len(self._animationQueue) > 1:
-                    oldAnim = self._animationQueue.popleft()
-                    oldAnim.Stop()
-                    self._animationQueue[0].Play()
+                self.__advance_animation_queue__()
                 
-                image = self._animationQueue[0].GetFrame()
+                # the animation keeps its transformed frames, so they aren't transformed every time
+                image = self._animationQueue[0].GetFrame(transformations)
+                transformations = []
                 # draw it a the right place
-                drawPoint = self.Position + self._drawOffsets[self._animationQueue[0]]
+                drawPoint = position + self._drawOffsets[self._animationQueue[0]]
             else:
                 image = self.image
             
@@ -364,6 +382,11 @@ class GameObject(object):
         @type pos:    C{(int, int)} | L{Vector<Utilities.vector.Vector>}
         """
         self.boundingBox.topleft = (round(pos[0], 0), round(pos[1], 0))
+    def __get_draw_position__(self):
+        """
+        @rtype:    C{(int, int)}
+        """
+        return self.boundingBox.topleft
     def __get_center__(self):
         """
         @rtype:    C{(int, int)}
@@ -405,6 +428,7 @@ class GameObject(object):
         return self._layer
     
     Position = property(__get_position__, __set_position__, None, "Bounding box's upper left corner in world coordinates.")
+    DrawPosition = property(__get_draw_position__, None, None, "Where the bounding box's upper left corner should be drawn in world coordinates.")
     Center = property(__get_center__, __set_center__, None, "Bounding box's center in world coordinates.")
     Width = property(__get_width__, None, None, "Bounding box's width in pixels.")
     Height = property(__get_height__, None, None, "Bounding box's height in pixels.")
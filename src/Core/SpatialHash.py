@@ -0,0 +1,167 @@
+'''
+A uniform grid used to quickly find the objects near an area of the world.
+
+@author: Chris Alvarado-Dryden
+'''
+
+class SpatialHash(object):
+    """
+    A uniform grid used to quickly find the objects near an area of the world.  The world is split into cells of
+    equal size, and each object is filed under every cell its bounding box overlaps.  Finding what is near an
+    area only means looking in the cells that area overlaps, instead of at every object.
+    
+    Objects are not tracked automatically, so L{Update} has to be called after an object moves.  Any object with
+    a C{boundingBox} (a U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}) can be stored.
+    
+    @type _cellWidth:      C{int}
+    @ivar _cellWidth:      Width of each cell in pixels.
+    
+    @type _cellHeight:     C{int}
+    @ivar _cellHeight:     Height of each cell in pixels.
+    
+    @type _cells:          C{dict}
+    @ivar _cells:          C{{(int, int) : set}} - The objects in each cell, keyed by cell index.  Empty cells are removed.
+    
+    @type _objectRanges:   C{dict}
+    @ivar _objectRanges:   C{{object : (int, int, int, int)}} - The left, top, right and bottom cell indexes (inclusive) each
+                           object was last filed under.
+    """
+    
+    def __init__(self, cellWidth, cellHeight):
+        """
+        Creates an empty SpatialHash with cells of the given size.  Usually the size of the map's tiles.
+        
+        @type  cellWidth:     C{int}
+        @param cellWidth:     Width of each cell in pixels.
+        
+        @type  cellHeight:    C{int}
+        @param cellHeight:    Height of each cell in pixels.
+        """
+        self._cellWidth = cellWidth
+        self._cellHeight = cellHeight
+        
+        self._cells = {}
+        self._objectRanges = {}
+    
+    def Update(self, obj):
+        """
+        Files the given object under the cells its bounding box currently overlaps.  If it isn't in the
+        SpatialHash yet, it is added.
+        
+        @type  obj:    L{GameObject<Core.GameObject.GameObject>}
+        @param obj:    The object to add or refresh.
+        """
+        cellRange = self.__cell_range__(obj.boundingBox)
+        oldRange = self._objectRanges.get(obj)
+        
+        # most updates don't leave the cells the object is already in
+        if cellRange == oldRange:
+            return
+        
+        if oldRange:
+            self.__remove_from_cells__(obj, oldRange)
+        
+        left, top, right, bottom = cellRange
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                cell = self._cells.get((x, y))
+                if cell is None:
+                    cell = self._cells[(x, y)] = set()
+                cell.add(obj)
+        
+        self._objectRanges[obj] = cellRange
+    
+    def Remove(self, obj):
+        """
+        Removes the given object from the SpatialHash.
+        
+        @type  obj:    L{GameObject<Core.GameObject.GameObject>}
+        @param obj:    The object to remove.
+        """
+        oldRange = self._objectRanges.pop(obj, None)
+        if oldRange:
+            self.__remove_from_cells__(obj, oldRange)
+    
+    def Query(self, rect, margin=0):
+        """
+        Gets all of the objects filed under the cells the given rectangle overlaps.  These are only candidates, and
+        may not actually overlap the rectangle.
+        
+        @type  rect:      C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}
+        @param rect:      The area of the world to look in.
+        
+        @type  margin:    C{int}
+        @param margin:    Number of extra cells to look in around the rectangle on each side.
+        
+        @rtype:           C{set}
+        @return:          Objects near the rectangle.
+        """
+        left, top, right, bottom = self.__cell_range__(rect)
+        
+        found = set()
+        for x in range(left - margin, right + margin + 1):
+            for y in range(top - margin, bottom + margin + 1):
+                cell = self._cells.get((x, y))
+                if cell:
+                    found.update(cell)
+        
+        return found
+    
+    def __cell_range__(self, rect):
+        """
+        Gets the range of cells the given rectangle overlaps.
+        
+        @type  rect:      C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}
+        @param rect:      The area of the world.
+        
+        @rtype:           C{(int, int, int, int)}
+        @return:          The left, top, right and bottom cell indexes, inclusive.
+        """
+        # right and bottom are outside of the rect, so step back a pixel
+        left = rect.left // self._cellWidth
+        top = rect.top // self._cellHeight
+        right = max(rect.right - 1, rect.left) // self._cellWidth
+        bottom = max(rect.bottom - 1, rect.top) // self._cellHeight
+        
+        return (left, top, right, bottom)
+    
+    def __remove_from_cells__(self, obj, cellRange):
+        """
+        Removes the given object from every cell in the range, and throws out any cells left empty.
+        
+        @type  obj:          L{GameObject<Core.GameObject.GameObject>}
+        @param obj:          The object to remove.
+        
+        @type  cellRange:    C{(int, int, int, int)}
+        @param cellRange:    The left, top, right and bottom cell indexes, inclusive.
+        """
+        left, top, right, bottom = cellRange
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                cell = self._cells.get((x, y))
+                if cell is not None:
+                    cell.discard(obj)
+                    if not cell:
+                        del self._cells[(x, y)]
+    
+    def __contains__(self, obj):
+        """
+        Checks if the given object is in the SpatialHash.
+        
+        @type  obj:    L{GameObject<Core.GameObject.GameObject>}
+        @param obj:    The object to look for.
+        
+        @rtype:        C{bool}
+        @return:       C{True} if the object is in the SpatialHash, C{False} otherwise.
+        """
+        return obj in self._objectRanges
+    
+    ############### PROPERTIES ###############
+    
+    def __get_cell_width__(self):
+        return self._cellWidth
+    def __get_cell_height__(self):
+        return self._cellHeight
+    
+    CellWidth = property(__get_cell_width__, None, None, "Width of each cell in pixels.")
+    CellHeight = property(__get_cell_height__, None, None, "Height of each cell in pixels.")
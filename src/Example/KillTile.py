@@ -65,6 +65,10 @@ class KillTile(GameTile):
         self.PlaySound('bounce')
         self.QueueAnimation('up')
         """
+        # only actors that can die, like players, are sent back
+        if not other.HasState('dead'):
+            return
+        
         other.RespawnPosition = self._respawnPos
         other.RespawnFacingRight = self._respawnRight
         other.ChangeState('dead')
@@ -29,8 +29,10 @@ class PlatformerActor(Actor):
     @type _facingRight:           C{bool}
     @ivar _facingRight:           C{True} if facing toward the right, C{False} otherwise.
     """
-
-
+    
+    # facing left is drawn flipped, the same transformation every time so animations can keep the flipped frames
+    _flipLeft = (pygame.transform.flip, (True, False))
+    
     def __init__(self, position, width, height, name, collisionGroupNames, transferName, stateMappings, startStateName, image=None, animationMappings=None, soundMappings=None):
         '''
         Constructor
@@ -76,6 +78,7 @@ class PlatformerActor(Actor):
         @param other:    GameObject this object is colliding with.
         """
         from Example.BounceTile import BounceTile
+        from Example.KillTile import KillTile
         if isinstance(other, BounceTile):
             self.Velocity += other.BounceVelocity
         
@@ -103,7 +106,12 @@ class PlatformerActor(Actor):
         if (self.boundingBox.topleft == previousBB.topleft):
             return
         
-        sideTiles, aboveBelowTiles = Actor.__get_colliding_tiles__(self, collisionLayer)
+        if self._sweptCollisions:
+            # find special tiles along the whole sweep, so fast Actors can't skip over them
+            # the swept resolver reuses this sweep, it isn't swept again
+            sideTiles, aboveBelowTiles = Actor.__get_swept_tiles__(self, previousBB, collisionLayer)[1:]
+        else:
+            sideTiles, aboveBelowTiles = Actor.__get_colliding_tiles__(self, collisionLayer)
         
         # prioritize and resolve collisions if there are any
         # CAD - optimization breaks falling
@@ -165,11 +173,7 @@ class PlatformerActor(Actor):
     def Draw(self, cameras, transformations=[], debug=False):
         # assume the sprite is facing to the right
         if self.FacingLeft:
-            if not transformations:
-                transformations = []
-            func = pygame.transform.flip
-            params = [True, False]
-            transformations.append((func, params))
+            transformations = list(transformations) + [PlatformerActor._flipLeft]
         Actor.Draw(self, cameras, transformations, debug)
     
     ############### PROPERTIES ###############
@@ -17,8 +17,13 @@ class PlatformerNPC(PlatformerActor):
     
     This actor does nothing but stand in place (it can fall too).  It demonstrates the basic L{State<States.State.State>} actors should
     have (idle, fall, land).  Additionally, it has the L{BlinkEffect} applied when it is created.
+    
+    @type SheetPath:    C{str}
+    @cvar SheetPath:    File path to the sprite sheet every PlatformerNPC's animations are cut from.
     """
     
+    SheetPath = '../content/gfx/sprites/HulkGreen.png'
+    
     def __init__(self, position, width=20, height=30, name='', collisionGroupNames=None, transferName='', image=None):
         """
         Standard constructor takes in position and can override width and height.
@@ -42,12 +47,15 @@ class PlatformerNPC(PlatformerActor):
         # animation
         # list of tuples ('name', Animation, draw offset)
         animationMappings = []
-        animationMappings.append(('idle', Animation('../content/gfx/sprites/HulkGreen.png', pygame.Rect((0, 0, 160, 124)), 8, 3, -1, pygame.Color(49, 115, 255)), Vector((-60, -80))))
-        animationMappings.append(('fall', Animation('../content/gfx/sprites/HulkGreen.png', pygame.Rect((0, 247, 130, 225)), 2, 3, -1, pygame.Color(49, 115, 255)), Vector((-54, -180))))
-        animationMappings.append(('land', Animation('../content/gfx/sprites/HulkGreen.png', pygame.Rect((0, 127, 140, 120)), 4, 3, 3, pygame.Color(49, 115, 255)), Vector((-54, -80 + 4))))
+        animationMappings.append(('idle', Animation(PlatformerNPC.SheetPath, pygame.Rect((0, 0, 160, 124)), 8, 3, -1, pygame.Color(49, 115, 255)), Vector((-60, -80))))
+        animationMappings.append(('fall', Animation(PlatformerNPC.SheetPath, pygame.Rect((0, 247, 130, 225)), 2, 3, -1, pygame.Color(49, 115, 255)), Vector((-54, -180))))
+        animationMappings.append(('land', Animation(PlatformerNPC.SheetPath, pygame.Rect((0, 127, 140, 120)), 4, 3, 3, pygame.Color(49, 115, 255)), Vector((-54, -80 + 4))))
         
         self.color = pygame.Color(0, 0, 0)
         
+        # bounding box image, reused every draw
+        self._boxImage = None
+        
         PlatformerActor.__init__(self, position, width, height, name, collisionGroupNames, transferName, [('idle', NPCIdle(self)), ('fall', NPCFall(self)), ('land', NPCLand(self))], 'fall', image, animationMappings)
         
         
@@ -66,11 +74,13 @@ class PlatformerNPC(PlatformerActor):
         # draw animation
         PlatformerActor.Draw(self, cameras)
         
-        # then the bounding box with state colors
+        # then the bounding box with state colors, only making a new image when the box changes size
         self._drawPoint = None
-        self.image = pygame.Surface((self.boundingBox.width, self.boundingBox.height))
-        self.image = self.image.convert_alpha()
-        self.image.fill(self.color)
+        if self._boxImage is None or self._boxImage.get_size() != self.boundingBox.size:
+            self._boxImage = pygame.Surface(self.boundingBox.size)
+            self._boxImage = self._boxImage.convert_alpha()
+        self._boxImage.fill(self.color)
+        self.image = self._boxImage
         
         from Core.GameObject import GameObject
         GameObject.Draw(self, cameras, [], True)
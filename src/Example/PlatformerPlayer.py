@@ -57,7 +57,7 @@ class PlatformerPlayer(PlatformerActor, Player):
         animationMappings = []
         animationMappings.append(('idle', Animation(sheetPath, pygame.Rect((0, 0, 45, 96)), 17, 4, -1, clearColor, alpha), Vector((-7, 0))))
         animationMappings.append(('run', Animation(sheetPath, pygame.Rect((0, 110, 100, 100)),  8, 1, -1, clearColor, alpha), Vector((-32, 0))))
-        animationMappings.append(('launch', Animation(sheetPath, pygame.Rect((0, 218, 69, 94)), 1, 1, 1, clearColor, alpha), Vector((0, 0))))
+        animationMappings.append(('launch', Animation(sheetPath, pygame.Rect((0, 218, 69, 94)), 1, 1, 0, clearColor, alpha), Vector((0, 0))))
         animationMappings.append(('jump', Animation(sheetPath, pygame.Rect((0, 321, 66, 107)), 2, 3, -1, clearColor, alpha), Vector((-18, 0))))
         animationMappings.append(('fall', Animation(sheetPath, pygame.Rect((0, 430, 81, 105)), 4, 3, -1, clearColor, alpha), Vector((-25, 0))))
         animationMappings.append(('land', Animation(sheetPath, pygame.Rect((0, 535, 76, 96)), 2, 1, 1, clearColor, alpha), Vector((-25, 0))))
@@ -115,6 +115,8 @@ class PlatformerPlayer(PlatformerActor, Player):
         
         
         self._drawDebug = False
+        self._debugBoxImage = None
+        self._debugThrowImage = None
         
     def GetThrowCoolDown(self):
         return self._throwCoolDown
@@ -212,8 +214,8 @@ class PlatformerPlayer(PlatformerActor, Player):
             from Core.GameObject import GameObject
             
             #bounding box
-            self.image = pygame.Surface((self.boundingBox.width, self.boundingBox.height))
-            self.image = self.image.convert_alpha()
+            self._debugBoxImage = self.__debug_image__(self._debugBoxImage, self.boundingBox.size)
+            self.image = self._debugBoxImage
             self._color.a = 200
             self.image.fill(self._color)
             GameObject.Draw(self, cameras, [], True)
@@ -221,16 +223,39 @@ class PlatformerPlayer(PlatformerActor, Player):
             
             #throw box
             
-            self.image = pygame.Surface((self.ThrowBox.width, self.ThrowBox.height))
+            self._debugThrowImage = self.__debug_image__(self._debugThrowImage, self.ThrowBox.size)
+            self.image = self._debugThrowImage
             bbox = self.boundingBox
             self.boundingBox = self.ThrowBox
-            self.image = self.image.convert_alpha()
+            
+            # the throw box moves with the player, so it's drawn between the same two steps
+            prevPosition = self._prevPosition
+            self._prevPosition = (prevPosition[0] + self.ThrowBox.left - bbox.left, prevPosition[1] + self.ThrowBox.top - bbox.top)
             self._color.a = 200
             self.image.fill(pygame.Color(200, 0, 200, 200))
             GameObject.Draw(self, cameras, [], True)
             
             # reset bounding/throw box
             self.boundingBox = bbox
+            self._prevPosition = prevPosition
+            
+    def __debug_image__(self, image, size):
+        """
+        Gets an image for drawing a debug box of the given size, reusing the given image if it's already that size.
+        
+        @type  image:    C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @param image:    The image used for the box last time, or C{None}.
+        
+        @type  size:     C{(int, int)}
+        @param size:     Width and height of the box.
+        
+        @rtype:          C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @return:         An image of the given size, to be filled.
+        """
+        if image is None or image.get_size() != size:
+            image = pygame.Surface(size)
+            image = image.convert_alpha()
+        return image
             
         
     def __get_win__(self):
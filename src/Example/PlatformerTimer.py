@@ -9,7 +9,8 @@ import os, pygame
 
 class PlatformerTimer(UI.Text.Text):
     """
-    A text count up/down timer.
+    A text count up/down timer.  The digits are put together from a L{GlyphAtlas<UI.GlyphAtlas.GlyphAtlas>}, and the
+    text only changes when the shown time does.
     """
     @staticmethod
     def AttributesToParameters(attrs, basePath, map):
@@ -77,6 +78,12 @@ class PlatformerTimer(UI.Text.Text):
         self._leading = leading
         self._decimals = decimals
         
+        # smallest shown unit of time the text was last made for
+        self._shownUnits = None
+        
+        # the text changes every few frames, so don't render the font every time
+        self.UseGlyphs = True
+        
     def Update(self, dt):
         """
         
@@ -86,8 +93,17 @@ class PlatformerTimer(UI.Text.Text):
         else:
             self.Time -= dt
 
-        # truncate the time instead of rounding it
-        s = str(self.Time)
+        # truncate the time instead of rounding it, once float error is rounded off
+        units = int(round(self.Time * 10 ** self._decimals, 6))
+        if units == self._shownUnits:
+            return
+        self._shownUnits = units
+        
+        # build the number without str(float), which can switch to exponents
+        i, d = divmod(abs(units), 10 ** self._decimals)
+        s = str(i) + '.' + str(d).zfill(self._decimals)
+        if units < 0 or (units == 0 and self.Time < 0):
+            s = '-' + s
         s = self.__format_float__(s, self._leading, self._decimals)
         
         self.Text = s
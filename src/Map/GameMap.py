@@ -3,16 +3,24 @@ A map created using U{Tiled<http://mapeditor.org/>} (Java version 0.7.2 supporte
 
 @author: Chris Alvarado-Dryden
 """
+import math
+
 from Core import Constants
 import pygame.image
 import Utilities.HelperFunctions
 
 from Map.GameTileLayer import GameTileLayer
 from Map.GameObjectLayer import GameObjectLayer
+from Map.MapCache import MapCache
 from Utilities.tiledtmxloader import *
 from Utilities.vector import Vector
 from Core.Player import Player
+from Core.SpatialHash import SpatialHash
+from Core.AnimationClock import AnimationClock
+from Core.AssetCache import AssetCache
+from Core.GameObject import GameObject
 from Utilities.Camera import Camera
+from Utilities.Profiler import Profiler
 from Core.MusicPlayer import MusicPlayer
 from UI.Panel import Panel
 
@@ -64,12 +72,30 @@ class GameMap(object):
     @ivar _collisionGroups:         C{{str : L{CollisionGroup<CollisionGroup.CollisionGroup>}}} - All collision groups in
                                     the map, keyed by their names.
     
+    @type _spatialHash:             L{SpatialHash<Core.SpatialHash.SpatialHash>}
+    @ivar _spatialHash:             Every L{Actor<Actor.Actor>} in a collision group, filed by position so they only check
+                                    collisions against their neighbors.  Cells are the size of a tile.
+    
     @type _cameraDict:              C{dict}
     @ivar _cameraDict:              C{{str : L{Camera<Utilities.Camera.Camera>}}} - All active cameras in the map, keyed by name.
     
     @type _bg:                      U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}
     @ivar _bg:                      Background image for this map.
     
+    @type _bgPath:                  C{str}
+    @ivar _bgPath:                  File path to the background image, C{None} if there isn't one.
+    
+    @type _bgTiled:                 U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}
+    @ivar _bgTiled:                 The background image repeated to be at least one image bigger than the largest camera
+                                    view, so it can be drawn with one blit.  C{None} until the background is first drawn.
+    
+    @type _bgScroll:                C{(float, float)}
+    @ivar _bgScroll:                How far the background scrolls for each pixel the cameras move, horizontally and
+                                    vertically.  Less than C{1.0} makes it look further away than the world (parallax).
+    
+    @type _imageLoader:             L{ImageLoaderPygame<tiledtmxloader.ImageLoaderPygame>}
+    @ivar _imageLoader:             Image loader holding the tileset images.
+    
     @type _bgColor:                 U{pygame.Color<http://www.pygame.org/docs/ref/color.html>}
     @ivar _bgColor:                 Color to wipe the scene with each frame.
     
@@ -97,11 +123,18 @@ class GameMap(object):
     @type _uiPaths:                 C{list}                                                                                         
     @ivar _uiPaths:                 List of file paths (C{str}) relative to the location of this map's .TMX file, where map level
                                     UI elements are stored.
+                                    
+    @type _interpolationAlpha:      C{float}
+    @ivar _interpolationAlpha:      How far between the previous and current update the map is being drawn, from C{0.0} to
+                                    C{1.0}.  Used by L{Actor<Core.Actor.Actor>}s to smooth their movement when the
+                                    simulation runs at a fixed step.
     """
 
-    def __init__(self, path, controllers=None, transferMap=None):
+    def __init__(self, path, controllers=None, transferMap=None, loaderMap=None, imageLoader=None):
         """
         Loads the .TMX file at the given path, and creates all the necessary data structures to support it.
+        If the map's data was already loaded by a L{MapPreloader<MapPreloader.MapPreloader>}, it can be passed in
+        to skip that work.
         
         @type  path:     C{str}
         @param path:     The file path to the location of the .TMX file.
@@ -112,13 +145,23 @@ class GameMap(object):
         
         @type  transferMap:        C{GameMap | None}
         @param transferMap:        Map to use for transferring objects into this map.
+        
+        @type  loaderMap:          L{TileMap<Utilities.tiledtmxloader.TileMap>} | C{None}
+        @param loaderMap:          The already parsed and decoded map, C{None} to load it from C{path}.
+        
+        @type  imageLoader:        L{ImageLoaderPygame<Utilities.tiledtmxloader.ImageLoaderPygame>} | C{None}
+        @param imageLoader:        Image loader to load the tileset images with, C{None} to use a new one.
         """
         # path to reload from
         self._path = path
         
-        # loader calls
-        loaderMap = TileMapParser().parse_decode(path)
-        loaderMap.load(ImageLoaderPygame())
+        # loader calls, the compiled copy is used when it's up to date
+        if loaderMap is None:
+            loaderMap = MapCache.Load(path)
+        if imageLoader is None:
+            imageLoader = ImageLoaderPygame()
+        loaderMap.load(imageLoader)
+        self._imageLoader = imageLoader
         
         self._data = loaderMap
         
@@ -143,11 +186,26 @@ class GameMap(object):
         if (Constants.EditorConstants.MAP_PROP_BACKGROUND in loaderMap.properties and loaderMap.properties[Constants.EditorConstants.MAP_PROP_BACKGROUND].strip()):
             bgPath = str(loaderMap.properties[Constants.EditorConstants.MAP_PROP_BACKGROUND])
             # pull off the file from path and create bg path
-            bgPath = os.path.normpath(os.path.join(os.path.dirname(path), bgPath))
-            self._bg = pygame.image.load(bgPath)
-            self._bg.convert_alpha()
+            self._bgPath = os.path.normpath(os.path.join(os.path.dirname(path), bgPath))
+            self._bg = AssetCache().LoadImage(self._bgPath)
         else:
+            self._bgPath = None
             self._bg = None
+        self._bgTiled = None
+        
+        # background parallax
+        if (Constants.EditorConstants.MAP_PROP_BACKGROUND_SCROLL in loaderMap.properties and loaderMap.properties[Constants.EditorConstants.MAP_PROP_BACKGROUND_SCROLL].strip()):
+            scrollStr = str(loaderMap.properties[Constants.EditorConstants.MAP_PROP_BACKGROUND_SCROLL])
+            scrollTup = Utilities.HelperFunctions.StringConversions.StringToFloatTuple(scrollStr)
+            # one value scrolls both ways the same
+            if (len(scrollTup) == 1):
+                scrollTup = scrollTup * 2
+            if (len(scrollTup) != 2):
+                propName = Constants.EditorConstants.MAP_PROP_BACKGROUND_SCROLL
+                raise Exception('Check map file "' + self.FileName + '": Map Property "' + propName + '" must have either 1 or 2 values.')
+            self._bgScroll = scrollTup
+        else:
+            self._bgScroll = Constants.MapConstants.DEFAULT_BACKGROUND_SCROLL
             
         # background color
         if (Constants.EditorConstants.MAP_PROP_BACKGROUND_COLOR in loaderMap.properties and loaderMap.properties[Constants.EditorConstants.MAP_PROP_BACKGROUND_COLOR].strip()):
@@ -186,8 +244,12 @@ class GameMap(object):
         self._nonPlayerActors = {}
         self._allActors = {}
         self._collisionGroups = {}
+        self._spatialHash = SpatialHash(self.TileWidth, self.TileHeight)
         self._cameraDict = {}
         
+        # drawing between updates
+        self._interpolationAlpha = 1.0
+        
         # map switching
         self.WantsToSwitchMap = False
         self._mapSwitchParams = (Constants.GameConstants.NEXT_MAP, False)
@@ -202,6 +264,7 @@ class GameMap(object):
         Recreates the GameMap.  After being called it will be as if the map was just instantiated.
         """
         self.RemoveUI()
+        self.ReleaseImages()
         # soooooooooooo dirty
         self = self.__init__(self._path)
         
@@ -385,12 +448,35 @@ class GameMap(object):
         for path in self._uiPaths:
             self._panel.AddChild(Panel.PanelFromXML(path, Constants.GameConstants.BASE_PATH, self))
             
+    def ReleaseImages(self):
+        """
+        Releases every image this GameMap and its objects loaded back to the L{AssetCache<Core.AssetCache.AssetCache>},
+        so they can be thrown out if nothing else is using them.  Should be called when the GameMap is done being played.
+        """
+        if self._bgPath:
+            AssetCache().Release(self._bgPath)
+            self._bgPath = None
+        self._bgTiled = None
+        
+        self._imageLoader.release()
+        
+        objects = set(self._allActors.values())
+        for layer in self._layers:
+            objects.update(layer._drawList)
+        
+        for obj in objects:
+            if isinstance(obj, GameObject):
+                obj.ReleaseImages()
+    
     def RemoveUI(self):
         """
-        Unloads all UI L{Panel<UI.Panel.Panel>}s that are attached to L{Camera<Utilities.Camera.Camera>}s.
+        Unloads all UI L{Panel<UI.Panel.Panel>}s that are attached to L{Camera<Utilities.Camera.Camera>}s, and releases
+        the images of every UI in the map.
         """
         for camera in self.Cameras:
             camera.UnloadUIs()
+        
+        self._panel.ReleaseImages()
     
     def AddPlayer(self, player, layer):
         """
@@ -426,16 +512,25 @@ class GameMap(object):
                 self._nonPlayerActors[actor.Name] = actor
                 actor.Map = self
                 actor.Layer = layer
+            
+            if actor.CollisionGroups:
+                self._spatialHash.Update(actor)
         
     def AddCamera(self, camera):
         """
-        Adds the given camera to this map's list of cameras.
+        Adds the given camera to this map's list of cameras.  Cameras whose display views overlap aren't allowed to
+        draw straight into the window, so they're still drawn in order.
         
         @type  camera:    L{Camera<Utilities.Camera.Camera>}
         @param camera:    Camera to add to this map.
         """
         self._cameraDict[camera.Name] = camera
         camera.Map = self
+        
+        cameras = self.Cameras
+        for cam in cameras:
+            overlapping = [other for other in cameras if other is not cam and other.DisplayRect.colliderect(cam.DisplayRect)]
+            cam.AllowDirectDraw = not overlapping
     
     def __populate_layer_name_dict__(self, nameList):
         """
@@ -527,42 +622,98 @@ class GameMap(object):
         @type  dt:    C{float}
         @param dt:    Time in seconds since the last frame refresh.
         """
-        # update players first
-        for player in self.Players:
-            player.Update(dt)
-            
-        # then the rest of the objects
-        for obj in self.NonPlayerActors:
-            obj.Update(dt)
+        profiler = Profiler()
+        profiler.Begin('map update')
+        
+        # every animation plays by the same clock, moved once per update
+        AnimationClock().Tick()
+        
+        if profiler.ActorScopes:
+            self.__profile_actors__(profiler, dt)
+        else:
+            # update players first
+            for player in self.Players:
+                player.Update(dt)
+                
+            # then the rest of the objects
+            for obj in self.NonPlayerActors:
+                obj.Update(dt)
             
         # update cameras last
+        profiler.Begin('cameras')
         for camera in self.Cameras:
             camera.Update(dt)
+        profiler.End()
             
         # finally the map level UI
+        profiler.Begin('ui update')
         self._panel.Update(dt)
+        profiler.End()
+        
+        profiler.End()
     
-    def Draw(self):
+    def __profile_actors__(self, profiler, dt):
+        """
+        Updates the L{Player<Player.Player>}s and then the rest of the L{Actor<Actor.Actor>}s like L{Update}, timing
+        each Actor in a scope named after its class and the L{State<States.State.State>} it started the update in.
+        
+        @type  profiler:    L{Profiler<Utilities.Profiler.Profiler>}
+        @param profiler:    The profiler to time the Actors with.
+        
+        @type  dt:          C{float}
+        @param dt:          Time in seconds since the last frame refresh.
+        """
+        for actors in (self.Players, self.NonPlayerActors):
+            for actor in actors:
+                state = actor.CurrentState
+                profiler.Begin(type(actor).__name__ + ':' + (state.Name if state else 'none'), 'actor')
+                actor.Update(dt)
+                profiler.End()
+    
+    def Draw(self, alpha=1.0):
         """
         Send every visible L{GameLayer<GameLayer.GameLayer>} to this map's cameras
         to be drawn.
+        
+        @type  alpha:    C{float}
+        @param alpha:    How far between the previous and current update to draw, from C{0.0} to C{1.0}.
+                         Only needed when the simulation runs at a fixed step.
         """
-        for camera in self.Cameras:
+        self._interpolationAlpha = alpha
+        
+        profiler = Profiler()
+        profiler.Begin('map draw')
+        
+        # sorted into a new list every time it's asked for, so only ask once
+        cameras = self.Cameras
+        
+        profiler.Begin('clear')
+        for camera in cameras:
+            camera.BeginDraw()
             camera.Clear(self._bgColor)
 
         if (self.Background):
-            for camera in self.Cameras:
+            for camera in cameras:
                 self.__tile_background__(camera)
+        profiler.End()
 
         for layer in self._layers:
             if layer.visible:
-                layer.Draw(self.Cameras)
+                profiler.Begin(layer.Name, 'layer')
+                layer.Draw(cameras)
+                profiler.End()
         
-        for camera in self.Cameras:
+        profiler.Begin('finalize draw')
+        for camera in cameras:
             camera.DrawBorders()
             camera.FinalizeDraw()
+        profiler.End()
             
+        profiler.Begin('ui draw')
         self._panel.DrawTo(Camera.windowSurf)
+        profiler.End()
+        
+        profiler.End()
     
     def DrawLayer(self, cameras, layer):
         """
@@ -613,41 +764,64 @@ class GameMap(object):
         
     def __tile_background__(self, camera):
         """
-        Tiles the L{background image<Background>} and sends it to the camera to be drawn.
+        Tiles the L{background image<Background>} and sends it to the camera to be drawn.  The background is
+        L{prebuilt<__build_tiled_background__>} bigger than the camera's view, so it only takes one blit, offset by how
+        far the background has scrolled.
         
         @type  camera:    L{Camera<Utilities.Camera.Camera>}
         @param camera:    Camera to draw background to.
         """
-        # starting point
-        paintAtX, paintAtY = camera.boundingBox.topleft
+        viewRect = camera.ViewRect
+        bgWidth, bgHeight = self._bg.get_size()
         
-        # while there's still room to paint
-        while paintAtY < camera.boundingBox.bottom:
-            
-            # where in the background we should start drawing from
-            bgY = paintAtY % self.Background.get_height()
-            
-            # how much texture we have to work with
-            distBGEndY = self.Background.get_height() - bgY
-            # how much room we have
-            distDispEndY = camera.boundingBox.bottom - paintAtY
-            # use the smaller for the subsurface
-            paintY = min(distBGEndY, distDispEndY)
-            
-            while paintAtX < camera.boundingBox.right:
-                bgX = paintAtX % self.Background.get_width()
-                distBGEndX = self.Background.get_width() - bgX
-                distDispEndX = camera.boundingBox.right - paintAtX
-                paintX = min(distBGEndX, distDispEndX)
-                
-                # paint subsurface
-                bgTile = self.Background.subsurface(pygame.Rect(bgX, bgY, paintX, paintY))
-                camera.Draw(bgTile, (paintAtX, paintAtY))
-                
-                paintAtX += paintX
-                
-            paintAtY += paintY
-            paintAtX = camera.boundingBox.left
+        if (self._bgTiled is None or self._bgTiled.get_width() < viewRect.width + bgWidth or self._bgTiled.get_height() < viewRect.height + bgHeight):
+            self.__build_tiled_background__(viewRect.size)
+        
+        # where in the background the view starts
+        offsetX = int(viewRect.left * self._bgScroll[0]) % bgWidth
+        offsetY = int(viewRect.top * self._bgScroll[1]) % bgHeight
+        
+        camera.Draw(self._bgTiled, (viewRect.left - offsetX, viewRect.top - offsetY))
+    
+    def __build_tiled_background__(self, viewSize):
+        """
+        Repeats the L{background image<Background>} across a surface one image bigger than it takes to cover the given
+        view size, and at least as big as for any view it was built for before.  The view starts less than one image
+        into the surface, so that's always enough to cover it.
+        
+        @type  viewSize:    C{(int, int)}
+        @param viewSize:    Width and height of the camera view the background will be drawn into.
+        """
+        bg = self._bg
+        bgWidth, bgHeight = bg.get_size()
+        
+        # whole numbers of images, so the edges line up when offset
+        width = (int(math.ceil(float(viewSize[0]) / bgWidth)) + 1) * bgWidth
+        height = (int(math.ceil(float(viewSize[1]) / bgHeight)) + 1) * bgHeight
+        if self._bgTiled:
+            width = max(width, self._bgTiled.get_width())
+            height = max(height, self._bgTiled.get_height())
+        
+        if bg.get_flags() & pygame.SRCALPHA:
+            # copy the alpha values exactly, instead of blending them into the empty surface
+            tiled = pygame.Surface((width, height), pygame.SRCALPHA, bg)
+            blend = pygame.BLEND_RGBA_MAX
+        else:
+            tiled = pygame.Surface((width, height), 0, bg)
+            blend = 0
+            colorKey = bg.get_colorkey()
+            if colorKey:
+                tiled.fill(colorKey)
+                tiled.set_colorkey(colorKey)
+        
+        for y in range(0, height, bgHeight):
+            for x in range(0, width, bgWidth):
+                tiled.blit(bg, (x, y), None, blend)
+        
+        if blend:
+            self._bgTiled = tiled.convert_alpha()
+        else:
+            self._bgTiled = tiled.convert()
 
     def __str__(self):
         """
@@ -703,14 +877,25 @@ class GameMap(object):
         cams.sort(None, lambda camera: camera.Order)
         return cams
     
+    def __get_spatial_hash__(self):
+        return self._spatialHash
+    
     def __get_bg__(self):
         return self._bg
     def __set_bg__(self, value):
         self._bg = value
+        self._bgTiled = None
+    def __get_bg_scroll__(self):
+        return self._bgScroll
+    def __set_bg_scroll__(self, value):
+        self._bgScroll = value
 
     def __get_nextMapName__(self):
         return self._mapSwitchParams
     
+    def __get_interpolation_alpha__(self):
+        return self._interpolationAlpha
+    
     def __get_musicLoaded__(self):
         return self._musicLoaded
     def __set_music__(self, value):
@@ -729,6 +914,9 @@ class GameMap(object):
     Players = property(__get_players__, None, None, "C{list} of L{Player<Player.Player>}s in the map.")
     NonPlayerActors = property(__get_nonPlayerActors__, None, None, "C{list} of all L{Actor<Actor.Actor>}s except L{Player<Player.Player>}s.")
     Cameras = property(__get_cameras__, None, None, "C{list} of L{Camera<Utilities.Camera.Camera>}s that are rendering to the screen.")
+    SpatialHash = property(__get_spatial_hash__, None, None, "L{SpatialHash<Core.SpatialHash.SpatialHash>} of the L{Actor<Actor.Actor>}s in collision groups.")
     Background = property(__get_bg__, __set_bg__, None, "Background image.")
+    BackgroundScroll = property(__get_bg_scroll__, __set_bg_scroll__, None, "C{(float, float)} - How far the background scrolls for each pixel the cameras move, horizontally and vertically.")
     MapSwitchParameters = property(__get_nextMapName__, None, None, "Parameters used by L{Game<Game.Game>} when switching maps.")
-    MusicLoaded = property(__get_musicLoaded__, None, None, "C{True} if background music was loaded, C{False} otherwise.")
\ No newline at end of file
+    MusicLoaded = property(__get_musicLoaded__, None, None, "C{True} if background music was loaded, C{False} otherwise.")
+    InterpolationAlpha = property(__get_interpolation_alpha__, None, None, "How far between the previous and current update the map is being drawn, from C{0.0} to C{1.0}.")
\ No newline at end of file
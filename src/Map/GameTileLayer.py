@@ -4,10 +4,15 @@ A layer of L{GameTile<GameTile.GameTile>}s in a L{GameMap<GameMap.GameMap>}.
 @author: Chris Alvarado-Dryden
 '''
 from Core import Constants
+import pygame.transform
 import Utilities.HelperFunctions
+import Utilities.tiledtmxloader
+from collections import OrderedDict
 
 from Map.GameLayer import GameLayer
 from Map.GameTile import GameTile
+from Map.TileChunkCache import TileChunkCache
+from Map.TileGrid import TileGrid
 from Utilities.vector import Vector
 
 class GameTileLayer(GameLayer):
@@ -24,6 +29,12 @@ class GameTileLayer(GameLayer):
     @type _tileMatrix:    C{list}
     @ivar _tileMatrix:    All of the L{GameTile<GameTile.GameTile>}s in the layer, arranged as a 2D matrix.  Top left tile is C{[0,0]}.
                           Used for quickly switching between world and tile coordinates.
+    
+    @type _chunkCache:    L{TileChunkCache<TileChunkCache.TileChunkCache>}
+    @ivar _chunkCache:    Prerendered blocks of tiles used to draw the layer.  C{None} if the layer is animated.
+    
+    @type _tileGrid:      L{TileGrid<TileGrid.TileGrid>}
+    @ivar _tileGrid:      Which spaces have tiles, used for collision queries without touching the tiles themselves.
     """
 
     def __init__(self, loaderLayer, loaderTileMap, map):
@@ -54,7 +65,13 @@ class GameTileLayer(GameLayer):
             self._animated = True
         
         GameLayer.__init__(self, loaderLayer, loaderTileMap, map)
-
+        
+        # static layers are drawn in prerendered chunks
+        self._chunkCache = None
+        if not self._animated:
+            self._chunkCache = TileChunkCache(self, Constants.MapConstants.CHUNK_TILES, Constants.MapConstants.MIN_CACHED_CHUNKS, Constants.MapConstants.CHUNK_HEADROOM)
+        
+        self._tileGrid = TileGrid(self, loaderLayer)
     
     def __load_layer__(self, loaderLayer, loaderTileMap):
         """
@@ -72,6 +89,10 @@ class GameTileLayer(GameLayer):
         @param loaderTileMap:  Map data structure created by the loader.
         """
         gidmap = loaderLayer.decoded_content
+        
+        # flipped images, shared by every tile with the same gid and flip
+        flippedSurfaces = {}
+        
         for xIndex in range(0, self.WidthInTiles):
             # check the layer offset from the editor
             adjustedX = xIndex - loaderLayer.x
@@ -85,7 +106,8 @@ class GameTileLayer(GameLayer):
                 
                 # normal procedure
                 else:
-                    gid = gidmap[(adjustedY) * loaderLayer.width + (adjustedX)]
+                    gidIndex = (adjustedY) * loaderLayer.width + (adjustedX)
+                    gid = gidmap[gidIndex]
                     if gid == 0:
                         column.append(None)
                     else:
@@ -99,6 +121,13 @@ class GameTileLayer(GameLayer):
                             # tiles created individually
                             junkA, junkB, surface, loaderTile = loaderTileMap.indexed_tiles[gid]
                         
+                        # tiles can be flipped in the editor
+                        flags = loaderLayer.flip_flags.get(gidIndex)
+                        if flags:
+                            if not flippedSurfaces.has_key((gid, flags)):
+                                flippedSurfaces[(gid, flags)] = self.__flip_surface__(surface, flags)
+                            surface = flippedSurfaces[(gid, flags)]
+                        
                         # get the appropriate type of tile to construct    
                         if loaderTile and loaderTile.properties.has_key(Constants.EditorConstants.TILE_PROP_TYPE) and loaderTile.properties[Constants.EditorConstants.TILE_PROP_TYPE].strip():
                             typeName = loaderTile.properties[Constants.EditorConstants.TILE_PROP_TYPE]
@@ -109,6 +138,26 @@ class GameTileLayer(GameLayer):
                         self._drawList.append(tile)
             self._tileMatrix.append(column)
             
+    def __flip_surface__(self, surface, flags):
+        """
+        Flips a tile's image the way U{Tiled<http://mapeditor.org/>} does.  A diagonal flip (swapping X and Y) happens
+        first, then the horizontal and vertical flips.
+        
+        @type  surface:    C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @param surface:    The tile's image.
+        
+        @type  flags:      C{int}
+        @param flags:      The flip flags from the high bits of the tile's gid.
+        
+        @rtype:            C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @return:           A flipped copy of the image.
+        """
+        if flags & Utilities.tiledtmxloader.FLIPPED_DIAGONALLY_FLAG:
+            # rotating a quarter turn counter clockwise and flipping vertically swaps X and Y
+            surface = pygame.transform.flip(pygame.transform.rotate(surface, 90), False, True)
+        
+        return pygame.transform.flip(surface, bool(flags & Utilities.tiledtmxloader.FLIPPED_HORIZONTALLY_FLAG), bool(flags & Utilities.tiledtmxloader.FLIPPED_VERTICALLY_FLAG))
+    
     def __get_tile_from_tilesets__(self, targetGid, tileSets):
         """
         Finds the loader L{Tile<tiledtmxloader.Tile>} with the given gid from all L{TileSet<tiledtmxloader.TileSet>}s in the map.
@@ -141,7 +190,11 @@ class GameTileLayer(GameLayer):
     
     def Draw(self, cameras):
         """
-        If visible, sends the tiles in the cameras view to be drawn.
+        If visible, sends the tiles in the cameras view to be drawn.  Layers that aren't animated send
+        prerendered chunks of tiles instead of each tile.
+        
+        Each tile is only looked at by the cameras whose view it's in, and is drawn once into just those cameras,
+        so split screens don't draw every tile to every camera.
         
         @type  cameras:    C{list}
         @param cameras:    All of the L{Camera<Camera.Camera>}s to try to draw to.
@@ -149,29 +202,59 @@ class GameTileLayer(GameLayer):
         
         if (not self.visible):
             return
-
-        if self.Animated:
-            GameLayer.Draw(self, cameras)
-            return
-
-        graceTiles = Constants.CameraConstants.GRACE_TILES
+        
+        # {GameTile : [Camera]} - tiles to draw and the cameras that see them, in draw order
+        tileCameras = OrderedDict()
+        
+        if not self.Animated:
+            self._chunkCache.Fit(cameras)
 
         for camera in cameras:
-            left, top = self.WorldToTileCoords(camera.boundingBox.topleft)
-            right, bottom = self.WorldToTileCoords(camera.boundingBox.bottomright)
-            
-            
-            left -= graceTiles
-            right += graceTiles
-            top -= graceTiles
-            bottom += graceTiles
+            if self.Animated:
+                for tile in self.__tiles_in_view__(camera):
+                    tileCameras.setdefault(tile, []).append(camera)
+            else:
+                self._chunkCache.Draw(camera, tileCameras)
+        
+        for tile, seenBy in tileCameras.iteritems():
+            tile.Draw(seenBy)
+    
+    def __tiles_in_view__(self, camera):
+        """
+        Gets the tiles in the given camera's view, plus L{CameraConstants.GRACE_TILES<Core.Constants.CameraConstants>}
+        around it for tiles drawn bigger than their space.
+        
+        @type  camera:    L{Camera<Camera.Camera>}
+        @param camera:    The camera to look through.
+        
+        @rtype:           C{list}
+        @return:          The tiles, column by column from the left.
+        """
+        viewRect = camera.ViewRect
+        grace = Constants.CameraConstants.GRACE_TILES
+        
+        left = viewRect.left // self._tileWidth - grace
+        top = viewRect.top // self._tileHeight - grace
+        right = (viewRect.right - 1) // self._tileWidth + grace
+        bottom = (viewRect.bottom - 1) // self._tileHeight + grace
+        
+        return self._tileGrid.TilesInRect(left, top, right, bottom)
             
-            while top <= bottom:
-                for i in range(left, right + 1):
-                    tile = self.TileAtIndex(i, top)
-                    if tile:
-                        tile.Draw(cameras)
-                top += 1
+    def InvalidateTile(self, x, y):
+        """
+        Lets the layer know the L{GameTile<GameTile.GameTile>} at the given tile coordinates has changed, so it
+        will be drawn and collided with correctly.
+        
+        @type  x:    C{int}
+        @param x:    The X tile coordinate (1 unit per GameTile).
+        
+        @type  y:    C{int}
+        @param y:    The Y tile coordinate (1 unit per GameTile).
+        """
+        if self._chunkCache:
+            self._chunkCache.Invalidate(int(x), int(y))
+        
+        self._tileGrid.Refresh(int(x), int(y))
 
     def TileAtIndex(self, x, y):
         """
@@ -278,37 +361,12 @@ class GameTileLayer(GameLayer):
         indexA = self.WorldToTileCoords(a)
         indexB = self.WorldToTileCoords(b)
         
-        tiles = list()
-        
-        # start and end tiles
-        start = self.TileAtIndex(indexA[0], indexA[1])
-        end = self.TileAtIndex(indexB[0], indexB[1])
-        
-        if (start != None):
-            tiles.append(start)
-            # check if there's only 1 tile we're in
-            if (start == end):
-                return tiles
-        
-        # otherwise get the tiles between them
-        # horizontal check
-        if (indexA[1] == indexB[1]):
-            for i in range(indexA[0] + 1, indexB[0]):
-                tile = self.TileAtIndex(i, indexA[1])
-                if (tile != None):
-                    tiles.append(tile)
+        # only horizontal and vertical lines are supported, the start and end tiles are all a diagonal gets
+        if (indexA[0] != indexB[0] and indexA[1] != indexB[1]):
+            return [tile for tile in (self.TileAtIndex(indexA[0], indexA[1]), self.TileAtIndex(indexB[0], indexB[1])) if tile != None]
         
-        # vertical check        
-        if (indexA[0] == indexB[0]):
-            for j in range(indexA[1] + 1, indexB[1]):
-                tile = self.TileAtIndex(indexA[0], j)
-                if (tile != None):
-                    tiles.append(tile)
-        
-        if (end != None):
-            tiles.append(end)
-        
-        return tiles
+        # the grid finds the filled spaces, so only those tiles are touched
+        return self._tileGrid.TilesInRect(indexA[0], indexA[1], indexB[0], indexB[1])
     
     def WorldToTileCoords(self, v):
         """
@@ -361,7 +419,10 @@ class GameTileLayer(GameLayer):
         return self._tileHeight
     def __get_animated__(self):
         return self._animated
+    def __get_tile_grid__(self):
+        return self._tileGrid
     
     TileWidth = property(__get_tile_width__, None, None, "The width of each L{GameTile<GameTile.GameTile>}.")
     TileHeight = property(__get_tile_height__, None, None, "The height of each L{GameTile<GameTile.GameTile>}.")
+    TileGrid = property(__get_tile_grid__, None, None, "The L{TileGrid<TileGrid.TileGrid>} of which spaces in the layer have tiles, for fast collision queries.")
     Animated = property(__get_animated__, None, None, "C{True} if this GameTileLayer can have animated L{GameTile<GameTile.GameTile>}s, C{False} otherwise.")
@@ -0,0 +1,203 @@
+'''
+Compiled copies of parsed and decoded U{Tiled<http://mapeditor.org/>} .TMX maps, so they don't have to be parsed every time they're played.
+
+Maps can be compiled ahead of time by running this module with the .TMX files (or folders of them) to compile::
+
+    python -m Map.MapCache ../content/maps
+
+@author: Chris Alvarado-Dryden
+'''
+import array
+import cPickle
+import os
+import struct
+import sys
+
+from Core import Constants
+from Utilities.tiledtmxloader import TileMapParser
+
+class MapCache(object):
+    """
+    Compiled copies of parsed and decoded U{Tiled<http://mapeditor.org/>} .TMX maps.  Parsing the XML,
+    decompressing the layers, and decoding the gids of a large map takes a noticeable amount of time, so the
+    resulting L{TileMap<Utilities.tiledtmxloader.TileMap>} is saved to a binary file next to the .TMX
+    (the same name with L{MapConstants.CACHE_EXTENSION<Core.Constants.MapConstants>} added).  The next time the map is
+    loaded, the whole file is read at once and unpickled.
+    
+    Each compiled file starts with a header holding the format version and the .TMX file's modification time and
+    size.  If any of those don't match, the compiled file is out of date and the .TMX is parsed again.
+    
+    Layer gids are stored as the raw bytes of their C{array}, which keeps the file small and fast to read.
+    """
+    
+    # magic, format version, .TMX modification time, .TMX size, gid item size
+    _headerFormat = '<4sIdQB'
+    _magic = 'CADM'
+    _version = 2
+    
+    @staticmethod
+    def Load(path):
+        """
+        Gets the parsed and decoded L{TileMap<Utilities.tiledtmxloader.TileMap>} for the .TMX at the given path.
+        The compiled copy is used if it's up to date, otherwise the .TMX is parsed and compiled for next time.
+        Images are not loaded.
+        
+        @type  path:    C{str}
+        @param path:    The file path to the .TMX file.
+        
+        @rtype:         L{TileMap<Utilities.tiledtmxloader.TileMap>}
+        @return:        The parsed and decoded map.
+        """
+        if not Constants.MapConstants.USE_MAP_CACHE:
+            return TileMapParser().parse_decode(path)
+        
+        loaderMap = MapCache.__read__(path)
+        if loaderMap is None:
+            loaderMap = MapCache.Compile(path)
+        
+        return loaderMap
+    
+    @staticmethod
+    def Compile(path):
+        """
+        Parses and decodes the .TMX at the given path, and saves the compiled copy next to it.  If the compiled
+        copy can't be written, the map is still returned.
+        
+        @type  path:    C{str}
+        @param path:    The file path to the .TMX file.
+        
+        @rtype:         L{TileMap<Utilities.tiledtmxloader.TileMap>}
+        @return:        The parsed and decoded map.
+        """
+        loaderMap = TileMapParser().parse_decode(path)
+        
+        try:
+            MapCache.__write__(path, loaderMap)
+        except (IOError, OSError), e:
+            print 'could not write map cache for', path, '-', e
+        
+        return loaderMap
+    
+    @staticmethod
+    def CachePath(path):
+        """
+        Gets the path of the compiled copy for the .TMX at the given path.
+        
+        @type  path:    C{str}
+        @param path:    The file path to the .TMX file.
+        
+        @rtype:         C{str}
+        @return:        The file path to the compiled copy.
+        """
+        return path + Constants.MapConstants.CACHE_EXTENSION
+    
+    @staticmethod
+    def __header__(path, itemSize):
+        """
+        Creates the header the compiled copy of the .TMX at the given path should have.
+        
+        @type  path:        C{str}
+        @param path:        The file path to the .TMX file.
+        
+        @type  itemSize:    C{int}
+        @param itemSize:    Size in bytes of each stored gid.
+        
+        @rtype:             C{str}
+        @return:            The packed header.
+        """
+        stat = os.stat(path)
+        return struct.pack(MapCache._headerFormat, MapCache._magic, MapCache._version, stat.st_mtime, stat.st_size, itemSize)
+    
+    @staticmethod
+    def __read__(path):
+        """
+        Reads the compiled copy of the .TMX at the given path.
+        
+        @type  path:    C{str}
+        @param path:    The file path to the .TMX file.
+        
+        @rtype:         L{TileMap<Utilities.tiledtmxloader.TileMap>} | C{None}
+        @return:        The compiled map, C{None} if there isn't one or it's out of date.
+        """
+        cachePath = MapCache.CachePath(path)
+        if not os.path.isfile(cachePath):
+            return None
+        
+        f = open(cachePath, 'rb')
+        try:
+            data = f.read()
+        finally:
+            f.close()
+        
+        gids = array.array('I')
+        headerSize = struct.calcsize(MapCache._headerFormat)
+        if data[:headerSize] != MapCache.__header__(path, gids.itemsize):
+            return None
+        
+        try:
+            loaderMap = cPickle.loads(data[headerSize:])
+        except Exception, e:
+            print 'could not read map cache for', path, '-', e
+            return None
+        
+        for layer in loaderMap.layers:
+            gids = array.array('I')
+            gids.fromstring(layer.decoded_content)
+            layer.decoded_content = gids
+        
+        # the map may have been compiled from another working directory
+        loaderMap.map_file_name = os.path.abspath(path)
+        
+        return loaderMap
+    
+    @staticmethod
+    def __write__(path, loaderMap):
+        """
+        Saves the compiled copy of a parsed and decoded map.  The map is left unchanged.
+        
+        @type  path:         C{str}
+        @param path:         The file path to the .TMX file the map was parsed from.
+        
+        @type  loaderMap:    L{TileMap<Utilities.tiledtmxloader.TileMap>}
+        @param loaderMap:    The parsed and decoded map.
+        """
+        # store the gids as raw bytes and leave out the encoded data, then put everything back
+        saved = []
+        for layer in loaderMap.layers:
+            saved.append((layer, layer.encoded_content, layer.decoded_content))
+            layer.decoded_content = layer.decoded_content.tostring()
+            layer.encoded_content = None
+        
+        try:
+            data = cPickle.dumps(loaderMap, cPickle.HIGHEST_PROTOCOL)
+        finally:
+            for layer, encoded, decoded in saved:
+                layer.encoded_content = encoded
+                layer.decoded_content = decoded
+        
+        f = open(MapCache.CachePath(path), 'wb')
+        try:
+            f.write(MapCache.__header__(path, array.array('I').itemsize))
+            f.write(data)
+        finally:
+            f.close()
+
+def main(paths):
+    """
+    Compiles every .TMX file given, and every .TMX file in any folders given.
+    
+    @type  paths:    C{list}
+    @param paths:    File paths to .TMX files or folders of them.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            mapPaths = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.lower().endswith('.tmx')]
+        else:
+            mapPaths = [path]
+        
+        for mapPath in mapPaths:
+            print 'compiling', mapPath
+            MapCache.Compile(mapPath)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,134 @@
+'''
+Loads a U{Tiled<http://mapeditor.org/>} .TMX map's data on a background thread, so it's ready before it's played.
+
+@author: Chris Alvarado-Dryden
+'''
+import os
+import threading
+
+from Map.MapCache import MapCache
+from Utilities.tiledtmxloader import ImageLoaderPygame
+
+class MapPreloader(threading.Thread):
+    """
+    Loads a U{Tiled<http://mapeditor.org/>} .TMX map's data on a background thread, so it's ready before it's played.
+    The map is parsed and decoded (through the L{MapCache<MapCache.MapCache>}), and its tileset images are read from
+    disk.  Anything that needs the display, like converting surfaces and creating the L{GameMap<GameMap.GameMap>}
+    itself, is left for the main thread.
+    
+    A preloaded map can only be used once, since the L{GameMap<GameMap.GameMap>} made from it takes it over.
+    
+    @type _path:           C{str}
+    @ivar _path:           File path to the .TMX file.
+    
+    @type _loaderMap:      L{TileMap<Utilities.tiledtmxloader.TileMap>}
+    @ivar _loaderMap:      The parsed and decoded map, C{None} until loading is finished.
+    
+    @type _imageLoader:    L{ImageLoaderPygame<Utilities.tiledtmxloader.ImageLoaderPygame>}
+    @ivar _imageLoader:    Image loader with the map's tileset images already read into its cache.
+    
+    @type _error:          C{Exception}
+    @ivar _error:          What went wrong while loading, C{None} if nothing did.
+    
+    @type _released:       C{bool}
+    @ivar _released:       C{True} if the map won't be played, so its images are given back as soon as they're loaded.
+    
+    @type _lock:           C{U{threading.Lock<http://docs.python.org/library/threading.html#lock-objects>}}
+    @ivar _lock:           Keeps the background thread from finishing while the map is being released.
+    """
+    
+    def __init__(self, path):
+        """
+        Creates a MapPreloader for the .TMX file at the given path.  Loading starts when L{start} is called.
+        
+        @type  path:    C{str}
+        @param path:    The file path to the .TMX file.
+        """
+        threading.Thread.__init__(self, name='MapPreloader ' + os.path.basename(path))
+        
+        # don't keep the game open if it quits while loading
+        self.daemon = True
+        
+        self._path = path
+        self._loaderMap = None
+        self._imageLoader = None
+        self._error = None
+        self._released = False
+        self._lock = threading.Lock()
+    
+    def run(self):
+        """
+        Parses and decodes the map, and reads its tileset images.  Runs on the background thread.
+        """
+        imageLoader = None
+        try:
+            loaderMap = MapCache.Load(self._path)
+            
+            # read the images now, the loader converts them when the map is loaded on the main thread
+            imageLoader = ImageLoaderPygame()
+            for tileSet in loaderMap.tile_sets:
+                for image in tileSet.images:
+                    if image.source:
+                        imageLoader.preload_image(os.path.join(os.path.dirname(loaderMap.map_file_name), image.source))
+        except Exception, e:
+            self._error = e
+            
+            # the images read so far won't be used
+            if imageLoader:
+                imageLoader.release()
+            return
+        
+        self._lock.acquire()
+        try:
+            if self._released:
+                # nobody is going to play the map anymore
+                imageLoader.release()
+            else:
+                self._imageLoader = imageLoader
+                self._loaderMap = loaderMap
+        finally:
+            self._lock.release()
+    
+    def Result(self):
+        """
+        Gets the loaded map data, waiting for loading to finish if it hasn't yet.  If loading failed, the error is
+        printed and C{None}s are returned, so the map can be loaded normally instead.
+        
+        @rtype:    C{(L{TileMap<Utilities.tiledtmxloader.TileMap>}, L{ImageLoaderPygame<Utilities.tiledtmxloader.ImageLoaderPygame>})}
+        @return:   The parsed and decoded map, and an image loader holding its tileset images.
+        """
+        self.join()
+        
+        if self._error:
+            print 'could not preload map', self._path, '-', self._error
+            return None, None
+        
+        return self._loaderMap, self._imageLoader
+    
+    def Release(self):
+        """
+        Gives the map's tileset images back to the L{AssetCache<Core.AssetCache.AssetCache>}, for a preloaded map
+        that isn't going to be played.  Doesn't wait for loading to finish, if it hasn't the images are given back
+        when it does.  L{Result} returns C{None}s afterward.
+        """
+        self._lock.acquire()
+        try:
+            self._released = True
+            
+            if self._imageLoader:
+                self._imageLoader.release()
+            
+            self._loaderMap = None
+            self._imageLoader = None
+        finally:
+            self._lock.release()
+    
+    ############### PROPERTIES ###############
+    
+    def __get_path__(self):
+        return self._path
+    def __get_finished__(self):
+        return not self.is_alive()
+    
+    Path = property(__get_path__, None, None, "File path to the .TMX file being loaded.")
+    Finished = property(__get_finished__, None, None, "C{True} if loading is done (or failed), C{False} if it's still going.")
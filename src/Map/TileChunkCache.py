@@ -0,0 +1,225 @@
+'''
+Prerendered blocks of L{GameTile<GameTile.GameTile>}s used to draw static L{GameTileLayer<GameTileLayer.GameTileLayer>}s.
+
+@author: Chris Alvarado-Dryden
+'''
+import pygame
+from collections import OrderedDict
+
+class TileChunkCache(object):
+    """
+    Prerendered blocks (chunks) of L{GameTile<GameTile.GameTile>}s used to draw static
+    L{GameTileLayer<GameTileLayer.GameTileLayer>}s.  Instead of sending every tile in view to a
+    L{Camera<Utilities.Camera.Camera>}, each chunk is baked into a single surface the first time it is seen, and only the
+    few chunks overlapping the Camera are drawn.
+    
+    Baked chunks are kept until the cache is full, then the least recently drawn chunk is thrown out.  It will be
+    baked again if it comes back into view.  The cache is L{fit<Fit>} to the Cameras every time they're drawn, so
+    every chunk they can see at once always fits.
+    
+    Tiles with animations are left out of the chunks and drawn on their own by the layer, on top of the chunks.
+    
+    @type _layer:          L{GameTileLayer<GameTileLayer.GameTileLayer>}
+    @ivar _layer:          The layer whose tiles are being cached.
+    
+    @type _chunkTiles:     C{int}
+    @ivar _chunkTiles:     How many tiles wide and high each chunk is.
+    
+    @type _chunkWidth:     C{int}
+    @ivar _chunkWidth:     Width of each chunk in pixels.
+    
+    @type _chunkHeight:    C{int}
+    @ivar _chunkHeight:    Height of each chunk in pixels.
+    
+    @type _minChunks:      C{int}
+    @ivar _minChunks:      The fewest chunks the cache can hold, no matter how little the Cameras see.
+    
+    @type _headroom:       C{int}
+    @ivar _headroom:       How many chunks to keep baked beyond what the Cameras can see at once.
+    
+    @type _maxChunks:      C{int}
+    @ivar _maxChunks:      The most chunks to keep baked at once.
+    
+    @type _chunks:         C{U{collections.OrderedDict<http://docs.python.org/library/collections.html#ordereddict-objects>}}
+    @ivar _chunks:         C{{(int, int) : (U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}, list)}} - Baked
+                           chunks keyed by chunk index, least recently drawn first.  Each is the baked surface (C{None} if
+                           there was nothing to bake) and the animated tiles that are drawn on top of it.
+    """
+    
+    def __init__(self, layer, chunkTiles, minChunks, headroom):
+        """
+        Creates an empty cache for the given layer.  Chunks are baked as they are drawn.
+        
+        @type  layer:         L{GameTileLayer<GameTileLayer.GameTileLayer>}
+        @param layer:         The layer whose tiles to cache.
+        
+        @type  chunkTiles:    C{int}
+        @param chunkTiles:    How many tiles wide and high each chunk should be.
+        
+        @type  minChunks:     C{int}
+        @param minChunks:     The fewest chunks the cache can hold, no matter how little the Cameras see.
+        
+        @type  headroom:      C{int}
+        @param headroom:      How many chunks to keep baked beyond what the Cameras can see at once.
+        """
+        self._layer = layer
+        self._chunkTiles = chunkTiles
+        self._chunkWidth = chunkTiles * layer.TileWidth
+        self._chunkHeight = chunkTiles * layer.TileHeight
+        self._minChunks = minChunks
+        self._headroom = headroom
+        self._maxChunks = minChunks
+        
+        self._chunks = OrderedDict()
+    
+    def Fit(self, cameras):
+        """
+        Makes the cache big enough to hold every chunk the given L{Camera<Utilities.Camera.Camera>}s can see at once,
+        plus the headroom.  Otherwise split screens and large views would throw out chunks that are still in view,
+        and bake them again every frame.  The cache never gets smaller than its minimum.
+        
+        @type  cameras:    C{list}
+        @param cameras:    All of the Cameras the layer is drawn to.
+        """
+        visible = 0
+        for camera in cameras:
+            viewRect = camera.ViewRect
+            
+            # the most chunks a view this size can overlap, wherever it is
+            visible += ((viewRect.width - 1) // self._chunkWidth + 2) * ((viewRect.height - 1) // self._chunkHeight + 2)
+        
+        self._maxChunks = max(self._minChunks, visible + self._headroom)
+    
+    def Draw(self, camera, tileCameras):
+        """
+        Sends the chunks that overlap the given L{Camera<Utilities.Camera.Camera>}'s view to be drawn, baking any
+        that aren't cached yet.  Animated tiles in those chunks aren't drawn, instead the Camera is added to their
+        entry in C{tileCameras}, so each can be drawn once into every Camera that sees it.
+        
+        @type  camera:         L{Camera<Utilities.Camera.Camera>}
+        @param camera:         Camera to draw to.
+        
+        @type  tileCameras:    C{U{collections.OrderedDict<http://docs.python.org/library/collections.html#ordereddict-objects>}}
+        @param tileCameras:    C{{L{GameTile<GameTile.GameTile>} : list}} - Animated tiles to draw, and the Cameras to draw
+                               each to.
+        """
+        viewRect = camera.ViewRect
+        
+        # chunks overlapping the view, clipped to the layer
+        left = max(viewRect.left // self._chunkWidth, 0)
+        top = max(viewRect.top // self._chunkHeight, 0)
+        right = min((viewRect.right - 1) // self._chunkWidth, (self._layer.WidthInTiles - 1) // self._chunkTiles)
+        bottom = min((viewRect.bottom - 1) // self._chunkHeight, (self._layer.HeightInTiles - 1) // self._chunkTiles)
+        
+        for chunkY in range(top, bottom + 1):
+            for chunkX in range(left, right + 1):
+                surface, animatedTiles = self.__get_chunk__(chunkX, chunkY)
+                
+                if surface:
+                    camera.Draw(surface, (chunkX * self._chunkWidth, chunkY * self._chunkHeight))
+                
+                for tile in animatedTiles:
+                    tileCameras.setdefault(tile, []).append(camera)
+    
+    def Invalidate(self, xIndex, yIndex):
+        """
+        Throws out the chunk holding the tile at the given index, so it is baked again the next time it is drawn.
+        This should be called whenever a tile in a static layer is added, removed, or changes its image.
+        
+        @type  xIndex:    C{int}
+        @param xIndex:    X tile coordinate.
+        
+        @type  yIndex:    C{int}
+        @param yIndex:    Y tile coordinate.
+        """
+        self._chunks.pop((xIndex // self._chunkTiles, yIndex // self._chunkTiles), None)
+    
+    def Clear(self):
+        """
+        Throws out every baked chunk.
+        """
+        self._chunks.clear()
+    
+    def __get_chunk__(self, chunkX, chunkY):
+        """
+        Gets the chunk at the given chunk index, baking it if needed, and marks it as the most recently drawn.
+        
+        @type  chunkX:    C{int}
+        @param chunkX:    X chunk coordinate.
+        
+        @type  chunkY:    C{int}
+        @param chunkY:    Y chunk coordinate.
+        
+        @rtype:           C{(U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}, list)}
+        @return:          The baked surface (C{None} if empty) and the animated tiles in the chunk.
+        """
+        key = (chunkX, chunkY)
+        
+        chunk = self._chunks.pop(key, None)
+        if chunk is None:
+            chunk = self.__bake_chunk__(chunkX, chunkY)
+            
+            # make room by throwing out the least recently drawn
+            while len(self._chunks) >= self._maxChunks:
+                self._chunks.popitem(False)
+        
+        self._chunks[key] = chunk
+        return chunk
+    
+    def __bake_chunk__(self, chunkX, chunkY):
+        """
+        Draws every static tile in the chunk at the given chunk index onto a single surface.
+        
+        @type  chunkX:    C{int}
+        @param chunkX:    X chunk coordinate.
+        
+        @type  chunkY:    C{int}
+        @param chunkY:    Y chunk coordinate.
+        
+        @rtype:           C{(U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}, list)}
+        @return:          The baked surface (C{None} if empty) and the animated tiles in the chunk.
+        """
+        originX = chunkX * self._chunkWidth
+        originY = chunkY * self._chunkHeight
+        
+        surface = None
+        animatedTiles = []
+        
+        firstX = chunkX * self._chunkTiles
+        firstY = chunkY * self._chunkTiles
+        
+        for xIndex in range(firstX, firstX + self._chunkTiles):
+            for yIndex in range(firstY, firstY + self._chunkTiles):
+                tile = self._layer.TileAtIndex(xIndex, yIndex)
+                if tile is None or not tile.Visible:
+                    continue
+                
+                if tile._animations:
+                    animatedTiles.append(tile)
+                    continue
+                
+                if surface is None:
+                    surface = pygame.Surface((self._chunkWidth, self._chunkHeight), pygame.SRCALPHA)
+                    surface = surface.convert_alpha()
+                    surface.fill((0, 0, 0, 0))
+                
+                tileX, tileY = tile.Position
+                position = (tileX - originX, tileY - originY)
+                
+                if tile.image.get_flags() & pygame.SRCALPHA:
+                    # tiles don't overlap, so copy the pixels exactly instead of blending them onto the empty chunk
+                    surface.blit(tile.image, position, None, pygame.BLEND_RGBA_MAX)
+                else:
+                    surface.blit(tile.image, position)
+        
+        return (surface, animatedTiles)
+    
+    ############### PROPERTIES ###############
+    
+    def __get_num_chunks__(self):
+        return len(self._chunks)
+    def __get_max_chunks__(self):
+        return self._maxChunks
+    
+    NumCachedChunks = property(__get_num_chunks__, None, None, "How many chunks are currently baked.")
+    MaxCachedChunks = property(__get_max_chunks__, None, None, "The most chunks that can be baked at once, fit to the Cameras when they're drawn.")
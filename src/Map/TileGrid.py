@@ -0,0 +1,295 @@
+'''
+A compact grid of which tiles are filled in a L{GameTileLayer<GameTileLayer.GameTileLayer>}, used for fast collision queries.
+
+@author: Chris Alvarado-Dryden
+'''
+
+# NumPy is optional, queries fall back to plain Python without it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class TileGrid(object):
+    """
+    A compact grid of which tiles are filled in a L{GameTileLayer<GameTileLayer.GameTileLayer>}, used for fast
+    collision queries.  Instead of holding L{GameTile<GameTile.GameTile>}s, each cell holds a small number for the
+    type of tile there, 0 if the space is empty.  Areas of the grid can be searched without touching any tile objects.
+    
+    If U{NumPy<http://numpy.scipy.org/>} is installed, the grid is a NumPy array and every query is done on whole
+    areas at once.  Otherwise the grid is a C{bytearray} per column and queries loop in Python.
+    
+    All queries take tile indexes, inclusive on both ends, and are clipped to the layer.  Like
+    L{TileAtIndex<GameTileLayer.GameTileLayer.TileAtIndex>}, anything outside of the layer is empty.
+    
+    @type _layer:      L{GameTileLayer<GameTileLayer.GameTileLayer>}
+    @ivar _layer:      The layer the grid was built from.
+    
+    @type _width:      C{int}
+    @ivar _width:      How many tiles wide the grid is.
+    
+    @type _height:     C{int}
+    @ivar _height:     How many tiles high the grid is.
+    
+    @type _types:      C{list}
+    @ivar _types:      The classes of L{GameTile<GameTile.GameTile>} in the layer.  A tile's type code is its class's index
+                       in this list plus 1.
+    
+    @type _grid:       C{numpy.ndarray} | C{list}
+    @ivar _grid:       The type code of every space, arranged as C{[x][y]}.  A C{uint8} NumPy array, or a C{list} of
+                       C{bytearray} columns without NumPy.
+    """
+    
+    def __init__(self, layer, loaderLayer=None):
+        """
+        Builds the grid from all of the tiles currently in the given layer.  If the loader layer the tiles were just
+        made from is given, the grid is filled from its gids instead of looking at every tile.
+        
+        @type  layer:          L{GameTileLayer<GameTileLayer.GameTileLayer>}
+        @param layer:          The layer to build the grid from.
+        
+        @type  loaderLayer:    L{TileLayer<Utilities.tiledtmxloader.TileLayer>}
+        @param loaderLayer:    Layer data structure from the loader the tiles were made from, C{None} to look at
+                               every tile.
+        """
+        self._layer = layer
+        self._width = layer.WidthInTiles
+        self._height = layer.HeightInTiles
+        self._types = []
+        
+        if loaderLayer is not None:
+            self.__fill__(loaderLayer)
+            return
+        
+        if numpy:
+            self._grid = numpy.zeros((self._width, self._height), numpy.uint8)
+        else:
+            self._grid = [bytearray(self._height) for x in range(self._width)]
+        
+        for xIndex in range(self._width):
+            for yIndex in range(self._height):
+                self.Refresh(xIndex, yIndex)
+    
+    def Refresh(self, xIndex, yIndex):
+        """
+        Updates the grid at the given tile index to match the tile there.  Should be called whenever a tile is
+        added or removed.
+        
+        @type  xIndex:    C{int}
+        @param xIndex:    X tile coordinate.
+        
+        @type  yIndex:    C{int}
+        @param yIndex:    Y tile coordinate.
+        """
+        self._grid[xIndex][yIndex] = self.__type_code__(self._layer.TileAtIndex(xIndex, yIndex))
+    
+    def TilesInRect(self, left, top, right, bottom):
+        """
+        Gets all of the L{GameTile<GameTile.GameTile>}s in the given area, column by column from the left, and top
+        to bottom in each column.
+        
+        @type  left:      C{int}
+        @param left:      Leftmost X tile coordinate.
+        
+        @type  top:       C{int}
+        @param top:       Topmost Y tile coordinate.
+        
+        @type  right:     C{int}
+        @param right:     Rightmost X tile coordinate.
+        
+        @type  bottom:    C{int}
+        @param bottom:    Bottommost Y tile coordinate.
+        
+        @rtype:           C{list}
+        @return:          Tiles in the area.
+        """
+        left, top, right, bottom = self.__clip__(left, top, right, bottom)
+        if left > right or top > bottom:
+            return []
+        
+        if numpy:
+            xIndexes, yIndexes = self._grid[left:right + 1, top:bottom + 1].nonzero()
+            return [self._layer.TileAtIndex(left + x, top + y) for x, y in zip(xIndexes.tolist(), yIndexes.tolist())]
+        
+        tiles = []
+        for xIndex in range(left, right + 1):
+            column = self._grid[xIndex]
+            for yIndex in range(top, bottom + 1):
+                if column[yIndex]:
+                    tiles.append(self._layer.TileAtIndex(xIndex, yIndex))
+        return tiles
+    
+    def FirstSolidAlongX(self, startX, endX, top, bottom):
+        """
+        Walks the columns from C{startX} to C{endX} (in either direction) and finds the first one with a tile
+        between rows C{top} and C{bottom}.
+        
+        @type  startX:    C{int}
+        @param startX:    X tile coordinate of the first column to check.
+        
+        @type  endX:      C{int}
+        @param endX:      X tile coordinate of the last column to check.
+        
+        @type  top:       C{int}
+        @param top:       Topmost Y tile coordinate.
+        
+        @type  bottom:    C{int}
+        @param bottom:    Bottommost Y tile coordinate.
+        
+        @rtype:           C{int | None}
+        @return:          X tile coordinate of the first column with a tile, C{None} if there aren't any.
+        """
+        left, top, right, bottom = self.__clip__(min(startX, endX), top, max(startX, endX), bottom)
+        if left > right or top > bottom:
+            return None
+        
+        if numpy:
+            columns = self._grid[left:right + 1, top:bottom + 1].any(1).nonzero()[0]
+            if not len(columns):
+                return None
+            if startX <= endX:
+                return left + int(columns[0])
+            return left + int(columns[-1])
+        
+        if startX <= endX:
+            xIndexes = range(left, right + 1)
+        else:
+            xIndexes = range(right, left - 1, -1)
+        
+        for xIndex in xIndexes:
+            if any(self._grid[xIndex][top:bottom + 1]):
+                return xIndex
+        return None
+    
+    def FirstSolidAlongY(self, startY, endY, left, right):
+        """
+        Walks the rows from C{startY} to C{endY} (in either direction) and finds the first one with a tile
+        between columns C{left} and C{right}.
+        
+        @type  startY:    C{int}
+        @param startY:    Y tile coordinate of the first row to check.
+        
+        @type  endY:      C{int}
+        @param endY:      Y tile coordinate of the last row to check.
+        
+        @type  left:      C{int}
+        @param left:      Leftmost X tile coordinate.
+        
+        @type  right:     C{int}
+        @param right:     Rightmost X tile coordinate.
+        
+        @rtype:           C{int | None}
+        @return:          Y tile coordinate of the first row with a tile, C{None} if there aren't any.
+        """
+        left, top, right, bottom = self.__clip__(left, min(startY, endY), right, max(startY, endY))
+        if left > right or top > bottom:
+            return None
+        
+        if numpy:
+            rows = self._grid[left:right + 1, top:bottom + 1].any(0).nonzero()[0]
+            if not len(rows):
+                return None
+            if startY <= endY:
+                return top + int(rows[0])
+            return top + int(rows[-1])
+        
+        if startY <= endY:
+            yIndexes = range(top, bottom + 1)
+        else:
+            yIndexes = range(bottom, top - 1, -1)
+        
+        columns = self._grid[left:right + 1]
+        for yIndex in yIndexes:
+            for column in columns:
+                if column[yIndex]:
+                    return yIndex
+        return None
+    
+    def __fill__(self, loaderLayer):
+        """
+        Fills the grid from the gids the loader decoded for the layer.  Every tile with the same gid is the same
+        type, so only the first tile with each gid is looked at.  With NumPy, the gids are turned into type codes
+        for the whole grid in one pass.
+        
+        @type  loaderLayer:    L{TileLayer<Utilities.tiledtmxloader.TileLayer>}
+        @param loaderLayer:    Layer data structure from the loader the tiles were made from.
+        """
+        gidmap = loaderLayer.decoded_content
+        
+        # the loader layer can be offset in the editor, tiles outside of the map weren't loaded
+        left = max(loaderLayer.x, 0)
+        top = max(loaderLayer.y, 0)
+        right = min(loaderLayer.x + loaderLayer.width, self._width)
+        bottom = min(loaderLayer.y + loaderLayer.height, self._height)
+        
+        if numpy:
+            gids = numpy.zeros((self._width, self._height), numpy.uint32)
+            if left < right and top < bottom:
+                # the loader's gids go row by row, the grid is [x][y]
+                decoded = numpy.frombuffer(gidmap, numpy.dtype('u' + str(gidmap.itemsize))).reshape(loaderLayer.height, loaderLayer.width).T
+                gids[left:right, top:bottom] = decoded[left - loaderLayer.x:right - loaderLayer.x, top - loaderLayer.y:bottom - loaderLayer.y]
+            
+            # the first space each gid is in tells us its type, the inverse puts the codes back in place
+            uniqueGids, firstIndexes, inverse = numpy.unique(gids, return_index=True, return_inverse=True)
+            codes = numpy.zeros(len(uniqueGids), numpy.uint8)
+            for i, (gid, index) in enumerate(zip(uniqueGids.tolist(), firstIndexes.tolist())):
+                if gid != 0:
+                    xIndex, yIndex = divmod(index, self._height)
+                    codes[i] = self.__type_code__(self._layer.TileAtIndex(xIndex, yIndex))
+            
+            self._grid = codes[inverse].reshape(self._width, self._height)
+            return
+        
+        self._grid = [bytearray(self._height) for x in range(self._width)]
+        
+        codes = {0 : 0}
+        for xIndex in range(left, right):
+            column = self._grid[xIndex]
+            for yIndex in range(top, bottom):
+                gid = gidmap[(yIndex - loaderLayer.y) * loaderLayer.width + (xIndex - loaderLayer.x)]
+                if not codes.has_key(gid):
+                    codes[gid] = self.__type_code__(self._layer.TileAtIndex(xIndex, yIndex))
+                column[yIndex] = codes[gid]
+    
+    def __type_code__(self, tile):
+        """
+        Gets the type code for the given tile, giving its class a new code if it doesn't have one yet.
+        
+        @type  tile:      L{GameTile<GameTile.GameTile>} | C{None}
+        @param tile:      The tile, C{None} for an empty space.
+        
+        @rtype:           C{int}
+        @return:          The tile's type code, 0 for an empty space.
+        """
+        if tile is None:
+            return 0
+        
+        tileType = type(tile)
+        if tileType not in self._types:
+            if len(self._types) >= 255:
+                raise Exception('Too many tile types in layer ' + self._layer.Name + ' for its TileGrid')
+            self._types.append(tileType)
+        return self._types.index(tileType) + 1
+    
+    def __clip__(self, left, top, right, bottom):
+        """
+        Clips an area of tile indexes to the grid.  If the area is completely outside of the grid, left will be
+        greater than right or top will be greater than bottom.
+        
+        @rtype:           C{(int, int, int, int)}
+        @return:          The clipped left, top, right and bottom tile indexes, inclusive.
+        """
+        return (max(int(left), 0), max(int(top), 0), min(int(right), self._width - 1), min(int(bottom), self._height - 1))
+    
+    ############### PROPERTIES ###############
+    
+    def __get_width__(self):
+        return self._width
+    def __get_height__(self):
+        return self._height
+    def __get_vectorized__(self):
+        return numpy is not None
+    
+    Width = property(__get_width__, None, None, "How many tiles wide the grid is.")
+    Height = property(__get_height__, None, None, "How many tiles high the grid is.")
+    Vectorized = property(__get_vectorized__, None, None, "C{True} if queries are done with NumPy, C{False} if they loop in Python.")
@@ -84,6 +84,15 @@ class Box(Widget):
         self._image.convert_alpha()
         self._image.fill(self.Color)
         
+    def __draw_state__(self):
+        """
+        Gets everything about this Box that changes how it's drawn, including its color.
+        
+        @rtype:        C{tuple}
+        @return:       Values that are equal as long as the Box looks the same.
+        """
+        return Widget.__draw_state__(self) + (tuple(self._color),)
+        
     def ToXMLString(self):
         """
         Generates XML to create this Widget.
@@ -0,0 +1,141 @@
+'''
+Rendered characters of a font, put together to draw text that changes often.
+
+@author: Chris Alvarado-Dryden
+'''
+import pygame
+
+class GlyphAtlas(object):
+    """
+    Rendered characters (glyphs) of a font in one color, put together side by side to draw text without rendering the
+    font every time the text changes.  Each character is only rendered the first time it's needed, so text made from a
+    small set of characters, like the digits of a timer or score, never has to go through the font again.
+    
+    Characters are placed one after another without kerning, which suits numbers (most fonts give every digit the same
+    width) but may look off for other text.
+    
+    @type _font:       U{C{pygame.Font}<http://www.pygame.org/docs/ref/font.html#pygame.font.Font>}
+    @ivar _font:       pygame Font object used to render the glyphs.
+    
+    @type _color:      C{(int, int, int, int)}
+    @ivar _color:      The color of the glyphs.
+    
+    @type _bgColor:    C{(int, int, int, int)}
+    @ivar _bgColor:    The background color of the glyphs, C{None} if it's clear.
+    
+    @type _glyphs:     C{dict}
+    @ivar _glyphs:     C{{str : U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}} - Rendered glyphs keyed
+                       by character.
+    """
+    
+    def __init__(self, font, color, bgColor=None):
+        """
+        Creates an empty GlyphAtlas for the given font and colors.
+        
+        @type  font:       U{C{pygame.Font}<http://www.pygame.org/docs/ref/font.html#pygame.font.Font>}
+        @param font:       pygame Font object used to render the glyphs.
+        
+        @type  color:      U{C{pygame.color}<http://www.pygame.org/docs/ref/color.html>}
+        @param color:      The color of the glyphs.
+        
+        @type  bgColor:    U{C{pygame.color}<http://www.pygame.org/docs/ref/color.html>}
+        @param bgColor:    The background color of the glyphs.  If C{None} it will be clear.
+        """
+        self._font = font
+        self._color = tuple(color)
+        if bgColor:
+            self._bgColor = tuple(bgColor)
+        else:
+            self._bgColor = None
+        self._glyphs = {}
+    
+    def Matches(self, font, color, bgColor=None):
+        """
+        Checks if this GlyphAtlas renders with the given font and colors.
+        
+        @type  font:       U{C{pygame.Font}<http://www.pygame.org/docs/ref/font.html#pygame.font.Font>}
+        @param font:       pygame Font object.
+        
+        @type  color:      U{C{pygame.color}<http://www.pygame.org/docs/ref/color.html>}
+        @param color:      Color of the text.
+        
+        @type  bgColor:    U{C{pygame.color}<http://www.pygame.org/docs/ref/color.html>}
+        @param bgColor:    Background color of the text, or C{None}.
+        
+        @rtype:            C{bool}
+        @return:           C{True} if the glyphs can be used for text in that font and those colors, C{False} otherwise.
+        """
+        if bgColor:
+            bgColor = tuple(bgColor)
+        else:
+            bgColor = None
+        
+        return font is self._font and tuple(color) == self._color and bgColor == self._bgColor
+    
+    def Render(self, text, surface=None):
+        """
+        Draws the text from the glyphs, rendering any characters that haven't been rendered before.
+        
+        @type  text:       C{str}
+        @param text:       Text to draw.  Newline characters will be ignored.
+        
+        @type  surface:    C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @param surface:    Surface returned by an earlier call, to draw into again if the new text is the same size.
+                           Otherwise a new surface is made.
+        
+        @rtype:            C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @return:           The drawn text.
+        """
+        glyphs = [self.__glyph__(c) for c in text if c != '\n']
+        
+        width = sum([glyph.get_width() for glyph in glyphs])
+        height = self._font.get_height()
+        
+        if surface is None or surface.get_size() != (width, height):
+            if self._bgColor:
+                surface = pygame.Surface((width, height))
+            else:
+                surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        
+        if self._bgColor:
+            surface.fill(self._bgColor)
+            blend = 0
+        else:
+            # copy the glyphs' alpha values exactly, instead of blending them into the empty surface
+            surface.fill((0, 0, 0, 0))
+            blend = pygame.BLEND_RGBA_MAX
+        
+        x = 0
+        for glyph in glyphs:
+            surface.blit(glyph, (x, 0), None, blend)
+            x += glyph.get_width()
+        
+        return surface
+    
+    def __glyph__(self, character):
+        """
+        Gets the rendered glyph for a character, rendering it if it hasn't been.
+        
+        @type  character:    C{str}
+        @param character:    The character.
+        
+        @rtype:              C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @return:             The rendered glyph.
+        """
+        glyph = self._glyphs.get(character)
+        if glyph is None:
+            # pygame doc not accurate.  Can't pass None as last argument
+            if self._bgColor:
+                glyph = self._font.render(character, True, self._color, self._bgColor)
+            else:
+                glyph = self._font.render(character, True, self._color)
+            self._glyphs[character] = glyph
+        
+        return glyph
+    
+    ############### PROPERTIES ###############
+    
+    def __get_num_glyphs__(self):
+        return len(self._glyphs)
+    
+    NumGlyphs = property(__get_num_glyphs__, None, None, "How many characters have been rendered.")
@@ -41,6 +41,10 @@ class Meter(Box):
     
     @type _amountFunc:    C{func}
     @ivar _amountFunc:    Function used to get the ratio of current value / maximum value.
+    
+    @type _fillWidth:     C{int}
+    @ivar _fillWidth:     How many pixels wide the filled part of the meter is.  Only worked out again when L{_amount} or
+                          L{_max} change.
     """
 
     def __init__(self, position, width, height, color, amountFunc, maxFunc):
@@ -70,11 +74,16 @@ class Meter(Box):
         """
         Box.__init__(self, position, width, height, color)
         
+        # one full meter, only the filled part of it is drawn
+        self._image = pygame.Surface((self._rect.width, self._rect.height))
+        self._image.fill(self.Color)
+        
         self._maxFunc = maxFunc
         self._amountFunc = amountFunc
         
         self._max = self._maxFunc()
         self._amount = self._amountFunc()
+        self.__measure_fill__()
         
     def Update(self, dt):
         """
@@ -83,19 +92,50 @@ class Meter(Box):
         @type  dt:        C{float}
         @param dt:        Time in seconds since the last frame refresh.
         """
-        self._max = self._maxFunc()
-        self._amount = self._amountFunc()
+        maxAmount = self._maxFunc()
+        amount = self._amountFunc()
+        
+        if amount == self._amount and maxAmount == self._max:
+            return
+        
+        self._max = maxAmount
+        self._amount = amount
+        self.__measure_fill__()
+    
+    def __measure_fill__(self):
+        """
+        Works out how wide the filled part of the meter is.
+        """
+        percentFill = max(min(float(self._amount) / float(self._max), 1.0), 0.0)
+        self._fillWidth = int(self._rect.width * percentFill)
+        
+    def __draw_state__(self):
+        """
+        Gets everything about this Meter that changes how it's drawn, including how much of it is filled.
         
-    def DrawTo(self, surf):
+        @rtype:        C{tuple}
+        @return:       Values that are equal as long as the Meter looks the same.
+        """
+        return Box.__draw_state__(self) + (self._fillWidth,)
+        
+    def DrawTo(self, surf, offset=(0, 0)):
         """
         Draws the amount of the meter currently filled to the given Surface if its visible.  If the Widget is not
         completely within its parent's panel, it will be clipped.
         
         @type  surf:        C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
         @param surf:        Surface to draw this Widget to.
+        
+        @type  offset:      C{(int, int)}
+        @param offset:      Absolute coordinate of the top left corner of the Surface.
         """
-        percentFill = min(float(self._amount) / float(self._max), 1.0)
-        self._image = pygame.Surface((self._rect.width * percentFill, self._rect.height))
-        self._image.fill(self.Color)
+        if not self.Visible or self._fillWidth <= 0:
+            return
         
-        Box.DrawTo(self, surf)
+        # the full meter cut off at the filled width
+        area = self.__drawable_area__()
+        area.width = min(area.width, self._fillWidth)
+        if area.width > 0 and area.height > 0:
+            area.topleft = (0, 0)
+            x, y = self.AbsolutePosition
+            surf.blit(self._image, (x - offset[0], y - offset[1]), area)
@@ -5,14 +5,55 @@ An organizational structure used to hold L{Widget<UI.Widget.Widget>}s.
 '''
 
 import os
+import pygame
 
+# NumPy is optional, translucent children are drawn straight to the target without it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from Core import Constants
 from UI.Widget import Widget
+from Utilities.DirtyRects import DirtyRects
 
 class Panel(Widget):
     """
     An organizational structure used to hold L{Widget<UI.Widget.Widget>}s.  Panels 
     do not have have any logic or graphics, but they will clip any child widgets.
     
+    The children are composed onto a surface of the Panel's own, which is drawn with a single blit.  Every time the
+    Panel is drawn, each child is checked for anything that changes how it looks (its
+    L{draw state<Widget.__draw_state__>}), like moving, being hidden, or its text or image changing.  Only if something
+    has changed are the children composed again.  Composing costs more than drawing the children once, so a Panel that
+    changes again within L{BUSY_FRAMES<Core.Constants.UIConstants.BUSY_FRAMES>} of its last change, like one holding a
+    timer, is busy and draws its children straight to the target until it has stayed the same that long.  A change
+    makes every Panel above it change as well, so they're busy along with it.  A Panel whose visible children are all
+    Panels, like L{Camera.windowPanel<Utilities.Camera.Camera.windowPanel>}, doesn't compose them again, but draws
+    each one as its own layer, so a HUD in one corner changing doesn't compose the whole window.
+    
+    When every visible child is L{opaque<Widget.__opaque__>}, they're simply drawn onto the composed surface.
+    Blending translucent children onto a surface with per pixel alpha doesn't give the same result as blending them
+    onto the screen one at a time, so instead they're drawn once over black and once over white.  Over black, each
+    pixel is the children's color already multiplied by how much they cover it, and the difference between the two
+    is how much of the background still shows through.  Together they give the color and alpha of a surface that
+    blends onto anything the same way the children would have, give or take rounding in the color and alpha.  Drawn
+    once, a channel can be a few levels off from drawing the children one at a time (C{composetest.py} checks it's
+    at most 4).  Drawn over itself frame after frame, like the example menus, each pixel stops changing once pygame's
+    blend rounds the change to nothing, which for a faint pixel can be 256 / alpha levels from the color, so where the
+    composed and the one at a time drawing settle can be further apart, up to 16 levels in the example menus.  This
+    needs U{NumPy<http://numpy.scipy.org/>}, without it Panels with translucent children draw them straight to the
+    target every time, and only check if they can be composed again when a child is added or removed.
+    
+    When drawn straight to the display, the Panel L{marks<Utilities.DirtyRects.DirtyRects.Mark>} where it was and
+    where it is now as changed when it moves.  When it's composed again, the area it covers is compared before and
+    after it's drawn, and only the part that changed is marked, so a button changing color in a full screen menu
+    doesn't cause the whole display to be updated.  A Panel that's see-through anywhere blends over what was on the
+    display last frame, so even if it stays the same, drawing it again keeps changing the window until the blend
+    settles.  After it's composed, moved, or drawn again after a frame it wasn't drawn in, it's compared and marked
+    like this until drawing it doesn't change anything.  Without NumPy, Panels are marked whole when they're composed
+    again, and Panels drawing their children straight to the display are marked every time they're drawn.
+    
     @type _rect:          U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}
     @ivar _rect:          The dimensions and position of the Widget in pixels.  The position
                           is relative to its parent's position.
@@ -25,6 +66,63 @@ class Panel(Widget):
     
     @type _children:      C{list}
     @ivar _children:      List of L{Widget<UI.Widget.Widget>}s that belong to this Panel.
+    
+    @type _composed:      U{C{pygame.Surface}<http://www.pygame.org/docs/ref/surface.html>}
+    @ivar _composed:      The children drawn together, covering only the part of the Panel they take up.  C{None} if
+                          there's nothing to draw, or the children aren't composed.
+    
+    @type _compose:       C{bool}
+    @ivar _compose:       C{True} if the children are composed onto L{_composed}, C{False} if they're drawn straight to
+                          the target because some of them are translucent and NumPy isn't installed.  C{None} if it
+                          hasn't been checked since the children last changed.
+    
+    @type _translucent:   C{bool}
+    @ivar _translucent:   C{True} if some of the visible children are translucent, so they're composed over black and
+                          white.
+    
+    @type _blends:        C{bool}
+    @ivar _blends:        C{True} if L{_composed} is partly see-through anywhere, so drawing it again over itself
+                          changes how it looks.
+    
+    @type _backdrops:     C{list}
+    @ivar _backdrops:     C{[U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}]} - The surfaces
+                          translucent children are drawn onto over black and over white, kept to be drawn onto again.
+    
+    @type _bounds:        U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}
+    @ivar _bounds:        The part of the Panel its visible children cover, relative to the Panel.  C{None} if there's
+                          nothing to draw.
+    
+    @type _composeKey:    C{tuple}
+    @ivar _composeKey:    The Panel's drawable area and each child's draw state when the children were last composed.
+    
+    @type _dirty:         C{bool}
+    @ivar _dirty:         C{True} if the children need to be composed again before the Panel is drawn.
+    
+    @type _version:       C{int}
+    @ivar _version:       Counts how many times the children have changed, so the Panel's parent knows to compose again.
+    
+    @type _frames:        C{int}
+    @ivar _frames:        Counts how many times the Panel has been gotten ready to draw.
+    
+    @type _changedFrame:  C{int}
+    @ivar _changedFrame:  The L{frame<_frames>} the children last changed in.
+    
+    @type _layered:       C{bool}
+    @ivar _layered:       C{True} if every visible child is a Panel, so each is drawn as its own layer instead.
+    
+    @type _busy:          C{bool}
+    @ivar _busy:          C{True} if the children have been changing too often to be worth composing, so they're drawn
+                          straight to the target.
+    
+    @type _shownRect:     C{(int, int, int, int)}
+    @ivar _shownRect:     Where L{_composed} was last drawn on the display, as a rect.  C{None} if it isn't on the display.
+    
+    @type _shownFrame:    C{int}
+    @ivar _shownFrame:    The L{display frame<Utilities.DirtyRects.DirtyRects.Frame>} the Panel was last drawn to the
+                          display in.
+    
+    @type _settling:      C{bool}
+    @ivar _settling:      C{True} if drawing the Panel may still change the display, so it's compared before and after.
     """
 
     def __init__(self, position, width, height):
@@ -43,6 +141,25 @@ class Panel(Widget):
         """
         Widget.__init__(self, position, width, height)
         self._children = []
+        
+        self._composed = None
+        self._compose = None
+        self._translucent = False
+        self._blends = False
+        self._backdrops = None
+        self._bounds = None
+        self._composeKey = None
+        self._dirty = True
+        self._version = 0
+        
+        self._frames = 0
+        self._changedFrame = -Constants.UIConstants.BUSY_FRAMES
+        self._layered = False
+        self._busy = False
+        
+        self._shownRect = None
+        self._shownFrame = None
+        self._settling = False
     
     @staticmethod
     def PanelFromXML(path, basePath, map):
@@ -86,6 +203,8 @@ class Panel(Widget):
         """
         self._children.append(child)
         child._parent = self
+        child.__invalidate_layout__()
+        self._compose = None
         
         # special casing to add menu buttons to nearest menus
         from UI.Menu.MenuButton import MenuButton
@@ -104,6 +223,8 @@ class Panel(Widget):
         if child in self._children:
             self._children.remove(child)
             child._parent = None
+            child.__invalidate_layout__()
+            self._compose = None
 
     def Update(self, dt):
         """
@@ -115,6 +236,13 @@ class Panel(Widget):
         for child in self._children:
             child.Update(dt)
     
+    def ReleaseImages(self):
+        """
+        Releases the images of every child back to the L{AssetCache<Core.AssetCache.AssetCache>}.
+        """
+        for child in self._children:
+            child.ReleaseImages()
+    
     def IsParentOf(self, child):
         """
         Returns C{True} if this Panel is the parent of the Widget at any level of the family tree.
@@ -127,20 +255,333 @@ class Panel(Widget):
         """
         return child.IsChildOf(self)
         
-    def DrawTo(self, surf):
+    def DrawTo(self, surf, offset=(0, 0)):
         """
-        Draws this Panel's children to the given Surface if its visible.
+        Draws this Panel's children to the given Surface if its visible.  Composed children are only composed again if
+        something about them has changed since the last time.  If the Surface is the display, any area that changed
+        is marked.
         
         @type  surf:        C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
         @param surf:        Surface to draw to.
+        
+        @type  offset:      C{(int, int)}
+        @param offset:      Absolute coordinate of the top left corner of the Surface.
         """
         if not self.Visible:
+            self.__mark_shown__(None)
+            return
+        
+        self.__prepare__()
+        
+        x, y = self.AbsolutePosition
+        onDisplay = surf is pygame.display.get_surface()
+        
+        if self._compose and self._layered:
+            for child in self._children:
+                child.DrawTo(surf, offset)
+            
+            # each layer marks itself, this is only for when they're all hidden or shown
+            if onDisplay:
+                rect = None
+                if self._bounds:
+                    rect = (x + self._bounds.left - offset[0], y + self._bounds.top - offset[1]) + self._bounds.size
+                if rect != self._shownRect:
+                    self.__mark_shown__(rect)
+            return
+        
+        if not self._compose or self._busy:
+            for child in self._children:
+                child.DrawTo(surf, offset)
+            
+            if onDisplay:
+                area = self.__drawable_area__()
+                self.__mark_shown__((x - offset[0], y - offset[1]) + area.size)
+            return
+        
+        changed = self._dirty
+        if changed:
+            self.__compose__()
+        
+        rect = None
+        if self._composed:
+            topleft = (x + self._bounds.left - offset[0], y + self._bounds.top - offset[1])
+            rect = topleft + self._bounds.size
+            
+            if not onDisplay:
+                surf.blit(self._composed, topleft)
+            else:
+                dirtyRects = DirtyRects()
+                moved = rect != self._shownRect
+                
+                # see what changed after composing, and keep blending over whatever was left on the display until
+                # it settles
+                if changed or moved or (self._blends and self._shownFrame != dirtyRects.Frame - 1):
+                    self._settling = numpy is not None
+                self._shownFrame = dirtyRects.Frame
+                
+                # no need to look if it's going to be updated anyway, like a HUD over a camera
+                if self._settling and not moved and not dirtyRects.Covers(rect):
+                    dirty = self.__blit_changes__(surf, topleft, rect)
+                    if dirty:
+                        dirtyRects.Mark(dirty)
+                    
+                    self._settling = self._blends and dirty is not None
+                    changed = False
+                else:
+                    surf.blit(self._composed, topleft)
+        
+        if onDisplay and (changed or rect != self._shownRect):
+            self.__mark_shown__(rect)
+    
+    def __blit_changes__(self, surf, topleft, rect):
+        """
+        Draws L{_composed} to the given Surface and finds the part of it that changed.
+        
+        @type  surf:        C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @param surf:        Surface to draw to.
+        
+        @type  topleft:     C{(int, int)}
+        @param topleft:     Where to draw L{_composed} on the Surface.
+        
+        @type  rect:        C{(int, int, int, int)}
+        @param rect:        The area of the Surface L{_composed} covers.
+        
+        @rtype:             U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}
+        @return:            The smallest area holding every pixel that changed, C{None} if nothing did.
+        """
+        area = pygame.Rect(rect).clip(surf.get_rect())
+        if area.width <= 0 or area.height <= 0:
+            surf.blit(self._composed, topleft)
+            return None
+        
+        before = pygame.surfarray.array2d(surf.subsurface(area))
+        surf.blit(self._composed, topleft)
+        changes = before != pygame.surfarray.array2d(surf.subsurface(area))
+        
+        # surfarrays are indexed by x first
+        columns = numpy.flatnonzero(changes.any(1))
+        if not len(columns):
+            return None
+        rows = numpy.flatnonzero(changes.any(0))
+        
+        return pygame.Rect(area.left + columns[0], area.top + rows[0], columns[-1] - columns[0] + 1, rows[-1] - rows[0] + 1)
+    
+    def __mark_shown__(self, rect):
+        """
+        Marks where the Panel was last drawn on the display and where it is now as changed.
+        
+        @type  rect:    C{(int, int, int, int)}
+        @param rect:    Where the Panel is now on the display, C{None} if it isn't drawn.
+        """
+        if self._shownRect is None and rect is None:
             return
         
+        dirtyRects = DirtyRects()
+        if self._shownRect and self._shownRect != rect:
+            dirtyRects.Mark(self._shownRect)
+        if rect:
+            dirtyRects.Mark(rect)
+        
+        self._shownRect = rect
+    
+    def __prepare__(self):
+        """
+        Gets every child ready to be drawn, and marks the Panel as needing to compose them again if any of their
+        draw states changed.  Works out if the Panel is L{busy<_busy>} or L{layered<_layered>} too.  Without NumPy, a
+        Panel with translucent children doesn't compose them, and isn't checked again until a child is added or
+        removed.
+        """
+        if not self.Visible:
+            return
+        
+        if self._compose is None:
+            self._compose = numpy is not None or self.__opaque__()
+            if not self._compose:
+                self.__stop_composing__()
+        
+        if not self._compose:
+            return
+        
+        self._frames += 1
+        
         for child in self._children:
-            child.DrawTo(surf)
+            child.__prepare__()
+        
+        key = (tuple(self.__drawable_area__()), [child.__draw_state__() for child in self._children])
+        if key != self._composeKey:
+            self._composeKey = key
+            self._dirty = True
+            self._version += 1
             
+            self._busy = self._frames - self._changedFrame < Constants.UIConstants.BUSY_FRAMES
+            self._changedFrame = self._frames
             
+            self._bounds = self.__children_bounds__()
+            self._layered = self._bounds is not None
+            for child in self._children:
+                if child.Visible and not isinstance(child, Panel):
+                    self._layered = False
+            self._translucent = not self.__opaque__()
+            if self._translucent and numpy is None:
+                self._compose = False
+                self.__stop_composing__()
+        elif self._busy and self._frames - self._changedFrame >= Constants.UIConstants.BUSY_FRAMES:
+            # settled down, compose the children next time it's drawn
+            self._busy = False
+    
+    def __stop_composing__(self):
+        """
+        Throws out everything kept for composing, once the Panel draws its children straight to the target instead.
+        """
+        self._composed = None
+        self._backdrops = None
+        self._composeKey = None
+        self._settling = False
+    
+    def __opaque__(self):
+        """
+        Checks if every visible child is L{opaque<Widget.__opaque__>}, so drawing them doesn't blend with what's
+        under them.  Without NumPy, hidden children are checked too, since the Panel only checks again once a
+        child is added or removed.
+        
+        @rtype:        C{bool}
+        @return:       C{True} if none of the children draw anything translucent, C{False} otherwise.
+        """
+        for child in self._children:
+            if (child.Visible or numpy is None) and not child.__opaque__():
+                return False
+        
+        return True
+    
+    def __children_bounds__(self):
+        """
+        Works out the part of the Panel its visible children cover.  A child sticking out past the Panel's top or left
+        edge is clipped to a smaller size, but still drawn from its own position, so the area can reach outside of
+        the Panel there.
+        
+        @rtype:        U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}
+        @return:       The covered area relative to the Panel.  C{None} if there's nothing to draw.
+        """
+        bounds = None
+        for child in self._children:
+            if child.Visible:
+                drawn = child.__drawn_area__()
+                if drawn.width <= 0 or drawn.height <= 0:
+                    continue
+                
+                if bounds is None:
+                    bounds = drawn
+                else:
+                    bounds.union_ip(drawn)
+        
+        return bounds
+    
+    def __drawn_area__(self):
+        """
+        Returns the area the composed children are drawn to, relative to the Panel's parent.
+        
+        @rtype:        C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}
+        @return:       Area that's drawn to.
+        """
+        if not self._compose or not self._bounds:
+            return Widget.__drawn_area__(self)
+        
+        return self._bounds.move(self._rect.topleft)
+    
+    def __draw_state__(self):
+        """
+        Gets everything about this Panel that changes how it's drawn, including whether its children have changed.
+        
+        @rtype:        C{tuple}
+        @return:       Values that are equal as long as the Panel looks the same.
+        """
+        return (self.Visible, tuple(self._rect), self._version)
+    
+    def __compose__(self):
+        """
+        Draws the visible children onto L{_composed}, which is only as big as the part of the Panel they cover
+        (L{_bounds}).  Translucent children are composed over black and white, see L{__compose_translucent__}.
+        """
+        self._dirty = False
+        
+        # only the part of the panel that has something in it
+        bounds = self._bounds
+        if not bounds:
+            self._composed = None
+            return
+        
+        if self._composed is None or self._composed.get_size() != bounds.size:
+            self._composed = pygame.Surface(bounds.size, pygame.SRCALPHA, 32)
+        
+        x, y = self.AbsolutePosition
+        origin = (x + bounds.left, y + bounds.top)
+        
+        if self._translucent:
+            self.__compose_translucent__(origin)
+        else:
+            self._composed.fill((0, 0, 0, 0))
+            for child in self._children:
+                child.DrawTo(self._composed, origin)
+            
+            self._blends = False
+    
+    def __compose_translucent__(self, origin):
+        """
+        Draws the visible children over black and over white, and works out the color and alpha of L{_composed} from
+        the two, so drawing it blends the same as drawing each child in turn.
+        
+        Drawn over black, each pixel is the children's color times how much they cover it (a premultiplied color).
+        Drawn over white, each pixel also has 255 times how much of the background still shows through, so the
+        difference between the two is how see-through the children are there.
+        
+        @type  origin:      C{(int, int)}
+        @param origin:      Absolute coordinate of the top left corner of L{_composed}.
+        """
+        size = self._composed.get_size()
+        
+        if not self._backdrops or self._backdrops[0].get_size() != size:
+            self._backdrops = [pygame.Surface(size, 0, 32), pygame.Surface(size, 0, 32)]
+        
+        for backdrop, color in zip(self._backdrops, ((0, 0, 0), (255, 255, 255))):
+            backdrop.fill(color)
+            for child in self._children:
+                child.DrawTo(backdrop, origin)
+        
+        overBlack = pygame.surfarray.pixels3d(self._backdrops[0])
+        overWhite = pygame.surfarray.pixels3d(self._backdrops[1])
+        
+        # each channel should show the same amount of background, give or take rounding
+        shown = overWhite.astype(numpy.int16)
+        shown -= overBlack
+        alpha = shown.sum(2, dtype=numpy.int16) / numpy.float32(3.0)
+        numpy.subtract(255.0, alpha, alpha)
+        numpy.clip(numpy.rint(alpha, alpha), 0.0, 255.0, alpha)
+        
+        # take the alpha back out of the color
+        color = overBlack * (numpy.float32(255.0) / numpy.maximum(alpha, 1.0))[:, :, numpy.newaxis]
+        color += 0.5
+        numpy.minimum(color, 255.0, color)
+        del overBlack, overWhite
+        
+        pixels = pygame.surfarray.pixels3d(self._composed)
+        pixels[...] = color
+        del pixels
+        
+        pixels = pygame.surfarray.pixels_alpha(self._composed)
+        pixels[...] = alpha
+        del pixels
+        
+        self._blends = bool(((alpha > 0.0) & (alpha < 255.0)).any())
+    
+    def __invalidate_layout__(self):
+        """
+        Throws out the cached absolute position and drawable area of this Panel and all of its children.
+        """
+        Widget.__invalidate_layout__(self)
+        for child in self._children:
+            child.__invalidate_layout__()
+            
+    
     def __get_nearest_menu__(self):
         """
         Looks up the family tree and returns the nearest Menu, starting with itself.
@@ -8,6 +8,7 @@ import pygame
 import Utilities
 from Core import Constants
 from UI.Widget import Widget
+from UI.GlyphAtlas import GlyphAtlas
 
 class Text(Widget):
     """
@@ -16,6 +17,10 @@ class Text(Widget):
     The Text widget's width and height are determined by the text itself, not by the Widget's attributes.
     Alpha values will only be read for the text (not the background) but applied to both.
     
+    The text is only rendered again when the text, font or colors change.  Text that changes often, like a timer or
+    score, can be put together from a L{GlyphAtlas<UI.GlyphAtlas.GlyphAtlas>} instead (see L{UseGlyphs}), so it doesn't
+    need the font at all once each character has been rendered.
+    
     @type _rect:          U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}
     @ivar _rect:          The dimensions and position of the Widget in pixels.  The position is
                           relative to its parent's position.
@@ -42,6 +47,15 @@ class Text(Widget):
     @type _fontSize:      C{int}
     @ivar _fontSize:      Size of the font.
     
+    @type _renderedKey:   C{tuple}
+    @ivar _renderedKey:   The text, font and colors L{_image} was rendered with, C{None} if it needs to be rendered.
+    
+    @type _useGlyphs:     C{bool}
+    @ivar _useGlyphs:     C{True} if the text is put together from L{_glyphAtlas}, C{False} if the font renders it.
+    
+    @type _glyphAtlas:    L{GlyphAtlas<UI.GlyphAtlas.GlyphAtlas>}
+    @ivar _glyphAtlas:    Rendered characters of the font in the current colors, C{None} until glyphs are used.
+    
     @type Visible:        C{bool}
     @ivar Visible:        C{True} if the Widget should be drawn, C{False} otherwise.
     
@@ -150,15 +164,33 @@ class Text(Widget):
         
         self._fontBGColor = fontBGColor
         
+        self._renderedKey = None
+        self._useGlyphs = False
+        self._glyphAtlas = None
+        
         self.__build_surface__()
         
     def __build_surface__(self):
         """
-        Renders the font to the L{_image} surface so it can be drawn.
+        Renders the font to the L{_image} surface so it can be drawn, unless it's already been rendered with the
+        current text, font and colors.
         """
-        # pygame doc not accurate.  Can't pass None as last argument
-        # could optimize by putting this in constructor and storing surface
+        # colors can be changed in place, so compare their values
         if self._fontBGColor:
+            bgColor = tuple(self._fontBGColor)
+        else:
+            bgColor = None
+        key = (self.Text, self._font, tuple(self._fontColor), bgColor, self._useGlyphs)
+        if key == self._renderedKey:
+            return
+        self._renderedKey = key
+        
+        if self._useGlyphs:
+            if not self._glyphAtlas or not self._glyphAtlas.Matches(self._font, self._fontColor, self._fontBGColor):
+                self._glyphAtlas = GlyphAtlas(self._font, self._fontColor, self._fontBGColor)
+            fontSurf = self._glyphAtlas.Render(self.Text, self._image)
+        # pygame doc not accurate.  Can't pass None as last argument
+        elif self._fontBGColor:
             fontSurf = self._font.render(self.Text, True, self._fontColor, self._fontBGColor)
         else:
             fontSurf = self._font.render(self.Text, True, self._fontColor)
@@ -168,20 +200,39 @@ class Text(Widget):
         if self._fontColor.a < 255:
             self._image.set_alpha(self._fontColor.a)
         
-        self._rect.w = self._image.get_width()
-        self._rect.h = self._image.get_height()
+        if self._image.get_size() != self._rect.size:
+            self._rect.size = self._image.get_size()
+            self.__invalidate_layout__()
         
-    def DrawTo(self, surf):
+    def DrawTo(self, surf, offset=(0, 0)):
         """
         Draws the text to the given Surface if its visible.  If the Widget is not completely within
-        its parent's panel, it will be clipped.
+        its parent's panel, it will be clipped.  The text is rendered again first if it's changed.
         
         @type  surf:        C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
         @param surf:        Surface to draw this Widget to.
+        
+        @type  offset:      C{(int, int)}
+        @param offset:      Absolute coordinate of the top left corner of the Surface.
         """
 
         self.__build_surface__()
-        Widget.DrawTo(self, surf)
+        Widget.DrawTo(self, surf, offset)
+    
+    def __prepare__(self):
+        """
+        Renders the text again if it's changed.
+        """
+        self.__build_surface__()
+    
+    def __draw_state__(self):
+        """
+        Gets everything about this Text that changes how it's drawn, including what it was rendered with.
+        
+        @rtype:        C{tuple}
+        @return:       Values that are equal as long as the Text looks the same.
+        """
+        return Widget.__draw_state__(self) + (self._renderedKey,)
         
     def ToXMLString(self):
         """
@@ -218,4 +269,17 @@ class Text(Widget):
         xmlString += '/>\n'
         
         return xmlString
-        
\ No newline at end of file
+    
+    ############### PROPERTIES ###############
+    
+    def __get_use_glyphs__(self):
+        return self._useGlyphs
+    def __set_use_glyphs__(self, value):
+        self._useGlyphs = value
+        
+        # a glyph surface can't be reused for the font, or the other way around
+        self._image = None
+        self._renderedKey = None
+        self.__build_surface__()
+    
+    UseGlyphs = property(__get_use_glyphs__, __set_use_glyphs__, None, "C{True} if the text is put together from rendered characters of the font, for text that changes often.  C{False} if the whole text is rendered by the font.")
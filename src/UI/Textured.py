@@ -7,6 +7,7 @@ A widget which displays a graphic from a file.
 import UI
 import pygame, os
 from Core import Constants
+from Core.AssetCache import AssetCache
 
 class Textured(UI.Widget.Widget):
     """
@@ -20,11 +21,14 @@ class Textured(UI.Widget.Widget):
     @ivar _parent:        The Panel this Widget belongs to.
     
     @type _image:         U{C{pygame.Surface}<http://www.pygame.org/docs/ref/surface.html>}
-    @ivar _image:         Image to draw to the screen.
+    @ivar _image:         Image to draw to the screen.  Shared through the L{AssetCache<Core.AssetCache.AssetCache>}.
     
     @type _relPath:       C{str}
     @ivar _relPath:       File path to the image file, relative to the map file path this element is contained in. 
     
+    @type _path:          C{str}
+    @ivar _path:          Absolute file path to the image file, C{None} once it's been L{released<ReleaseImages>}.
+    
     @type Visible:        C{bool}
     @ivar Visible:        C{True} if the Widget should be drawn, C{False} otherwise.
     """
@@ -78,12 +82,21 @@ class Textured(UI.Widget.Widget):
         UI.Widget.Widget.__init__(self, position, width, height)
         
         self._relPath = absSurfPath.lstrip(os.path.normpath(os.path.realpath(Constants.GameConstants.BASE_PATH)))
-        path = os.path.normpath(os.path.realpath(absSurfPath))
+        self._path = os.path.normpath(os.path.realpath(absSurfPath))
         
-        self._image = pygame.image.load(path)
-        self._image.convert_alpha()
-
+        self._image = AssetCache().LoadImage(self._path)
+    
+    def ReleaseImages(self):
+        """
+        Releases the graphic back to the L{AssetCache<Core.AssetCache.AssetCache>}.  It's only released once, no matter
+        how many times this is called.
+        """
+        if self._path is None:
+            return
         
+        AssetCache().Release(self._path)
+        self._path = None
+    
     def ToXMLString(self):
         """
         Generates XML to create this Widget.
@@ -6,8 +6,6 @@ B{[Base Class]} A single UI element, the foundation of UI screens and menus.
 
 import pygame
 
-from Utilities.vector import Vector
-
 class Widget(object):
     """
     B{[Base Class]} A single UI element, the foundation of interface screens and menus.  All UI elements
@@ -25,6 +23,14 @@ class Widget(object):
     @type _image:         U{C{pygame.Surface}<http://www.pygame.org/docs/ref/surface.html>}
     @ivar _image:         Image to draw to the screen.
     
+    @type _absPosition:   C{(int, int)}
+    @ivar _absPosition:   Absolute coordinate of the top left corner of the Widget, C{None} if it needs to be worked out
+                          again because the Widget or one of its parents moved.
+    
+    @type _drawArea:      U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}
+    @ivar _drawArea:      The area this Widget may draw to after being clipped by its parents, C{None} if it needs to be
+                          worked out again because the Widget or one of its parents moved or changed size.
+    
     @type Visible:        C{bool}
     @ivar Visible:        C{True} if the Widget should be drawn, C{False} otherwise.
     """
@@ -76,6 +82,9 @@ class Widget(object):
         self._image = None
         self.Visible = True
         
+        self._absPosition = None
+        self._drawArea = None
+        
     def Update(self, dt):
         """
         B{[Stub]} Runs any update logic this Widget needs.
@@ -93,6 +102,7 @@ class Widget(object):
             parentRect = self._parent._rect.copy()
             parentRect.topleft = (0, 0)
             self._rect.center = parentRect.center
+            self.__invalidate_layout__()
     
     def IsChildOf(self, parent):
         """
@@ -111,13 +121,17 @@ class Widget(object):
         else:
             return self._parent.IsChildOf(parent)
         
-    def DrawTo(self, surf):
+    def DrawTo(self, surf, offset=(0, 0)):
         """
         Draws this Widget to the given Surface if its visible.  If the Widget is not completely within
         its parent's panel, it will be clipped.
         
         @type  surf:        C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
         @param surf:        Surface to draw this Widget to.
+        
+        @type  offset:      C{(int, int)}
+        @param offset:      Absolute coordinate of the top left corner of the Surface.  Only needed when drawing to
+                            something other than the whole window, like a L{Panel<UI.Panel.Panel>}'s composed surface.
         """
         
         if not self._image or not self.Visible:
@@ -126,7 +140,54 @@ class Widget(object):
         area = self.__drawable_area__()
         if area.width > 0 and area.height > 0:
             area.topleft = (0, 0)
-            surf.blit(self._image, self.AbsolutePosition, area)
+            x, y = self.AbsolutePosition
+            surf.blit(self._image, (x - offset[0], y - offset[1]), area)
+    
+    def __prepare__(self):
+        """
+        B{[Stub]} Gets the Widget ready to be drawn, like rendering anything that's changed, so that its
+        L{draw state<__draw_state__>} is up to date.
+        """
+        return
+    
+    def __draw_state__(self):
+        """
+        Gets everything about this Widget that changes how it's drawn.  A L{Panel<UI.Panel.Panel>} only composes its
+        children again when one of their draw states has changed.  Subclasses with more to draw than L{_image} should
+        add to it.
+        
+        @rtype:        C{tuple}
+        @return:       Values that are equal as long as the Widget looks the same.
+        """
+        return (self.Visible, self._image, tuple(self._rect))
+    
+    def ReleaseImages(self):
+        """
+        B{[Stub]} Releases any images this Widget loaded through the L{AssetCache<Core.AssetCache.AssetCache>}.  Should
+        be called when the Widget is no longer used.
+        """
+        return
+    
+    def __opaque__(self):
+        """
+        Checks if this Widget's image has no alpha, per pixel or for the whole surface, so wherever it's drawn it
+        completely covers what's under it.  A L{Panel<UI.Panel.Panel>} composes opaque children by just drawing them,
+        but translucent ones have to be composed over black and white, since blending translucent images together
+        first doesn't give the same result as blending them onto the screen one at a time.
+        
+        @rtype:        C{bool}
+        @return:       C{True} if the Widget draws nothing translucent, C{False} otherwise.
+        """
+        image = self._image
+        return image is None or (not image.get_flags() & pygame.SRCALPHA and image.get_alpha() is None)
+    
+    def __invalidate_layout__(self):
+        """
+        Throws out the cached absolute position and drawable area, so they're worked out again.  Should be called
+        whenever the Widget or one of its parents moves or changes size.
+        """
+        self._absPosition = None
+        self._drawArea = None
     
     def __drawable_area__(self):
         """
@@ -136,12 +197,26 @@ class Widget(object):
         @rtype:        C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}  
         @return:       Area that can be drawn to.
         """
-        if not self._parent:
-            return self._rect.copy()
+        if self._drawArea is None:
+            if not self._parent:
+                self._drawArea = self._rect.copy()
+            else:
+                parentArea = self._parent.__drawable_area__()
+                parentArea.topleft = (0, 0)
+                self._drawArea = self._rect.clip(parentArea)
+        
+        return self._drawArea.copy()
+            
+    def __drawn_area__(self):
+        """
+        Returns the area this Widget covers when it's drawn, relative to its parent.  It's as big as the
+        L{drawable area<__drawable_area__>}, but starts at the Widget's position, since that's where it's drawn from.
         
-        parentArea = self._parent.__drawable_area__()
-        parentArea.topleft = (0, 0)
-        area = self._rect.clip(parentArea)
+        @rtype:        C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}  
+        @return:       Area that's drawn to.
+        """
+        area = self.__drawable_area__()
+        area.topleft = self._rect.topleft
         
         return area
             
@@ -170,22 +245,29 @@ class Widget(object):
     def __set_position__(self, value):
         self._rect.left = value[0]
         self._rect.top = value[1]
+        self.__invalidate_layout__()
         
     def __get_abs_position__(self):
-        if self._parent == None:
-            return self.Position
-        else:
-            return Vector(self._parent.AbsolutePosition) + Vector(self.Position)
+        if self._absPosition is None:
+            if self._parent == None:
+                self._absPosition = self._rect.topleft
+            else:
+                parentX, parentY = self._parent.AbsolutePosition
+                self._absPosition = (parentX + self._rect.left, parentY + self._rect.top)
+        
+        return self._absPosition
         
     def __get_width__(self):
         return self._rect.width
     def __set_width__(self, value):
         self._rect.width = value
+        self.__invalidate_layout__()
         
     def __get_height__(self):
         return self._rect.height
     def __set_height__(self, value):
         self._rect.height = value
+        self.__invalidate_layout__()
         
     Position = property(__get_position__, __set_position__, None, "Coordinate of the top left corner of the Widget relative to its parent.")
     AbsolutePosition = property(__get_abs_position__, None, None, "Absolute coordinate of the top left corner of the Widget.")
@@ -15,6 +15,7 @@ from States.Camera.TargetState import TargetState
 from States.Camera.StaticState import StaticState
 
 from UI.Panel import Panel
+from Utilities.DirtyRects import DirtyRects
 
 class Camera(Actor):
     """
@@ -25,7 +26,8 @@ class Camera(Actor):
     The display view exists in screen space, defined by the window.  While it can take up the entire area of the window, it isn't
     necessary.  If the display view is smaller than the window, borders will automatically be drawn around it.  This to easily see
     the divide between displays when using multiple cameras.  If the display view and world view are not the same size, the world
-    view will be scaled to match the display view dimensions.
+    view will be scaled to match the display view dimensions, with nearest neighbor scaling unless smooth scaling is asked for.
+    If they are the same size, the Camera draws straight into its part of the window and nothing is scaled or copied.
     
     Additionally, Cameras can be used to handle UI elements through an internal L{Panel<UI.Panel.Panel>} that covers the display
     view.  All attached UI elements have their logic and drawing handled by the Camera. 
@@ -37,16 +39,43 @@ class Camera(Actor):
     @type windowPanel:    L{Panel<UI.Panel.Panel>}
     @cvar windowPanel:    UI panel that covers the entire pygame window surface.  Every Camera's individual C{Panel} is a child to
                           this.
+                          
+    @type _windowClear:   C{(U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}, tuple)}
+    @cvar _windowClear:   The surface L{StaticClear} last blended over the window with a translucent color, and that color.
+                          C{None} until a translucent color is used.
     
     @type _worldSurf:     C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
-    @ivar _worldSurf:     World view surface.  Each Camera draws what it can see here at full resolution.
+    @ivar _worldSurf:     World view surface.  Each Camera draws what it can see here at full resolution.  When no scaling is
+                          needed, this is a subsurface of the L{window<windowSurf>} covering the display view.
     
     @type _displaySurf:   C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
-    @ivar _displaySurf:   Display view surface.  The scaled L{_worldSurf} which is drawn to the pygame window.
+    @ivar _displaySurf:   Display view surface.  The scaled L{_worldSurf} which is drawn to the pygame window.  The same as
+                          L{_worldSurf} when no scaling is needed.
+    
+    @type _smoothScale:   C{bool}
+    @ivar _smoothScale:   C{True} if the world view should be scaled with
+                          U{pygame.transform.smoothscale<http://www.pygame.org/docs/ref/transform.html#pygame.transform.smoothscale>},
+                          C{False} for the faster nearest neighbor scaling.
+    
+    @type _scaleMode:     C{str}
+    @ivar _scaleMode:     How the world view gets to the window, one of the C{SCALE} constants in
+                          L{CameraConstants<Core.Constants.CameraConstants>}.
+    
+    @type _allowDirect:   C{bool}
+    @ivar _allowDirect:   C{True} if the Camera may draw straight into the window when no scaling is needed.  Cameras whose
+                          display views overlap can't, or they would draw over each other out of order.
     
     @type _displayRect:   C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}
     @ivar _displayRect:   The Camera's dimensions and position within the pyGame window.
     
+    @type _worldClear:    C{(U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}, tuple)}
+    @ivar _worldClear:    The surface L{Clear} last blended over the world view with a translucent color, and that color.
+                          C{None} until a translucent color is used.
+    
+    @type _viewRect:      C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}
+    @ivar _viewRect:      The area of the world being drawn this frame.  Same size as the bounding box, but placed at the
+                          L{DrawPosition<Core.Actor.Actor.DrawPosition>} set by L{BeginDraw}.
+    
     @type _borders:       C{list}
     @ivar _borders:       Four U{C{pygame.Rects}<http://www.pygame.org/docs/ref/rect.html>}, which divide the display views.
     
@@ -75,6 +104,7 @@ class Camera(Actor):
     # set on the initialization of the Game object
     windowSurf = None
     windowPanel = None
+    _windowClear = None
     
     @staticmethod
     def Initialize(screenSurface):
@@ -86,21 +116,53 @@ class Camera(Actor):
         """
         Camera.windowSurf = screenSurface
         Camera.windowPanel = Panel((0, 0), screenSurface.get_width(), screenSurface.get_height())
+        
+        DirtyRects().MarkAll()
     
     @staticmethod
     def StaticClear(color):
         """
         Fills the entire window with the given color.  This is usually used to wipe the screen
-        before drawing anything else.
+        before drawing anything else.  Translucent colors are blended over what is already there.
         
         @type  color:    C{U{pygame.Color<http://www.pygame.org/docs/ref/color.html>}}
         @param color:    The color to fill the screen with. 
         """
-        sprite = pygame.Surface(Camera.windowSurf.get_size())
-        sprite = sprite.convert_alpha()
-        sprite.fill(color)
+        Camera._windowClear = Camera.__clear_surface__(Camera.windowSurf, color, Camera._windowClear)
+        DirtyRects().MarkAll()
+    
+    @staticmethod
+    def __clear_surface__(surface, color, blend):
+        """
+        Fills a whole surface with the given color.  Opaque colors are filled in place.  Translucent colors are
+        blended over the surface with a fill surface, which is kept and reused for as long as the color and size
+        stay the same.
         
-        Camera.windowSurf.blit(sprite, (0, 0))
+        @type  surface:    C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+        @param surface:    The surface to fill.
+        
+        @type  color:      C{U{pygame.Color<http://www.pygame.org/docs/ref/color.html>}}
+        @param color:      The color to fill the surface with.
+        
+        @type  blend:      C{(U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}, tuple)}
+        @param blend:      The fill surface and color returned by the last call for this surface, or C{None}.
+        
+        @rtype:            C{(U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}, tuple)}
+        @return:           The fill surface and color to pass in next time, C{None} if none was needed.
+        """
+        if len(color) < 4 or color[3] == 255:
+            surface.fill(color)
+            return blend
+        
+        color = tuple(color)
+        if blend is None or blend[1] != color or blend[0].get_size() != surface.get_size():
+            sprite = pygame.Surface(surface.get_size())
+            sprite = sprite.convert_alpha()
+            sprite.fill(color)
+            blend = (sprite, color)
+        
+        surface.blit(blend[0], (0, 0))
+        return blend
 
     @staticmethod
     def PropertiesToParameters(properties):
@@ -109,8 +171,8 @@ class Camera(Actor):
         In addition to the U{Tiled<http://mapeditor.org/>} Object Properties, the dictionary will also include position,
         width, and height.
         
-        For Cameras, also reads the display view rectangle, target, camera order, and any UI files which will be overlaid
-        on the display view.
+        For Cameras, also reads the display view rectangle, target, camera order, any UI files which will be overlaid
+        on the display view, and whether to smooth scale.
         
         @type  properties:    C{dict}
         @param properties:    A dictionary of property names : values
@@ -157,6 +219,11 @@ class Camera(Actor):
         uiPaths = None
         if (properties.has_key(Constants.EditorConstants.OBJ_CAM_PROP_UI_FILE) and properties[Constants.EditorConstants.OBJ_CAM_PROP_UI_FILE].strip()):
             uiPaths = map(unicode.strip, properties[Constants.EditorConstants.OBJ_CAM_PROP_UI_FILE].split(','))
+            
+        # smooth scaling
+        smoothScale = None
+        if (properties.has_key(Constants.EditorConstants.OBJ_CAM_PROP_SMOOTH_SCALE) and properties[Constants.EditorConstants.OBJ_CAM_PROP_SMOOTH_SCALE].strip()):
+            smoothScale = properties[Constants.EditorConstants.OBJ_CAM_PROP_SMOOTH_SCALE].strip() == 'true'
         
         params.append(worldView)
         params.append(displayView)
@@ -165,10 +232,11 @@ class Camera(Actor):
         params.append(targetName)
         params.append(order)
         params.append(uiPaths)
+        params.append(smoothScale)
         
         return params
 
-    def __init__(self, worldView, displayView=None, name=None, target=(0, 0), targetName=None, order=0, uiPaths=None):
+    def __init__(self, worldView, displayView=None, name=None, target=(0, 0), targetName=None, order=0, uiPaths=None, smoothScale=None):
         """
 	    Creates a new Camera object, with the given viewing area and display area, and tracking the given target.
 	    
@@ -196,6 +264,11 @@ class Camera(Actor):
         @type  uiPaths:         C{list}
         @param uiPaths:         List of file paths (C{str}) relative to the location of the
                                 L{GameMap<Map.GameMap.GameMap>} .TMX that the Camera resides in.
+        
+        @type  smoothScale:     C{bool}
+        @param smoothScale:     C{True} to smooth scale the world view when it isn't the same size as the display view,
+                                C{False} for nearest neighbor scaling.  If C{None}, uses
+                                L{CameraConstants.SMOOTH_SCALE<Core.Constants.CameraConstants>}.
         """
         targetStateName = Constants.StateConstants.CAM_TRACK_TARGET_NAME
         staticStateName = Constants.StateConstants.CAM_STATIC_NAME
@@ -211,7 +284,14 @@ class Camera(Actor):
         
         # these will be set in the AdjustScreen calls
         self._worldSurf = None
+        self._worldClear = None
         self._displaySurf = None
+        self._scaleMode = None
+        self._allowDirect = True
+        
+        if smoothScale is None:
+            smoothScale = Constants.CameraConstants.SMOOTH_SCALE
+        self._smoothScale = smoothScale
         self._panel = Panel((0, 0), 0, 0)
         Camera.windowPanel.AddChild(self._panel)
             
@@ -248,9 +328,10 @@ class Camera(Actor):
                 
     def UnloadUIs(self):
         """
-        Removes all of the UI components on this Camera from the display view.
+        Removes all of the UI components on this Camera from the display view, and releases their images.
         """
         Camera.windowPanel.RemoveChild(self._panel)
+        self._panel.ReleaseImages()
 
     def AdjustWorldView(self, worldRect):
         """
@@ -259,9 +340,12 @@ class Camera(Actor):
         @type  worldRect:   C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}
         @param worldRect:   The Camera's area of view and position within the game world.
         """
-        self._worldSurf = pygame.Surface((worldRect.width, worldRect.height))
-        self._worldSurf.convert_alpha()
         self.boundingBox = worldRect
+        self._viewRect = pygame.Rect(worldRect)
+        
+        # the first time, the display view isn't set up yet
+        if self._scaleMode:
+            self.__create_surfaces__()
 
     def AdjustDisplayView(self, displayRect):
         """
@@ -271,9 +355,11 @@ class Camera(Actor):
         @type  displayRect:   C{U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}}
         @param displayRect:   The dimensions and position of the display inside the window.
         """
-        self._displaySurf = pygame.Surface((displayRect.width, displayRect.height))
-        self._displaySurf.convert_alpha()
         self._displayRect = displayRect
+        self.__create_surfaces__()
+        
+        # the old display view and borders may be anywhere
+        DirtyRects().MarkAll()
         
         self._panel.Position = displayRect.topleft
         self._panel.Width = displayRect.width
@@ -300,6 +386,30 @@ class Camera(Actor):
         self._borders.append((left, left.get_rect(topleft = (self._displayRect.left - halfWidth, self._displayRect.top))))
         # right
         self._borders.append((left, left.get_rect(topleft = (self._displayRect.right - halfWidth, self._displayRect.top))))
+        
+    def __create_surfaces__(self):
+        """
+        Creates the world and display view surfaces, and picks how the world view gets to the window.  If the views are
+        the same size, the world view is a subsurface of the window and nothing needs to be copied.  Otherwise the world
+        view is scaled onto the display view, smoothly only if L{SmoothScale} is set.
+        """
+        worldSize = self.boundingBox.size
+        displaySize = self._displayRect.size
+        
+        if (worldSize == displaySize and self._allowDirect and Camera.windowSurf.get_rect().contains(self._displayRect)):
+            self._scaleMode = Constants.CameraConstants.SCALE_DIRECT
+            self._worldSurf = Camera.windowSurf.subsurface(self._displayRect)
+            self._displaySurf = self._worldSurf
+        else:
+            if self._smoothScale:
+                self._scaleMode = Constants.CameraConstants.SCALE_SMOOTH
+            else:
+                self._scaleMode = Constants.CameraConstants.SCALE_NEAREST
+            
+            self._worldSurf = pygame.Surface(worldSize)
+            self._worldSurf.convert_alpha()
+            self._displaySurf = pygame.Surface(displaySize)
+            self._displaySurf.convert_alpha()
 
     def Update(self, dt):
         """
@@ -312,6 +422,18 @@ class Camera(Actor):
         Actor.Update(self, dt)
         self._panel.Update(dt)
         
+    def BeginDraw(self):
+        """
+        Sets the area of the world that will be drawn this frame.  This should be called before anything is drawn
+        to the Camera.
+        """
+        self._viewRect.size = self.boundingBox.size
+        self._viewRect.topleft = self.DrawPosition
+        
+        # drawing straight into a window that has since been replaced
+        if (self._scaleMode == Constants.CameraConstants.SCALE_DIRECT and self._worldSurf.get_parent() is not Camera.windowSurf):
+            self.__create_surfaces__()
+        
     def Draw(self, sprite, position):
         """
         Draws the sprite to the screen at the given world position if the Camera can see it.
@@ -322,50 +444,56 @@ class Camera(Actor):
 	    @type  position:  C{(int, int)}
 	    @param position:  The world coordinate where the top left of the sprite should be drawn.
 	    """
-        # check if this sprite is actually viewable on screen
-        spriteRect = sprite.get_rect()
-        spriteRect.topleft = position
+        viewRect = self._viewRect
+        left = position[0] - viewRect.left
+        top = position[1] - viewRect.top
+        width, height = sprite.get_size()
         
-        if (self.boundingBox.colliderect(spriteRect)):    
+        # check if this sprite is actually viewable on screen, without making a Rect for it every draw
+        if (left < viewRect.width and top < viewRect.height and left + width > 0 and top + height > 0):
             # draw it if it is
-            left = position[0] - self.Position[0]
-            top = position[1] - self.Position[1]
             self._worldSurf.blit(sprite, (left, top))
             
     def DrawBorders(self):
         """
-        Draws this Camera's borders if they're viewable.
+        Draws this Camera's borders if they're viewable, and marks them as changed on the display.
         """
+        dirtyRects = DirtyRects()
         for border, rect in self._borders: 
             centerX, centerY = rect.center
             if ((centerY > 0 and centerY < Camera.windowSurf.get_height()) and (centerX > 0 and centerX < Camera.windowSurf.get_width())):
                 Camera.windowSurf.blit(border, rect.topleft)
+                dirtyRects.Mark(rect)
         
     def Clear(self, color):
         """
         Fills the entire display view with the given color.  This is usually used to wipe the screen
-        before drawing anything else.
+        before drawing anything else.  Translucent colors are blended over what was drawn last frame.
         
         @type  color:    C{U{pygame.Color<http://www.pygame.org/docs/ref/color.html>}}
         @param color:    The color to fill the screen with.
         """
-        sprite = pygame.Surface(self._worldSurf.get_size())
-        sprite = sprite.convert_alpha()
-        sprite.fill(color)
-        
-        self._worldSurf.blit(sprite, (0, 0))
+        self._worldClear = Camera.__clear_surface__(self._worldSurf, color, self._worldClear)
     
     def FinalizeDraw(self):
         """
         Draws everything from this Camera to the L{pygame window<Camera.windowSurf>}.  If the the world
         view and display view are different sizes, the world view will be scaled to match the display.
+        If they're the same size, everything was already drawn straight to the window.
         
-        After the world view is drawn, all attached UI elements are drawn.
+        After the world view is drawn, all attached UI elements are drawn.  The world view moves with the Camera, so
+        the whole display view is marked as changed on the display every time.
         """
-        # scale everything from the 'at-resolution' world screen to the windowSurf display.
-        pygame.transform.smoothscale(self._worldSurf, (self._displaySurf.get_width(), self._displaySurf.get_height()), self._displaySurf)
-
-        Camera.windowSurf.blit(self._displaySurf, self._displayRect.topleft)
+        if self._scaleMode != Constants.CameraConstants.SCALE_DIRECT:
+            # scale everything from the 'at-resolution' world screen to the windowSurf display.
+            if self._scaleMode == Constants.CameraConstants.SCALE_SMOOTH:
+                pygame.transform.smoothscale(self._worldSurf, self._displayRect.size, self._displaySurf)
+            else:
+                pygame.transform.scale(self._worldSurf, self._displayRect.size, self._displaySurf)
+            
+            Camera.windowSurf.blit(self._displaySurf, self._displayRect.topleft)
+        
+        DirtyRects().Mark(self._displayRect)
         
         # draw this camera's widgets to the full screen
         self._panel.DrawTo(Camera.windowSurf)
@@ -391,10 +519,37 @@ class Camera(Actor):
         else:
             self._target = value          
     
+    def __get_view_rect__(self):
+        return self._viewRect
+    
     def __get_order__(self):
         return self._order
     def __set_order__(self, value):
         self._order = value
     
+    def __get_display_rect__(self):
+        return self._displayRect
+    
+    def __get_scale_mode__(self):
+        return self._scaleMode
+    
+    def __get_smooth_scale__(self):
+        return self._smoothScale
+    def __set_smooth_scale__(self, value):
+        self._smoothScale = value
+        self.__create_surfaces__()
+    
+    def __get_allow_direct__(self):
+        return self._allowDirect
+    def __set_allow_direct__(self, value):
+        if value != self._allowDirect:
+            self._allowDirect = value
+            self.__create_surfaces__()
+    
     Target = property(__get_target__, __set_target__, None, "The Camera's target.  Either a L{GameObject<GameObject.GameObject>} or world coordinate.")
-    Order = property(__get_order__, __set_order__, None, "The Camera's order relative to other Cameras.")
\ No newline at end of file
+    Order = property(__get_order__, __set_order__, None, "The Camera's order relative to other Cameras.")
+    ViewRect = property(__get_view_rect__, None, None, "The area of the world being drawn this frame.")
+    DisplayRect = property(__get_display_rect__, None, None, "The Camera's dimensions and position within the window.")
+    ScaleMode = property(__get_scale_mode__, None, None, "How the world view gets to the window, one of the C{SCALE} constants in L{CameraConstants<Core.Constants.CameraConstants>}.")
+    SmoothScale = property(__get_smooth_scale__, __set_smooth_scale__, None, "C{True} if the world view is smooth scaled to the display view, C{False} for nearest neighbor.")
+    AllowDirectDraw = property(__get_allow_direct__, __set_allow_direct__, None, "C{True} if the Camera may draw straight into the window when no scaling is needed.")
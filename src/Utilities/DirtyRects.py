@@ -0,0 +1,161 @@
+'''
+Keeps track of the parts of the window that changed, so only those are sent to the display.
+
+@author: Chris Alvarado-Dryden
+'''
+import pygame
+
+from Core import Constants
+
+class DirtyRects(object):
+    """
+    Keeps track of the parts of the pygame window that changed (dirty rects) since the display was last updated.
+    Whatever draws to the window L{marks<Mark>} the areas it changed, like each L{Camera<Utilities.Camera.Camera>}'s
+    display view or a L{Panel<UI.Panel.Panel>} that moved or was composed again.  L{Flip} then sends only those areas
+    to the display with
+    U{pygame.display.update<http://www.pygame.org/docs/ref/display.html#pygame.display.update>}, which saves a lot of
+    copying on software rendered displays when little changes from frame to frame, like in menus.
+    
+    If the marked area covers more than L{_threshold} of the window, or the whole window was L{marked<MarkAll>}, the
+    entire display is flipped instead, since it's cheaper than updating many rects.  When disabled, the entire display
+    is always flipped.
+    
+    This class follows the singleton design pattern.  The first call to the constructor will create a new instance,
+    but all subsequent calls will return the original instance.
+    
+    @type _instance:       C{DirtyRects}
+    @cvar _instance:       The single instance of the DirtyRects class.
+    
+    @type _initialized:    C{bool}
+    @cvar _initialized:    C{True} if the single instance of the DirtyRects has been initialized, C{False} otherwise.
+    
+    @type _enabled:        C{bool}
+    @ivar _enabled:        C{True} if only the marked areas are updated, C{False} if the entire display is always flipped.
+    
+    @type _threshold:      C{float}
+    @ivar _threshold:      Fraction of the window's area the marked areas can cover before the entire display is flipped.
+    
+    @type _rects:          C{list}
+    @ivar _rects:          C{[U{pygame.Rect<http://www.pygame.org/docs/ref/rect.html>}]} - Areas of the window that have
+                           changed since the display was last updated.
+    
+    @type _all:            C{bool}
+    @ivar _all:            C{True} if the entire window has changed since the display was last updated.
+    
+    @type _frame:          C{int}
+    @ivar _frame:          How many times the display has been updated.
+    """
+    _instance = None
+    _initialized = False
+    
+    def __new__(self):
+        """
+        If no DirtyRects has been created, instantiates a new one, otherwise returns the single instance.
+        
+        @rtype:        C{DirtyRects}
+        @return:       The single instance of DirtyRects.
+        """
+        if not DirtyRects._instance:
+            DirtyRects._instance = super(DirtyRects, self).__new__(self)
+        
+        return DirtyRects._instance
+    
+    def __init__(self):
+        """
+        Initializes instance variables for the DirtyRects if it hasn't already been initialized.
+        """
+        if DirtyRects._initialized:
+            return
+        
+        self._enabled = Constants.GameConstants.DIRTY_RECTS
+        self._threshold = Constants.GameConstants.DIRTY_AREA_THRESHOLD
+        
+        self._rects = []
+        
+        # nothing has been shown yet
+        self._all = True
+        self._frame = 0
+        
+        DirtyRects._initialized = True
+    
+    def Mark(self, rect):
+        """
+        Marks an area of the window as changed.
+        
+        @type  rect:    U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}
+        @param rect:    The area that changed, in window coordinates.
+        """
+        if self._enabled and not self._all:
+            self._rects.append(pygame.Rect(rect))
+    
+    def Covers(self, rect):
+        """
+        Checks if an area of the window will be updated anyway, because it's inside an area that's already been marked.
+        
+        @type  rect:    U{C{pygame.Rect}<http://www.pygame.org/docs/ref/rect.html>}
+        @param rect:    The area to check, in window coordinates.
+        
+        @rtype:         C{bool}
+        @return:        C{True} if the whole area will be updated, C{False} otherwise.
+        """
+        if not self._enabled or self._all:
+            return True
+        
+        for marked in self._rects:
+            if marked.contains(rect):
+                return True
+        
+        return False
+    
+    def MarkAll(self):
+        """
+        Marks the entire window as changed, so the entire display is flipped next time.
+        """
+        self._all = True
+        self._rects = []
+    
+    def Flip(self):
+        """
+        Sends the marked areas of the window to the display, or flips the entire display if they cover too much of
+        the window, and starts marking again from nothing.
+        """
+        if not self._enabled or self._all:
+            pygame.display.flip()
+        elif self._rects:
+            window = pygame.display.get_surface().get_rect()
+            
+            rects = [rect.clip(window) for rect in self._rects]
+            area = sum([rect.width * rect.height for rect in rects])
+            
+            # overlapping rects are counted more than once, which only makes a flip more likely
+            if area > window.width * window.height * self._threshold:
+                pygame.display.flip()
+            else:
+                pygame.display.update(rects)
+        
+        self._rects = []
+        self._all = False
+        self._frame += 1
+    
+    ############### PROPERTIES ###############
+    
+    def __get_enabled__(self):
+        return self._enabled
+    def __set_enabled__(self, value):
+        self._enabled = value
+        
+        # areas changed while disabled were never marked
+        self.MarkAll()
+    def __get_threshold__(self):
+        return self._threshold
+    def __set_threshold__(self, value):
+        self._threshold = value
+    def __get_num_rects__(self):
+        return len(self._rects)
+    def __get_frame__(self):
+        return self._frame
+    
+    Enabled = property(__get_enabled__, __set_enabled__, None, "C{True} if only the marked areas of the window are updated, C{False} if the entire display is always flipped.")
+    Threshold = property(__get_threshold__, __set_threshold__, None, "Fraction of the window's area the marked areas can cover before the entire display is flipped.")
+    NumRects = property(__get_num_rects__, None, None, "How many areas have been marked since the display was last updated.")
+    Frame = property(__get_frame__, None, None, "How many times the display has been updated, which counts the frames shown.")
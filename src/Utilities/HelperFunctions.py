@@ -21,6 +21,20 @@ class StringConversions(object):
         """
         reg = re.compile('\-?\\d+')
         return tuple(map(int, reg.findall(string)))
+    
+    @staticmethod
+    def StringToFloatTuple(string):
+        """
+        Extracts numbers, with or without decimal points, from the given string and returns them as a single tuple.
+        
+        @type  string:    C{str}
+        @param string:    String to scan for numbers.
+        
+        @rtype:           C{tuple}
+        @return:          All numbers that were present in the string, as C{float}s.
+        """
+        reg = re.compile('\-?(?:\\d+\.?\\d*|\.\\d+)')
+        return tuple(map(float, reg.findall(string)))
 
 # don't really like this name - CAD    
 class ReflectionFunctions(object):
@@ -0,0 +1,302 @@
+'''
+A lightweight profiler that times named phases of each frame.
+
+@author: Chris Alvarado-Dryden
+'''
+import json
+import threading
+import timeit
+from collections import deque
+
+from Core import Constants
+
+class Profiler(object):
+    """
+    A lightweight profiler that times named phases (scopes) of each frame, like controller polling, map updates,
+    drawing each layer, and flipping the display.  Every scope is timed between a call to L{Begin} and a call to
+    L{End}, and scopes can be nested.  The time spent in each scope is added up over a frame (between L{BeginFrame}
+    and L{EndFrame}), and the last few frames are kept to give rolling min, average and 99th percentile times.
+    
+    While a capture is running (see L{StartCapture}), every scope is also recorded as an event, and the events can be
+    saved as a U{Chrome trace_event<https://github.com/catapult-project/catapult/tree/master/tracing>} JSON file
+    with L{ExportChromeTrace}, to be loaded in C{chrome://tracing} or another trace viewer.
+    
+    When disabled, L{Begin} and L{End} return right away, so scopes can be left in the game loop.  Only scopes on the
+    main thread should be timed.
+    
+    This class follows the singleton design pattern.  The first call to the constructor will create a new instance,
+    but all subsequent calls will return the original instance.
+    
+    @type _instance:       C{Profiler}
+    @cvar _instance:       The single instance of the Profiler class.
+    
+    @type _initialized:    C{bool}
+    @cvar _initialized:    C{True} if the single instance of the Profiler has been initialized, C{False} otherwise.
+    
+    @type _enabled:        C{bool}
+    @ivar _enabled:        C{True} if scopes are being timed, C{False} otherwise.
+    
+    @type _actorScopes:    C{bool}
+    @ivar _actorScopes:    C{True} if every L{Actor<Core.Actor.Actor>}'s update should be timed in its own scope.
+    
+    @type _timer:          C{function}
+    @ivar _timer:          Gets the current time in seconds, as precisely as the platform allows.
+    
+    @type _origin:         C{float}
+    @ivar _origin:         Time the Profiler was created, trace events are timed from it.
+    
+    @type _stack:          C{list}
+    @ivar _stack:          C{[(str, str, float)]} - Name, category and start time of each scope that has begun but not
+                           ended, innermost last.
+    
+    @type _frameStart:     C{float}
+    @ivar _frameStart:     Time the current frame began, C{None} if no frame has begun.
+    
+    @type _frameTotals:    C{dict}
+    @ivar _frameTotals:    C{{str : float}} - Seconds spent in each scope so far this frame, keyed by scope key
+                           (C{category/name}).
+    
+    @type _history:        C{dict}
+    @ivar _history:        C{{str : U{collections.deque<http://docs.python.org/library/collections.html#deque-objects>}}} -
+                           Seconds spent in each scope over the last L{_windowFrames} frames, keyed by scope key.
+    
+    @type _windowFrames:   C{int}
+    @ivar _windowFrames:   How many frames the rolling statistics cover.
+    
+    @type _capturing:      C{bool}
+    @ivar _capturing:      C{True} if scopes are being recorded as trace events.
+    
+    @type _events:         C{list}
+    @ivar _events:         C{[(str, str, float, float, int)]} - Name, category, start time, duration and thread of every
+                           scope recorded since the capture started.
+    
+    @type _maxEvents:      C{int}
+    @ivar _maxEvents:      The most events a capture can hold.  Once full, new events are dropped.
+    """
+    _instance = None
+    _initialized = False
+    
+    # key of the scope covering each whole frame
+    FRAME = 'frame'
+    
+    def __new__(self):
+        """
+        If no Profiler has been created, instantiates a new one, otherwise returns the single instance.
+        
+        @rtype:        C{Profiler}
+        @return:       The single instance of Profiler.
+        """
+        if not Profiler._instance:
+            Profiler._instance = super(Profiler, self).__new__(self)
+        
+        return Profiler._instance
+    
+    def __init__(self):
+        """
+        Initializes instance variables for the Profiler if it hasn't already been initialized.
+        """
+        if Profiler._initialized:
+            return
+        
+        self._enabled = Constants.ProfilerConstants.ENABLED
+        self._actorScopes = Constants.ProfilerConstants.ACTOR_SCOPES
+        
+        self._timer = timeit.default_timer
+        self._origin = self._timer()
+        
+        self._stack = []
+        self._frameStart = None
+        self._frameTotals = {}
+        self._history = {}
+        self._windowFrames = Constants.ProfilerConstants.WINDOW_FRAMES
+        
+        self._capturing = False
+        self._events = []
+        self._maxEvents = Constants.ProfilerConstants.MAX_TRACE_EVENTS
+        
+        Profiler._initialized = True
+    
+    def BeginFrame(self):
+        """
+        Starts a new frame.  Scopes timed until L{EndFrame} are added up as part of this frame.
+        """
+        if not self._enabled:
+            return
+        
+        self._frameStart = self._timer()
+    
+    def EndFrame(self):
+        """
+        Ends the current frame, adding the time spent in each scope to the rolling statistics.  Scopes that weren't
+        timed this frame are counted as taking no time.
+        """
+        if not self._enabled or self._frameStart is None:
+            return
+        
+        end = self._timer()
+        totals = self._frameTotals
+        totals[Profiler.FRAME] = end - self._frameStart
+        
+        if self._capturing:
+            self.__record__(Profiler.FRAME, Profiler.FRAME, self._frameStart, end - self._frameStart)
+        
+        for key in totals:
+            if not self._history.has_key(key):
+                self._history[key] = deque(maxlen=self._windowFrames)
+        
+        for key, history in self._history.iteritems():
+            history.append(totals.get(key, 0.0))
+        
+        self._frameTotals = {}
+        self._frameStart = None
+    
+    def Begin(self, name, category='game'):
+        """
+        Starts timing a scope.  Every call must be matched by a call to L{End}.
+        
+        @type  name:        C{str}
+        @param name:        Name of the scope, like C{'update'} or a layer's name.
+        
+        @type  category:    C{str}
+        @param category:    What kind of scope it is, like C{'layer'} for layers.  Scopes with the same name in different
+                            categories are timed separately.
+        """
+        if not self._enabled:
+            return
+        
+        self._stack.append((name, category, self._timer()))
+    
+    def End(self):
+        """
+        Stops timing the innermost scope that has begun.
+        """
+        if not self._enabled or not self._stack:
+            return
+        
+        end = self._timer()
+        name, category, start = self._stack.pop()
+        
+        key = category + '/' + name
+        self._frameTotals[key] = self._frameTotals.get(key, 0.0) + (end - start)
+        
+        if self._capturing:
+            self.__record__(name, category, start, end - start)
+    
+    def Stats(self, key):
+        """
+        Gets the rolling statistics of a scope over the last few frames.
+        
+        @type  key:    C{str}
+        @param key:    Key of the scope, its category and name as C{category/name}, or L{FRAME} for whole frames.
+        
+        @rtype:        C{(float, float, float)}
+        @return:       The minimum, average, and 99th percentile seconds per frame spent in the scope.  All C{0.0} if
+                       the scope hasn't been timed.
+        """
+        history = self._history.get(key)
+        if not history:
+            return (0.0, 0.0, 0.0)
+        
+        times = sorted(history)
+        p99 = times[min(int(len(times) * 0.99), len(times) - 1)]
+        return (times[0], sum(times) / len(times), p99)
+    
+    def Report(self):
+        """
+        Builds a table of the rolling statistics of every scope, slowest on average first.
+        
+        @rtype:     C{str}
+        @return:    The table, one scope per line, with times in milliseconds.
+        """
+        rows = [(key,) + self.Stats(key) for key in self._history]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        
+        width = max([len(row[0]) for row in rows] + [5])
+        lines = ['%-*s %9s %9s %9s' % (width, 'scope', 'min ms', 'avg ms', 'p99 ms')]
+        for key, low, average, p99 in rows:
+            lines.append('%-*s %9.3f %9.3f %9.3f' % (width, key, low * 1000.0, average * 1000.0, p99 * 1000.0))
+        
+        return '\n'.join(lines)
+    
+    def Reset(self):
+        """
+        Throws out the rolling statistics of every scope.
+        """
+        self._history.clear()
+        self._frameTotals = {}
+    
+    def StartCapture(self):
+        """
+        Starts recording every scope as a trace event, throwing out any events from an earlier capture.
+        """
+        self._events = []
+        self._capturing = True
+    
+    def StopCapture(self):
+        """
+        Stops recording trace events.  The events recorded so far are kept for L{ExportChromeTrace}.
+        """
+        self._capturing = False
+    
+    def ExportChromeTrace(self, path):
+        """
+        Saves the recorded trace events as a U{Chrome trace_event<https://github.com/catapult-project/catapult/tree/master/tracing>}
+        JSON file.
+        
+        @type  path:    C{str}
+        @param path:    File path to save to.
+        """
+        traceEvents = []
+        for name, category, start, duration, thread in self._events:
+            traceEvents.append({'name' : name, 'cat' : category, 'ph' : 'X', 'pid' : 0, 'tid' : thread,
+                                'ts' : (start - self._origin) * 1000000.0, 'dur' : duration * 1000000.0})
+        
+        f = open(path, 'w')
+        try:
+            json.dump({'traceEvents' : traceEvents, 'displayTimeUnit' : 'ms'}, f)
+        finally:
+            f.close()
+    
+    def __record__(self, name, category, start, duration):
+        """
+        Records a timed scope as a trace event, unless the capture is full.
+        
+        @type  name:        C{str}
+        @param name:        Name of the scope.
+        
+        @type  category:    C{str}
+        @param category:    Category of the scope.
+        
+        @type  start:       C{float}
+        @param start:       Time the scope began.
+        
+        @type  duration:    C{float}
+        @param duration:    Seconds spent in the scope.
+        """
+        if len(self._events) < self._maxEvents:
+            self._events.append((name, category, start, duration, threading.current_thread().ident))
+    
+    ############### PROPERTIES ###############
+    
+    def __get_enabled__(self):
+        return self._enabled
+    def __set_enabled__(self, value):
+        self._enabled = value
+        
+        # don't leave half timed scopes behind
+        self._stack = []
+        self._frameStart = None
+        self._frameTotals = {}
+    def __get_actor_scopes__(self):
+        return self._enabled and self._actorScopes
+    def __set_actor_scopes__(self, value):
+        self._actorScopes = value
+    def __get_capturing__(self):
+        return self._capturing
+    def __get_num_events__(self):
+        return len(self._events)
+    
+    Enabled = property(__get_enabled__, __set_enabled__, None, "C{True} if scopes are being timed, C{False} if L{Begin} and L{End} do nothing.")
+    ActorScopes = property(__get_actor_scopes__, __set_actor_scopes__, None, "C{True} if every Actor's update is timed in its own scope.  Always C{False} while the Profiler is disabled.")
+    Capturing = property(__get_capturing__, None, None, "C{True} if scopes are being recorded as trace events.")
+    NumEvents = property(__get_num_events__, None, None, "How many trace events have been recorded.")
@@ -20,7 +20,12 @@ if __debug__:
 
 
 import sys
-from xml.dom import minidom, Node
+try:
+    from xml.etree.cElementTree import iterparse
+except ImportError:
+    from xml.etree.ElementTree import iterparse
+import array
+import struct
 import base64
 import gzip
 import StringIO
@@ -111,6 +116,10 @@ class ImageLoaderPygame(IImageLoader):
     
     It uses an internal image cache. The methods return Surface.
     
+    CAD - Image files are loaded through the shared AssetCache, so maps using
+    the same tilesets don't decode them again.  Call release() when done with
+    the images.
+    
     :Undocumented:
         pygame
     """
@@ -119,12 +128,34 @@ class ImageLoaderPygame(IImageLoader):
     def __init__(self):
         self.pygame = __import__('pygame')
         self._img_cache = {} # {name: surf}
+        self._asset_cache = __import__('Core.AssetCache', fromlist=['AssetCache']).AssetCache() # CAD
 
-    def load_image(self, filename, colorkey=None):
+    # CAD ADDITION - files come from the shared cache, file-like objects are loaded directly
+    def _load_source(self, filename):
         img = self._img_cache.get(filename, None)
         if img is None:
-            img = self.pygame.image.load(filename)
+            if isinstance(filename, basestring):
+                img = self._asset_cache.LoadImage(filename)
+            else:
+                img = self.pygame.image.load(filename)
             self._img_cache[filename] = img
+        return img
+
+    # CAD ADDITION - read an image without converting it, safe to do from another thread
+    def preload_image(self, filename):
+        self._load_source(filename)
+
+    # CAD ADDITION - give back the images taken from the shared cache
+    def release(self):
+        for filename in self._img_cache.keys():
+            if isinstance(filename, basestring):
+                self._asset_cache.Release(filename)
+        self._img_cache.clear()
+
+    def load_image(self, filename, colorkey=None):
+        img = self._img_cache.get(filename, None)
+        if img is None:
+            img = self._load_source(filename)
             # CAD ADDITION - Only do the the convert once on load.
             if (img.get_alpha()):
                 img = img.convert_alpha()
@@ -136,10 +167,7 @@ class ImageLoaderPygame(IImageLoader):
 
     def load_image_part(self, filename, x, y, w, h, colorkey=None):
         source_rect = self.pygame.Rect(x, y, w, h)
-        img = self._img_cache.get(filename, None)
-        if img is None:
-            img = self.pygame.image.load(filename)
-            self._img_cache[filename] = img
+        img = self._load_source(filename)
         img_part = self.pygame.Surface((w, h), 0, img)
         img_part.blit(img, (0, 0), source_rect)
         if colorkey:
@@ -147,10 +175,7 @@ class ImageLoaderPygame(IImageLoader):
         return img_part
 
     def load_image_parts(self, filename, margin, spacing, tile_width, tile_height, colorkey=None): #-> [images]
-        source_img = self._img_cache.get(filename, None)
-        if source_img is None:
-            source_img = self.pygame.image.load(filename)
-            self._img_cache[filename] = source_img
+        source_img = self._load_source(filename)
         w, h = source_img.get_size()
         images = []
         for y in xrange(margin, h, tile_height + spacing):
@@ -412,6 +437,14 @@ class TileMap(object):
             layer.decode()
 #-------------------------------------------------------------------------------
 
+# CAD - flip flags Tiled stores in the high bits of each gid
+FLIPPED_HORIZONTALLY_FLAG = 0x80000000
+FLIPPED_VERTICALLY_FLAG = 0x40000000
+FLIPPED_DIAGONALLY_FLAG = 0x20000000
+FLIPPED_FLAGS = FLIPPED_HORIZONTALLY_FLAG | FLIPPED_VERTICALLY_FLAG | FLIPPED_DIAGONALLY_FLAG
+
+#-------------------------------------------------------------------------------
+
 class TileSet(object):
     u"""
     A tileset holds the tiles and its images.
@@ -545,6 +578,11 @@ class TileLayer(object):
                       decoded_content[1] is (0,1)
                       ...
                       decoded_content[1] is (width,height)
+                      
+            CAD - an array of unsigned ints instead of a list, with the flip flags taken out
+        flip_flags : dict
+            {index : flags} - the Tiled flip flags (high bits) of every gid in decoded_content
+            that had any set - CAD ADDITION
         order : int
             the index in the layer stack - CAD ADDITION
     
@@ -563,6 +601,7 @@ class TileLayer(object):
         self.compression = None
         self.encoded_content = None
         self.decoded_content = []
+        self.flip_flags = {} # {index: flags} CAD
         self.visible = True
         self.properties = {} # {name: value}
         self.order = 0      # CAD
@@ -586,11 +625,26 @@ class TileLayer(object):
                     raise Exception(u'unknown data compression %s' %(self.compression))
         else:
             raise Exception(u'no encoded content to decode')
-        self.decoded_content = []
-        for idx in xrange(0, len(s), 4):
-            val = ord(str(s[idx])) | (ord(str(s[idx + 1])) << 8) | \
-                 (ord(str(s[idx + 2])) << 16) | (ord(str(s[idx + 3])) << 24)
-            self.decoded_content.append(val)
+        # CAD - decode all of the little endian 32 bit gids at once instead of one byte at a time
+        s = str(s)
+        gids = array.array('I')
+        if gids.itemsize == 4:
+            gids.fromstring(s)
+            if sys.byteorder == 'big':
+                gids.byteswap()
+        else:
+            gids.extend(struct.unpack('<%dI' % (len(s) // 4), s))
+        
+        # CAD - pull the flip flags out so the gids can be used to look up tiles
+        # real gids never reach the flag bits, so the largest value has a flag if any do
+        self.flip_flags = {}
+        if max(gids or [0]) & FLIPPED_FLAGS:
+            for idx, val in enumerate(gids):
+                if val & FLIPPED_FLAGS:
+                    self.flip_flags[idx] = val & FLIPPED_FLAGS
+                    gids[idx] = val & ~FLIPPED_FLAGS
+        
+        self.decoded_content = gids
 
     def pretty_print(self):
         num = 0
@@ -726,6 +780,10 @@ class TileMapParser(object):
     u"""
     Allows to parse and decode map files for 'Tiled', a open source map editor 
     written in java. It can be found here: http://mapeditor.org/
+    
+    CAD - Streams the file with cElementTree.iterparse instead of building a
+    minidom DOM.  Each tileset, layer and object group is built as soon as its
+    end tag is read, then thrown away, so the whole document is never in memory.
     """
     #CAD ADDITION - New variable to preserve layer ordering in the map.
     #        ObjectGroups should really behave like layers.
@@ -735,113 +793,86 @@ class TileMapParser(object):
     def _build_tile_set(self, tile_set_node, world_map):
         tile_set = TileSet()
         self._set_attributes(tile_set_node, tile_set)
-        for node in self._get_nodes(tile_set_node.childNodes, u'image'):
+        for node in tile_set_node.findall(u'image'):
             self._build_tile_set_image(node, tile_set)
-        for node in self._get_nodes(tile_set_node.childNodes, u'tile'):
+        for node in tile_set_node.findall(u'tile'):
             self._build_tile_set_tile(node, tile_set)
-        self._set_attributes(tile_set_node, tile_set)
         world_map.tile_sets.append(tile_set)
 
     def _build_tile_set_image(self, image_node, tile_set):
         image = TileImage()
         self._set_attributes(image_node, image)
         # id of TileImage has to be set!! -> Tile.TileImage will only have id set
-        for node in self._get_nodes(image_node.childNodes, u'data'):
+        for node in image_node.findall(u'data'):
             self._set_attributes(node, image)
-            image.content = node.childNodes[0].nodeValue
+            image.content = self._to_unicode(node.text)
         tile_set.images.append(image)
 
     def _build_tile_set_tile(self, tile_set_node, tile_set):
         tile = Tile()
         self._set_attributes(tile_set_node, tile)
-        for node in self._get_nodes(tile_set_node.childNodes, u'image'):
+        for node in tile_set_node.findall(u'image'):
             self._build_tile_set_tile_image(node, tile)
         tile_set.tiles.append(tile)
 
     def _build_tile_set_tile_image(self, tile_node, tile):
         tile_image = TileImage()
         self._set_attributes(tile_node, tile_image)
-        for node in self._get_nodes(tile_node.childNodes, u'data'):
+        for node in tile_node.findall(u'data'):
             self._set_attributes(node, tile_image)
-            tile_image.content = node.childNodes[0].nodeValue
+            tile_image.content = self._to_unicode(node.text)
         tile.images.append(tile_image)
 
     def _build_layer(self, layer_node, world_map):
         layer = TileLayer()
         layer.order = self._layersInWorld   #CAD
         self._set_attributes(layer_node, layer)
-        for node in self._get_nodes(layer_node.childNodes, u'data'):
-            self._set_attributes(node, layer)
-            layer.encoded_content = node.lastChild.nodeValue
-            
-        self._get_properties(layer_node, layer) # CAD make properties work on layers
+        for node in layer_node.findall(u'data'):
+            for attr_name, attr_value in node.attrib.items():
+                setattr(layer, attr_name, self._to_unicode(attr_value))
+            layer.encoded_content = self._to_unicode(node.text)
         world_map.layers.append(layer)
 
-    def _build_world_map(self, world_node):
-        world_map = TileMap()
-        self._set_attributes(world_node, world_map)
-        if world_map.version != u"1.0":
-            raise Exception(u'this parser was made for maps of version 1.0, found version %s' % world_map.version)
-        for node in self._get_nodes(world_node.childNodes, u'tileset'):
-            self._build_tile_set(node, world_map)
-        
-        # changed to preserve layer ordering - CAD
-        """
-        for node in self._get_nodes(world_node.childNodes, u'layer'):
-            self._build_layer(node, world_map)
-        for node in self._get_nodes(world_node.childNodes, u'objectgroup'):
-            self._build_object_groups(node, world_map)
-        """
-                        
-        for node in self._get_nodes_list(world_node.childNodes, [u'layer', u'objectgroup']):
-            if node.nodeName == u'layer':
-                self._build_layer(node, world_map)
-            elif node.nodeName == u'objectgroup':
-                self._build_object_groups(node, world_map)
-            self._layersInWorld += 1
-            
-        return world_map
-
     def _build_object_groups(self, object_group_node, world_map):
         object_group = MapObjectGroup()
         object_group.order = self._layersInWorld    #CAD
         self._set_attributes(object_group_node,  object_group)
-        for node in self._get_nodes(object_group_node.childNodes, u'object'):
+        for node in object_group_node.findall(u'object'):
             tiled_object = MapObject()
             self._set_attributes(node, tiled_object)
-            for img_node in self._get_nodes(node.childNodes, u'image'):
-                tiled_object.image_source = img_node.attributes[u'source'].nodeValue
+            for img_node in node.findall(u'image'):
+                tiled_object.image_source = self._to_unicode(img_node.get(u'source'))
             object_group.objects.append(tiled_object)
         
         world_map.object_groups.append(object_group)
 
     #-- helpers --#
-    def _get_nodes(self, nodes, name):
-        for node in nodes:
-            if node.nodeType == Node.ELEMENT_NODE and node.nodeName == name:
-                yield node
-
-    # CAD ADDITION -  to preserve layer order, we can get nodes of various names at the same time.
-    def _get_nodes_list(self, nodes, names):
-        for node in nodes:
-            if node.nodeType == Node.ELEMENT_NODE and node.nodeName in names:
-                yield node
+    def _to_unicode(self, value):
+        # cElementTree gives back str for plain ascii, minidom always gave unicode
+        if value is None or isinstance(value, unicode):
+            return value
+        return unicode(value)
+
     def _set_attributes(self, node, obj):
-        attrs = node.attributes
-        for attr_name in attrs.keys():
-            setattr(obj, attr_name, attrs.get(attr_name).nodeValue)
+        for attr_name, attr_value in node.attrib.items():
+            setattr(obj, attr_name, self._to_unicode(attr_value))
         self._get_properties(node, obj)
 
     def _get_properties(self, node, obj):
         props = {}
-        for properties_node in self._get_nodes(node.childNodes, u'properties'):
-            for property_node in self._get_nodes(properties_node.childNodes, u'property'):
-                try:
-                    props[property_node.attributes[u'name'].nodeValue] = property_node.attributes[u'value'].nodeValue
-                except KeyError:
-                    props[property_node.attributes[u'name'].nodeValue] = property_node.lastChild.nodeValue
+        for properties_node in node.findall(u'properties'):
+            props.update(self._read_properties(properties_node))
         obj.properties = props
 
+    def _read_properties(self, properties_node):
+        props = {}
+        for property_node in properties_node.findall(u'property'):
+            value = property_node.get(u'value')
+            if value is None:
+                value = property_node.text
+            props[self._to_unicode(property_node.get(u'name'))] = self._to_unicode(value)
+        return props
+
 
     #-- parsers --#
     def parse(self, file_name):
@@ -849,11 +880,48 @@ class TileMapParser(object):
         Parses the given map. Does no decoding nor loading the data.
         :return: instance of TileMap
         """
-        #dom = minidom.parseString(codecs.open(file_name, "r", "utf-8").read())
-        dom = minidom.parseString(open(file_name, "rb").read())
-        for node in self._get_nodes(dom.childNodes, 'map'):
-            world_map = self._build_world_map(node)
-            break
+        world_map = None
+        map_node = None
+        # tags of the elements currently open, the map is the first
+        open_tags = []
+        
+        for event, node in iterparse(file_name, ('start', 'end')):
+            if event == 'start':
+                open_tags.append(node.tag)
+                if map_node is None and node.tag == u'map':
+                    # the map's attributes are all there at the start, its children come later
+                    map_node = node
+                    world_map = TileMap()
+                    for attr_name, attr_value in node.attrib.items():
+                        setattr(world_map, attr_name, self._to_unicode(attr_value))
+                    if world_map.version != u"1.0":
+                        raise Exception(u'this parser was made for maps of version 1.0, found version %s' % world_map.version)
+                continue
+            
+            open_tags.pop()
+            
+            # only children of the map are built, everything below them is built along with them
+            if map_node is None or len(open_tags) != 1:
+                continue
+            
+            if node.tag == u'properties':
+                world_map.properties = self._read_properties(node)
+            elif node.tag == u'tileset':
+                self._build_tile_set(node, world_map)
+            # layers and object groups keep their order in the map - CAD
+            elif node.tag == u'layer':
+                self._build_layer(node, world_map)
+                self._layersInWorld += 1
+            elif node.tag == u'objectgroup':
+                self._build_object_groups(node, world_map)
+                self._layersInWorld += 1
+            
+            # done with it, let it go
+            map_node.remove(node)
+        
+        if world_map is None:
+            raise Exception(u'no map found in %s' % file_name)
+        
         world_map.map_file_name = os.path.abspath(file_name)
         world_map.convert()
         return world_map
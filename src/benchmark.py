@@ -0,0 +1,658 @@
+'''
+Benchmarks the engine's hot paths with the example content, and saves the results as JSON so runs on different
+commits can be compared.
+
+Run it from the src folder::
+
+    python benchmark.py -o results.json
+    python benchmark.py -o new.json --compare results.json
+
+@author: Chris Alvarado-Dryden
+'''
+import array
+import base64
+import datetime
+import gzip
+import json
+import optparse
+import os
+import platform
+import shutil
+import StringIO
+import subprocess
+import sys
+import tempfile
+import timeit
+import xml.etree.ElementTree as ElementTree
+import zlib
+
+import pygame
+
+from Core import Constants
+from Core.Game import Game
+from Example.PlatformerNPC import PlatformerNPC
+from Map.GameMap import GameMap
+from Map.MapCache import MapCache
+from Map import TileGrid
+from Utilities.Camera import Camera
+from Utilities.tiledtmxloader import TileMapParser
+
+class Benchmark(object):
+    """
+    Benchmarks the engine's hot paths, using C{content/maps/BaseMap1P.tmx} and larger maps generated from it.
+    Everything runs in a headless L{Game<Core.Game.Game>}, so SDL uses its dummy video and audio drivers.
+    
+    The generated maps repeat the source map's tiles side by side, and can be filled with a swarm of
+    L{PlatformerNPC<Example.PlatformerNPC.PlatformerNPC>}s dropped from the top of the map.  They leave out the music
+    and point at the source map's images and UI files, so they can be written to a temporary folder.  If the NPCs'
+    sprite sheet isn't there, a plain placeholder sheet of the same size is used instead.
+    
+    Each benchmark times a single call many times over, and keeps the min, mean, median and max seconds per call.
+    
+    @type _sourcePath:     C{str}
+    @ivar _sourcePath:     File path to the .TMX map everything is based on.
+    
+    @type _settings:       C{dict}
+    @ivar _settings:       C{{str : object}} - How many times to repeat each benchmark, and how big to make the maps.
+    
+    @type _game:           L{Game<Core.Game.Game>}
+    @ivar _game:           The headless game, which sets up the display and controllers.
+    
+    @type _tempPath:       C{str}
+    @ivar _tempPath:       Folder the generated maps are written to, removed when the benchmarks are done.
+    
+    @type _results:        C{dict}
+    @ivar _results:        C{{str : dict}} - Results of each group of benchmarks, keyed by group name.
+    """
+    
+    # how each run size is set up
+    FULL = {'mapRepeats' : [1, 4, 16], 'npcCounts' : [0, 50, 200, 800], 'updateRepeat' : 4, 'loadRepeat' : 5,
+            'constructRepeat' : 3, 'warmupSteps' : 30, 'steps' : 300, 'frames' : 200, 'maxCameras' : 4}
+    QUICK = {'mapRepeats' : [1, 4], 'npcCounts' : [0, 50], 'updateRepeat' : 4, 'loadRepeat' : 2,
+             'constructRepeat' : 1, 'warmupSteps' : 10, 'steps' : 60, 'frames' : 30, 'maxCameras' : 4}
+    
+    def __init__(self, sourcePath, settings):
+        """
+        Creates the headless L{Game<Core.Game.Game>} and a temporary folder for the generated maps.
+        
+        @type  sourcePath:    C{str}
+        @param sourcePath:    File path to the .TMX map everything is based on.
+        
+        @type  settings:      C{dict}
+        @param settings:      How many times to repeat each benchmark and how big to make the maps, like L{FULL}.
+        """
+        self._sourcePath = os.path.realpath(sourcePath)
+        self._settings = settings
+        
+        self._game = Game('CAD-E Benchmark', None, Constants.GameConstants.WINDOW_WIDTH, Constants.GameConstants.WINDOW_HEIGHT, headless=True)
+        self._tempPath = tempfile.mkdtemp(prefix='cade-benchmark-')
+        self._results = {}
+    
+    def Run(self):
+        """
+        Runs every benchmark, then removes the generated maps.
+        
+        @rtype:     C{dict}
+        @return:    The environment, settings and results, ready to be saved as JSON.
+        """
+        sheetPath = PlatformerNPC.SheetPath
+        try:
+            if not os.path.isfile(os.path.realpath(sheetPath)):
+                print 'NPC sprite sheet', sheetPath, 'is missing, using a placeholder'
+                PlatformerNPC.SheetPath = self.__placeholder_npc_sheet__()
+            
+            self.BenchmarkLoad()
+            self.BenchmarkConstruct()
+            self.BenchmarkUpdate()
+            self.BenchmarkDraw()
+            self.BenchmarkUI()
+        finally:
+            PlatformerNPC.SheetPath = sheetPath
+            shutil.rmtree(self._tempPath, True)
+        
+        return {'environment' : Benchmark.Environment(), 'settings' : self._settings, 'results' : self._results}
+    
+    def BenchmarkLoad(self):
+        """
+        Times parsing and decoding the source map and each generated map from scratch, and loading them from the
+        L{MapCache<Map.MapCache.MapCache>}'s compiled copies.
+        """
+        results = {}
+        repeat = self._settings['loadRepeat']
+        
+        paths = [self._sourcePath] + [self.GenerateMap(mapRepeat) for mapRepeat in self._settings['mapRepeats'] if mapRepeat > 1]
+        for path in paths:
+            print 'load', os.path.basename(path)
+            
+            MapCache.Compile(path)
+            results[os.path.basename(path)] = {'parse_decode' : Benchmark.Measure(lambda: TileMapParser().parse_decode(path), repeat),
+                                               'cached_load' : Benchmark.Measure(lambda: MapCache.Load(path), repeat)}
+        
+        self._results['load'] = results
+    
+    def BenchmarkConstruct(self):
+        """
+        Times creating a L{GameMap<Map.GameMap.GameMap>} from each generated map, with its objects and UI.
+        """
+        results = {}
+        
+        for repeat in self._settings['mapRepeats']:
+            path = self.GenerateMap(repeat)
+            print 'construct', os.path.basename(path)
+            
+            # don't time the first parse
+            MapCache.Compile(path)
+            results[os.path.basename(path)] = Benchmark.Measure(lambda: self.__close_map__(self.__open_map__(path)), self._settings['constructRepeat'])
+        
+        self._results['construct'] = results
+    
+    def BenchmarkUpdate(self):
+        """
+        Times a single L{GameMap.Update<Map.GameMap.GameMap.Update>} step with swarms of
+        L{PlatformerNPC<Example.PlatformerNPC.PlatformerNPC>}s of different sizes.
+        """
+        results = {}
+        dt = 1.0 / 60
+        
+        for npcs in self._settings['npcCounts']:
+            path = self.GenerateMap(self._settings['updateRepeat'], npcs)
+            print 'update', os.path.basename(path)
+            
+            gameMap = self.__open_map__(path)
+            
+            # let the swarm land first
+            for step in range(self._settings['warmupSteps']):
+                gameMap.Update(dt)
+            
+            stats = Benchmark.Measure(lambda: gameMap.Update(dt), self._settings['steps'])
+            stats['actors'] = len(gameMap.Players) + len(gameMap.NonPlayerActors)
+            stats['steps_per_second'] = 1.0 / stats['mean'] if stats['mean'] else 0.0
+            results['npcs_' + str(npcs)] = stats
+            
+            self.__close_map__(gameMap)
+        
+        self._results['update'] = results
+    
+    def BenchmarkDraw(self):
+        """
+        Times drawing the L{GameTileLayer<Map.GameTileLayer.GameTileLayer>}s of the largest generated map with 1 up to
+        the most L{Camera<Utilities.Camera.Camera>}s, splitting the window between them.  The Cameras scroll across the
+        map, so chunks keep coming into view.  Drawing the whole map, including clearing and finalizing each Camera,
+        is timed as well.
+        """
+        results = {}
+        path = self.GenerateMap(max(self._settings['mapRepeats']))
+        
+        for count in range(1, self._settings['maxCameras'] + 1):
+            print 'draw', os.path.basename(path), 'with', count, 'cameras'
+            
+            # without controllers, the map's own objects and Cameras aren't loaded
+            Camera.Initialize(Camera.windowSurf)
+            gameMap = GameMap(path)
+            cameras = Benchmark.SplitCameras(count, gameMap.WidthInPixels, gameMap.HeightInPixels)
+            for camera in cameras:
+                gameMap.AddCamera(camera)
+            
+            scroll = Benchmark.ScrollCameras(cameras, gameMap.WidthInPixels)
+            
+            def drawTileLayers():
+                scroll()
+                for camera in cameras:
+                    camera.BeginDraw()
+                for layer in gameMap.TileLayers:
+                    layer.Draw(cameras)
+            
+            def drawMap():
+                scroll()
+                gameMap.Draw()
+            
+            results['cameras_' + str(count)] = {'tile_layers' : Benchmark.Measure(drawTileLayers, self._settings['frames']),
+                                                'map_draw' : Benchmark.Measure(drawMap, self._settings['frames'])}
+            
+            gameMap.ReleaseImages()
+        
+        self._results['draw'] = results
+    
+    def BenchmarkUI(self):
+        """
+        Times drawing every UI L{Panel<UI.Panel.Panel>} of the source map (its own and its Cameras') to the window.
+        """
+        path = self.GenerateMap(1)
+        print 'ui', os.path.basename(path)
+        
+        gameMap = self.__open_map__(path)
+        gameMap.Update(1.0 / 60)
+        
+        self._results['ui'] = {os.path.basename(path) : Benchmark.Measure(lambda: Camera.windowPanel.DrawTo(Camera.windowSurf), self._settings['frames'])}
+        
+        self.__close_map__(gameMap)
+    
+    def GenerateMap(self, repeat, npcs=0):
+        """
+        Writes a copy of the source map with its tiles repeated side by side, and a swarm of
+        L{PlatformerNPC<Example.PlatformerNPC.PlatformerNPC>}s spread evenly across it.  Each NPC starts in the
+        highest empty space of its column, in the I{player group} L{CollisionGroup<Core.CollisionGroup.CollisionGroup>}.
+        If the map was already generated, it isn't written again.
+        
+        @type  repeat:    C{int}
+        @param repeat:    How many copies of the source map's tiles to put side by side.
+        
+        @type  npcs:      C{int}
+        @param npcs:      How many NPCs to add.
+        
+        @rtype:           C{str}
+        @return:          File path to the generated .TMX.
+        """
+        name = os.path.splitext(os.path.basename(self._sourcePath))[0] + '_x' + str(repeat)
+        if npcs:
+            name += '_npc' + str(npcs)
+        path = os.path.join(self._tempPath, name + '.tmx')
+        if os.path.isfile(path):
+            return path
+        
+        tree = ElementTree.parse(self._sourcePath)
+        root = tree.getroot()
+        width = int(root.get('width'))
+        height = int(root.get('height'))
+        tileWidth = int(root.get('tilewidth'))
+        tileHeight = int(root.get('tileheight'))
+        root.set('width', str(width * repeat))
+        
+        self.__absolute_paths__(root)
+        
+        # repeat every row of every layer
+        collisionGids = None
+        for layer in root.findall('layer'):
+            data = layer.find('data')
+            gids = Benchmark.DecodeGids(data)
+            
+            repeated = array.array('I')
+            for row in range(height):
+                repeated.extend(gids[row * width:(row + 1) * width] * repeat)
+            
+            Benchmark.EncodeGids(data, repeated)
+            layer.set('width', str(width * repeat))
+            
+            if layer.get('name') == Constants.EditorConstants.LAYER_NAME_COLLISION_TILES:
+                collisionGids = gids
+        
+        # the swarm
+        if npcs:
+            group = ElementTree.SubElement(root, 'objectgroup', {'name' : 'npcs', 'width' : '0', 'height' : '0'})
+            spacing = float(width * repeat) / npcs
+            
+            for n in range(npcs):
+                column = int(n * spacing)
+                row = 0
+                if collisionGids is not None:
+                    row = Benchmark.EmptyRow(collisionGids, width, height, column % width)
+                
+                npc = ElementTree.SubElement(group, 'object', {'name' : 'NPC ' + str(n + 1), 'type' : 'Example.PlatformerNPC',
+                                                                'x' : str(column * tileWidth + 2), 'y' : str(row * tileHeight),
+                                                                'width' : '20', 'height' : '30'})
+                properties = ElementTree.SubElement(npc, 'properties')
+                ElementTree.SubElement(properties, 'property', {'name' : Constants.EditorConstants.OBJ_ACTOR_PROP_COLLISION_GROUPS,
+                                                                'value' : 'player group'})
+        
+        tree.write(path, 'UTF-8')
+        return path
+    
+    def __absolute_paths__(self, root):
+        """
+        Points every file path in a copy of the source map at the source map's files, so the copy can be saved
+        anywhere.  The music is left out, since it isn't being benchmarked.
+        
+        @type  root:    C{U{xml.etree.ElementTree.Element<http://docs.python.org/library/xml.etree.elementtree.html>}}
+        @param root:    The copy's map element.
+        """
+        sourceFolder = os.path.dirname(self._sourcePath)
+        
+        properties = root.find('properties')
+        if properties is not None:
+            for prop in properties.findall('property'):
+                name = prop.get('name')
+                if name == Constants.EditorConstants.MAP_PROP_MUSIC:
+                    properties.remove(prop)
+                elif name in (Constants.EditorConstants.MAP_PROP_BACKGROUND, Constants.EditorConstants.MAP_PROP_UI_FILES):
+                    prop.set('value', Benchmark.AbsolutePaths(sourceFolder, prop.get('value')))
+        
+        # Camera UIs are relative to the map's folder, tile sheets to the map file itself
+        for prop in root.getiterator('property'):
+            name = prop.get('name')
+            if name == Constants.EditorConstants.OBJ_CAM_PROP_UI_FILE:
+                prop.set('value', Benchmark.AbsolutePaths(sourceFolder, prop.get('value')))
+            elif name == 'sheet path' and prop.get('value').strip():
+                prop.set('value', Benchmark.AbsolutePaths(self._sourcePath, prop.get('value')))
+    
+    def __placeholder_npc_sheet__(self):
+        """
+        Writes a solid sprite sheet big enough for every frame of a L{PlatformerNPC<Example.PlatformerNPC.PlatformerNPC>}'s
+        animations, so NPCs can be created without their real sprite sheet.
+        
+        @rtype:     C{str}
+        @return:    File path to the placeholder sheet.
+        """
+        path = os.path.join(self._tempPath, 'npc_placeholder.png')
+        
+        sheet = pygame.Surface((1280, 472))
+        sheet.fill((0, 160, 0))
+        pygame.image.save(sheet, path)
+        
+        return path
+    
+    def __open_map__(self, path):
+        """
+        Creates a L{GameMap<Map.GameMap.GameMap>} with all of its objects and UI, with the game's
+        L{Controller<Utilities.Controller.Controller.Controller>}s bound to its players.
+        
+        @type  path:    C{str}
+        @param path:    File path to the .TMX file.
+        
+        @rtype:         L{GameMap<Map.GameMap.GameMap>}
+        @return:        The new map.
+        """
+        # start from an empty window panel, so UIs from earlier maps aren't drawn
+        Camera.Initialize(Camera.windowSurf)
+        return GameMap(path, self._game.Controllers)
+    
+    def __close_map__(self, gameMap):
+        """
+        Cleans up after a L{GameMap<Map.GameMap.GameMap>} the same way the L{Game<Core.Game.Game>} does when it
+        switches maps.
+        
+        @type  gameMap:    L{GameMap<Map.GameMap.GameMap>}
+        @param gameMap:    The map to clean up.
+        """
+        gameMap.StopSounds()
+        gameMap.RemoveUI()
+        gameMap.ReleaseImages()
+    
+    @staticmethod
+    def Measure(function, repeat):
+        """
+        Calls a function over and over, timing each call.
+        
+        @type  function:    C{function}
+        @param function:    The function to time, which takes no arguments.
+        
+        @type  repeat:      C{int}
+        @param repeat:      How many times to call it.
+        
+        @rtype:             C{dict}
+        @return:            C{{str : float}} - The number of calls, and the min, mean, median and max seconds per call.
+        """
+        timer = timeit.default_timer
+        times = []
+        for n in range(repeat):
+            start = timer()
+            function()
+            times.append(timer() - start)
+        
+        times.sort()
+        return {'repeat' : repeat, 'min' : times[0], 'mean' : sum(times) / len(times), 'median' : times[len(times) // 2], 'max' : times[-1]}
+    
+    @staticmethod
+    def SplitCameras(count, mapWidth, mapHeight):
+        """
+        Creates L{Camera<Utilities.Camera.Camera>}s that split the window between them, side by side, or in quarters
+        for 4.  Each Camera shows the world at the same size as its part of the window, and is centered on a
+        different part of the map.
+        
+        @type  count:        C{int}
+        @param count:        How many Cameras to create.
+        
+        @type  mapWidth:     C{int}
+        @param mapWidth:     Width of the map in pixels.
+        
+        @type  mapHeight:    C{int}
+        @param mapHeight:    Height of the map in pixels.
+        
+        @rtype:              C{list}
+        @return:             The Cameras, in order.
+        """
+        windowWidth, windowHeight = Camera.windowSurf.get_size()
+        
+        if count == 4:
+            columns, rows = 2, 2
+        else:
+            columns, rows = count, 1
+        
+        viewWidth = windowWidth // columns
+        viewHeight = windowHeight // rows
+        
+        cameras = []
+        for n in range(count):
+            displayView = pygame.Rect((n % columns) * viewWidth, (n // columns) * viewHeight, viewWidth, viewHeight)
+            worldView = pygame.Rect(0, 0, viewWidth, viewHeight)
+            center = ((n + 1) * mapWidth // (count + 1), mapHeight // 2)
+            cameras.append(Camera(worldView, displayView, 'Benchmark Camera ' + str(n + 1), center, None, n))
+        
+        return cameras
+    
+    @staticmethod
+    def ScrollCameras(cameras, mapWidth, speed=8):
+        """
+        Creates a function that moves each L{Camera<Utilities.Camera.Camera>} to the right every time it's called,
+        wrapping around at the end of the map.
+        
+        @type  cameras:     C{list}
+        @param cameras:     The Cameras to move.
+        
+        @type  mapWidth:    C{int}
+        @param mapWidth:    Width of the map in pixels.
+        
+        @type  speed:       C{int}
+        @param speed:       How many pixels to move each call.
+        
+        @rtype:             C{function}
+        @return:            Moves the Cameras one step.
+        """
+        def scroll():
+            for camera in cameras:
+                x, y = camera.Center
+                camera.Center = ((x + speed) % mapWidth, y)
+        
+        return scroll
+    
+    @staticmethod
+    def DecodeGids(data):
+        """
+        Decodes the gids of a layer's C{data} element, which must be base64 encoded.
+        
+        @type  data:    C{U{xml.etree.ElementTree.Element<http://docs.python.org/library/xml.etree.elementtree.html>}}
+        @param data:    The layer's data element.
+        
+        @rtype:         C{array}
+        @return:        The gids, row by row.
+        """
+        if data.get('encoding') != 'base64':
+            raise Exception('Only base64 encoded layers can be benchmarked')
+        
+        raw = base64.b64decode(data.text.strip())
+        if data.get('compression') == 'gzip':
+            raw = gzip.GzipFile(fileobj=StringIO.StringIO(raw)).read()
+        elif data.get('compression') == 'zlib':
+            raw = zlib.decompress(raw)
+        
+        gids = array.array('I')
+        gids.fromstring(raw)
+        if sys.byteorder == 'big':
+            gids.byteswap()
+        return gids
+    
+    @staticmethod
+    def EncodeGids(data, gids):
+        """
+        Replaces the gids of a layer's C{data} element, compressed the same way as before.
+        
+        @type  data:    C{U{xml.etree.ElementTree.Element<http://docs.python.org/library/xml.etree.elementtree.html>}}
+        @param data:    The layer's data element.
+        
+        @type  gids:    C{array}
+        @param gids:    The new gids, row by row.
+        """
+        if sys.byteorder == 'big':
+            gids = array.array('I', gids)
+            gids.byteswap()
+        raw = gids.tostring()
+        
+        if data.get('compression') == 'gzip':
+            compressed = StringIO.StringIO()
+            gzipFile = gzip.GzipFile(fileobj=compressed, mode='wb')
+            gzipFile.write(raw)
+            gzipFile.close()
+            raw = compressed.getvalue()
+        elif data.get('compression') == 'zlib':
+            raw = zlib.compress(raw)
+        
+        data.text = base64.b64encode(raw)
+    
+    @staticmethod
+    def EmptyRow(gids, width, height, column):
+        """
+        Finds the highest empty space in a column of a layer.
+        
+        @type  gids:      C{array}
+        @param gids:      The layer's gids, row by row.
+        
+        @type  width:     C{int}
+        @param width:     Width of the layer in tiles.
+        
+        @type  height:    C{int}
+        @param height:    Height of the layer in tiles.
+        
+        @type  column:    C{int}
+        @param column:    X tile coordinate of the column.
+        
+        @rtype:           C{int}
+        @return:          Y tile coordinate of the highest empty space, 0 if the column is full.
+        """
+        for row in range(height):
+            if not gids[row * width + column]:
+                return row
+        return 0
+    
+    @staticmethod
+    def AbsolutePaths(base, value):
+        """
+        Makes a comma separated list of relative file paths absolute.
+        
+        @type  base:     C{str}
+        @param base:     Path the file paths are relative to.
+        
+        @type  value:    C{str}
+        @param value:    The comma separated file paths.
+        
+        @rtype:          C{str}
+        @return:         The absolute file paths, comma separated.
+        """
+        paths = [path.strip() for path in value.split(',') if path.strip()]
+        return ', '.join([os.path.realpath(os.path.join(base, path)) for path in paths])
+    
+    @staticmethod
+    def Environment():
+        """
+        Describes what the benchmarks were run on, so results from different machines or commits aren't mixed up.
+        
+        @rtype:     C{dict}
+        @return:    C{{str : str}} - The commit, date, and Python, pygame and platform versions.
+        """
+        try:
+            commit = subprocess.Popen(['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0].strip()
+        except OSError:
+            commit = ''
+        
+        # the TileGrid falls back to plain Python without NumPy
+        numpyVersion = ''
+        if TileGrid.numpy:
+            numpyVersion = TileGrid.numpy.__version__
+        
+        return {'commit' : commit, 'date' : datetime.datetime.now().isoformat(), 'python' : platform.python_version(),
+                'pygame' : pygame.version.ver, 'numpy' : numpyVersion, 'platform' : platform.platform(),
+                'video driver' : pygame.display.get_driver()}
+    
+    @staticmethod
+    def Compare(results, baseline, threshold):
+        """
+        Finds the benchmarks whose mean time per call went up by more than the threshold.
+        
+        @type  results:      C{dict}
+        @param results:      The new results, as returned by L{Run}.
+        
+        @type  baseline:     C{dict}
+        @param baseline:     The results to compare against.
+        
+        @type  threshold:    C{float}
+        @param threshold:    How much slower a benchmark can get before it counts, like C{0.1} for 10%.
+        
+        @rtype:              C{list}
+        @return:             C{[(str, float, float)]} - Name, baseline mean and new mean of every slower benchmark.
+        """
+        regressions = []
+        
+        def walk(name, new, old):
+            if new.has_key('mean'):
+                if old.get('mean') and new['mean'] > old['mean'] * (1.0 + threshold):
+                    regressions.append((name, old['mean'], new['mean']))
+                return
+            
+            for key in sorted(new):
+                if isinstance(new[key], dict) and isinstance(old.get(key), dict):
+                    walk(name + '/' + key, new[key], old[key])
+        
+        walk('', results['results'], baseline['results'])
+        return regressions
+
+def main(argv):
+    """
+    Runs the benchmarks, saves the results, and compares them to earlier results if asked to.
+    
+    @type  argv:    C{list}
+    @param argv:    Command line arguments.
+    
+    @rtype:         C{int}
+    @return:        1 if a benchmark got slower than the earlier results, 0 otherwise.
+    """
+    parser = optparse.OptionParser(usage='python benchmark.py [options]')
+    parser.add_option('-o', '--output', default='benchmark.json', help='file to save the JSON results to')
+    parser.add_option('-m', '--map', default=os.path.join(Constants.GameConstants.BASE_PATH, 'content/maps/BaseMap1P.tmx'),
+                      help='.TMX map to benchmark and generate larger maps from')
+    parser.add_option('-q', '--quick', action='store_true', default=False, help='smaller maps and fewer repeats')
+    parser.add_option('-c', '--compare', help='earlier JSON results to check for regressions')
+    parser.add_option('-t', '--threshold', type='float', default=0.1, help='how much slower counts as a regression, 0.1 is 10%')
+    options, args = parser.parse_args(argv)
+    
+    if options.quick:
+        settings = Benchmark.QUICK
+    else:
+        settings = Benchmark.FULL
+    
+    results = Benchmark(options.map, dict(settings)).Run()
+    
+    f = open(options.output, 'w')
+    try:
+        json.dump(results, f, indent=2, sort_keys=True)
+    finally:
+        f.close()
+    print 'saved results to', options.output
+    
+    if options.compare:
+        f = open(options.compare)
+        try:
+            baseline = json.load(f)
+        finally:
+            f.close()
+        
+        regressions = Benchmark.Compare(results, baseline, options.threshold)
+        for name, old, new in regressions:
+            print 'slower: %s %.3f ms -> %.3f ms' % (name, old * 1000.0, new * 1000.0)
+        if regressions:
+            return 1
+        print 'no regressions against', options.compare
+    
+    return 0
+
+if __name__ == '__main__':
+    # the engine's paths are relative to src
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main(sys.argv[1:]))
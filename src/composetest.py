@@ -0,0 +1,151 @@
+'''
+Draws the example UI once composed and once child by child over a rendered map, and checks the two only differ by
+rounding, to catch changes to how L{Panel<UI.Panel.Panel>}s compose translucent children.
+
+Run it from the src folder::
+
+    python composetest.py
+    python composetest.py --tolerance 2
+
+@author: Chris Alvarado-Dryden
+'''
+import optparse
+import os
+import sys
+
+import numpy
+import pygame
+
+from Core import Constants
+from Example.PlatformerGame import PlatformerGame
+from Example.PlatformerVolumeMenu import PlatformerVolumeMenu
+from UI.Box import Box
+from UI.Panel import Panel
+from UI.Text import Text
+from UI.Textured import Textured
+from Utilities.Camera import Camera
+
+# how far apart a channel can be from drawing the children one at a time, from rounding in the alpha and color
+TOLERANCE = 4
+
+def DrawStraight(widget, surf):
+    """
+    Draws the Widget to the given Surface the way it was before Panels were composed, every child straight to the
+    Surface one at a time.
+    
+    @type  widget:      L{Widget<UI.Widget.Widget>}
+    @param widget:      The Widget to draw.
+    
+    @type  surf:        C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+    @param surf:        Surface to draw to, covering the whole window.
+    """
+    if not widget.Visible:
+        return
+    
+    if isinstance(widget, Panel):
+        for child in widget._children:
+            DrawStraight(child, surf)
+    else:
+        widget.DrawTo(surf)
+
+def Difference(a, b):
+    """
+    Finds the biggest difference between two Surfaces in any channel of any pixel.
+    
+    @type  a:       C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+    @param a:       A Surface.
+    
+    @type  b:       C{U{pygame.Surface<http://www.pygame.org/docs/ref/surface.html>}}
+    @param b:       A Surface the same size.
+    
+    @rtype:         C{(int, (int, int))}
+    @return:        The biggest difference, and the pixel it's at.
+    """
+    difference = numpy.abs(pygame.surfarray.array3d(a).astype(numpy.int16) - pygame.surfarray.array3d(b)).max(2)
+    x, y = numpy.unravel_index(difference.argmax(), difference.shape)
+    
+    return int(difference[x, y]), (int(x), int(y))
+
+def TitlePanel():
+    """
+    Builds a full window Panel like the example menus, with translucent art, a translucent box over it and text.
+    
+    @rtype:         L{Panel<UI.Panel.Panel>}
+    @return:        The Panel.
+    """
+    basePath = Constants.GameConstants.BASE_PATH
+    width, height = Constants.GameConstants.WINDOW_WIDTH, Constants.GameConstants.WINDOW_HEIGHT
+    
+    panel = Panel((0, 0), width, height)
+    panel.AddChild(Textured((0, 0), width, height, os.path.join(basePath, 'content/gfx/elements/title.png')))
+    panel.AddChild(Box((0, 0), width, height, pygame.Color(0, 0, 0, 50)))
+    panel.AddChild(Text((57, 100), os.path.join(basePath, 'content/fonts/upheavtt.ttf'), 100, 'CUBOID CLASH', pygame.Color(255, 255, 0, 255)))
+    
+    return panel
+
+def ComposeTest(mapNames, tolerance):
+    """
+    Draws the UI of each map, a Volume Menu and a title Panel over a render of each map, composed and straight, and
+    compares them.
+    
+    @type  mapNames:    C{list}
+    @param mapNames:    File names of the maps to draw the UI of, from C{content/maps}.
+    
+    @type  tolerance:   C{int}
+    @param tolerance:   How far apart a channel can be.
+    
+    @rtype:             C{list}
+    @return:            C{[str]} - A message for every Panel that was too far off, empty if they all passed.
+    """
+    game = PlatformerGame('CAD-E Compose Test', None, Constants.GameConstants.WINDOW_WIDTH, Constants.GameConstants.WINDOW_HEIGHT, headless=True)
+    
+    mapDirectory = os.path.realpath(os.path.join(Constants.GameConstants.BASE_PATH, 'content/maps'))
+    for mapName in mapNames:
+        game.LoadMap(os.path.join(mapDirectory, mapName))
+    
+    failures = []
+    for mapName in mapNames:
+        print 'compose test', mapName
+        
+        game.PlayMap(mapName)
+        game.Simulate(30)
+        background = game.Render().copy()
+        
+        panels = [(mapName + ' UI', Camera.windowPanel),
+                  ('Volume Menu', PlatformerVolumeMenu('Volume Menu', (410, 280), 400, 600)),
+                  ('title', TitlePanel())]
+        for name, panel in panels:
+            straight = background.copy()
+            DrawStraight(panel, straight)
+            
+            composed = background.copy()
+            panel.DrawTo(composed)
+            
+            difference, pixel = Difference(straight, composed)
+            if difference > tolerance:
+                failures.append(name + ': off by ' + str(difference) + ' at ' + str(pixel))
+    
+    return failures
+
+def main(args):
+    parser = optparse.OptionParser(usage='%prog [options] [map.tmx ...]')
+    parser.add_option('-t', '--tolerance', type='int', default=TOLERANCE, help='how far apart a channel can be')
+    options, mapNames = parser.parse_args(args)
+    
+    if not mapNames:
+        mapNames = ['BaseMap1P.tmx', 'BaseMap2P.tmx']
+    
+    failures = ComposeTest(mapNames, options.tolerance)
+    for failure in failures:
+        print 'FAILED', failure
+    
+    if failures:
+        return 1
+    
+    print 'OK'
+    return 0
+
+if __name__ == '__main__':
+    # the engine's paths are relative to src
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main(sys.argv[1:]))
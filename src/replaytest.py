@@ -0,0 +1,159 @@
+'''
+Replays recorded keyboard input on the example maps in a headless game and checks every Actor comes to rest where it
+did when the input was recorded, to catch changes to movement and tile collision resolution.  Every map is replayed
+with the discrete and the L{swept<Core.Actor.Actor.SweptCollisions>} tile collision resolvers.
+
+Run it from the src folder::
+
+    python replaytest.py
+    python replaytest.py --record
+
+@author: Chris Alvarado-Dryden
+'''
+import optparse
+import os
+import sys
+
+from pygame.locals import *
+
+from Core import Constants
+from Example.PlatformerGame import PlatformerGame
+
+# (steps, keys held down) for player 1, see config/controllers/controller.xml
+RUN_AND_JUMP = [(20, []),
+                (40, [K_a]),
+                (10, [K_a, K_w]),
+                (30, [K_a]),
+                (15, [K_w]),
+                (40, []),
+                (25, [K_d]),
+                (8, [K_d, K_w]),
+                (60, [K_d]),
+                (150, [])]
+
+# (steps, keys held down) for both players
+BOTH_PLAYERS = [(20, []),
+                (30, [K_a, K_l]),
+                (12, [K_w, K_a, K_j]),
+                (30, [K_d, K_i]),
+                (20, [K_a, K_l]),
+                (150, [])]
+
+# map file name : (input, {actor name : resting position}, {actor name : resting position with swept collisions})
+# the discrete resolver lets Player 2 sink into the ground under the bounce tile, the swept resolver stops it on top
+RECORDINGS = {'BaseMap1P.tmx': (RUN_AND_JUMP, {'Player 1': (662, 513)}, {'Player 1': (662, 513)}),
+              'BaseMap2P.tmx': (BOTH_PLAYERS, {'Player 1': (442, 513), 'Player 2': (561, 513)}, {'Player 1': (442, 513), 'Player 2': (556, 513)})}
+
+def Replay(game, mapName, replayInput, swept):
+    """
+    Plays the map in the game from the start and simulates it with the given input.
+    
+    @type  game:           L{PlatformerGame<Example.PlatformerGame.PlatformerGame>}
+    @param game:           The headless game the map has been loaded into.
+    
+    @type  mapName:        C{str}
+    @param mapName:        File name of the map to play.
+    
+    @type  replayInput:    C{list}
+    @param replayInput:    C{[(int, [int])]} - How many steps to hold each set of keys down for, in order.
+    
+    @type  swept:          C{bool}
+    @param swept:          If C{True}, the Actors use swept tile collisions.
+    
+    @rtype:                C{dict}
+    @return:               C{{str : (float, float)}} - Where every Actor in the map ended up, keyed by name.
+    """
+    game.PlayMap(mapName)
+    
+    for actor in game.CurrentMap.Players + game.CurrentMap.NonPlayerActors:
+        actor.SweptCollisions = swept
+    
+    for steps, keys in replayInput:
+        pressed = [False] * 512
+        for key in keys:
+            pressed[key] = True
+        
+        game.Simulate(steps, pressed)
+    
+    positions = {}
+    for actor in game.CurrentMap.Players + game.CurrentMap.NonPlayerActors:
+        positions[actor.Name] = (actor.Position[0], actor.Position[1])
+    
+    return positions
+
+def ReplayTest(mapNames):
+    """
+    Replays the recorded input for each map with both tile collision resolvers, and compares where the Actors ended up
+    to the recorded positions.
+    
+    @type  mapNames:    C{list}
+    @param mapNames:    File names of the maps to replay, from L{RECORDINGS}.
+    
+    @rtype:             C{list}
+    @return:            C{[str]} - A message for every Actor that didn't end up where it was recorded, empty if they all did.
+    """
+    game = PlatformerGame('CAD-E Replay Test', None, Constants.GameConstants.WINDOW_WIDTH, Constants.GameConstants.WINDOW_HEIGHT, headless=True)
+    
+    mapDirectory = os.path.realpath(os.path.join(Constants.GameConstants.BASE_PATH, 'content/maps'))
+    for mapName in mapNames:
+        game.LoadMap(os.path.join(mapDirectory, mapName))
+    
+    failures = []
+    for mapName in mapNames:
+        replayInput, discrete, swept = RECORDINGS[mapName]
+        
+        for mode, expected in (('discrete', discrete), ('swept', swept)):
+            print 'replay test', mapName, mode
+            
+            positions = Replay(game, mapName, replayInput, mode == 'swept')
+            
+            for name in sorted(set(expected.keys() + positions.keys())):
+                if positions.get(name) != expected.get(name):
+                    failures.append(mapName + ' ' + mode + ': ' + name + ' ended at ' + repr(positions.get(name)) + ', expected ' + repr(expected.get(name)))
+    
+    return failures
+
+def Record(mapNames):
+    """
+    Replays the recorded input for each map with both tile collision resolvers and prints where the Actors ended up,
+    in the form L{RECORDINGS} takes.
+    
+    @type  mapNames:    C{list}
+    @param mapNames:    File names of the maps to replay, from L{RECORDINGS}.
+    """
+    game = PlatformerGame('CAD-E Replay Test', None, Constants.GameConstants.WINDOW_WIDTH, Constants.GameConstants.WINDOW_HEIGHT, headless=True)
+    
+    mapDirectory = os.path.realpath(os.path.join(Constants.GameConstants.BASE_PATH, 'content/maps'))
+    for mapName in mapNames:
+        game.LoadMap(os.path.join(mapDirectory, mapName))
+    
+    for mapName in mapNames:
+        replayInput = RECORDINGS[mapName][0]
+        print repr(mapName), repr(Replay(game, mapName, replayInput, False)), repr(Replay(game, mapName, replayInput, True))
+
+def main(args):
+    parser = optparse.OptionParser(usage='%prog [options] [map.tmx ...]')
+    parser.add_option('-r', '--record', action='store_true', default=False, help='print where the Actors end up instead of checking them')
+    options, mapNames = parser.parse_args(args)
+    
+    if not mapNames:
+        mapNames = sorted(RECORDINGS.keys())
+    
+    if options.record:
+        Record(mapNames)
+        return 0
+    
+    failures = ReplayTest(mapNames)
+    for failure in failures:
+        print 'FAILED', failure
+    
+    if failures:
+        return 1
+    
+    print 'OK'
+    return 0
+
+if __name__ == '__main__':
+    # the engine's paths are relative to src
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,78 @@
+'''
+Plays the example maps in a headless game for a few steps, to check that they load, update and draw without a window.
+
+Run it from the src folder::
+
+    python smoketest.py
+    python smoketest.py --steps 300 BaseMap1P.tmx
+
+@author: Chris Alvarado-Dryden
+'''
+import optparse
+import os
+import sys
+
+from Core import Constants
+from Example.PlatformerGame import PlatformerGame
+
+def SmokeTest(mapNames, steps):
+    """
+    Plays each map in a headless L{PlatformerGame<Example.PlatformerGame.PlatformerGame>}, simulating it for the given
+    number of steps and rendering it once.
+    
+    @type  mapNames:    C{list}
+    @param mapNames:    File names of the maps to play, from C{content/maps}.
+    
+    @type  steps:       C{int}
+    @param steps:       How many steps to simulate each map for.
+    
+    @rtype:             C{list}
+    @return:            C{[str]} - A message for every map that failed, empty if they all passed.
+    """
+    game = PlatformerGame('CAD-E Smoke Test', None, Constants.GameConstants.WINDOW_WIDTH, Constants.GameConstants.WINDOW_HEIGHT, headless=True)
+    
+    mapDirectory = os.path.realpath(os.path.join(Constants.GameConstants.BASE_PATH, 'content/maps'))
+    for mapName in mapNames:
+        game.LoadMap(os.path.join(mapDirectory, mapName))
+    
+    failures = []
+    for mapName in mapNames:
+        print 'smoke test', mapName
+        
+        game.PlayMap(mapName)
+        if not game.CurrentMap.Cameras:
+            failures.append(mapName + ': no cameras were loaded')
+            continue
+        
+        taken = game.Simulate(steps)
+        if taken != steps:
+            failures.append(mapName + ': only ' + str(taken) + ' of ' + str(steps) + ' steps were taken')
+        
+        surface = game.Render()
+        if surface.get_bitsize() != 32:
+            failures.append(mapName + ': rendered to a ' + str(surface.get_bitsize()) + ' bit surface')
+    
+    return failures
+
+def main(args):
+    parser = optparse.OptionParser(usage='%prog [options] [map.tmx ...]')
+    parser.add_option('-s', '--steps', type='int', default=60, help='steps to simulate each map for')
+    options, mapNames = parser.parse_args(args)
+    
+    if not mapNames:
+        mapNames = ['BaseMap1P.tmx', 'BaseMap2P.tmx']
+    
+    failures = SmokeTest(mapNames, options.steps)
+    for failure in failures:
+        print 'FAILED', failure
+    
+    if failures:
+        return 1
+    
+    print 'OK'
+    return 0
+
+if __name__ == '__main__':
+    # the engine's paths are relative to src
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main(sys.argv[1:]))